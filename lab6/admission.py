@@ -0,0 +1,136 @@
+import threading
+import time
+from typing import Dict, Iterable
+
+from metrics import _escape
+
+
+# Сервер перегружен: нет свободных слотов и очередь ожидания заполнена
+# или время ожидания в ней истекло
+class BackendOverloaded(Exception):
+    pass
+
+
+# Ограничитель одновременных запросов к одному серверу.
+# Лимит подстраивается по схеме AIMD: если задержка ответа остается в пределах
+# tolerance от минимальной наблюдаемой, лимит растет на 1/limit (примерно на
+# единицу за «раунд»), при росте задержки или ошибке — умножается на backoff.
+# Запросы сверх лимита ждут в ограниченной очереди не дольше queue_timeout.
+class AdaptiveLimiter:
+    def __init__(self, max_limit: int = 64, min_limit: int = 1, queue_size: int = 32,
+                 queue_timeout: float = 0.1, adaptive: bool = True,
+                 tolerance: float = 2.0, backoff: float = 0.9, slack: float = 0.005):
+        self.max_limit = max_limit
+        self.min_limit = min_limit
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.adaptive = adaptive
+        self.tolerance = tolerance
+        self.backoff = backoff
+        self.slack = slack
+        self.limit = float(max_limit)
+        self.in_flight = 0
+        self.queued = 0
+        self.rejected = 0
+        self.min_latency = None
+        self._last_decrease = 0.0
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        with self._cond:
+            if self.in_flight < int(self.limit):
+                self.in_flight += 1
+                return
+            if self.queued >= self.queue_size:
+                self.rejected += 1
+                raise BackendOverloaded()
+
+            self.queued += 1
+            try:
+                deadline = time.monotonic() + self.queue_timeout
+                while self.in_flight >= int(self.limit):
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.rejected += 1
+                        raise BackendOverloaded()
+                    self._cond.wait(remaining)
+                self.in_flight += 1
+            finally:
+                self.queued -= 1
+
+    def release(self, latency: float, ok: bool):
+        with self._cond:
+            self.in_flight -= 1
+            if self.adaptive:
+                self._adjust(latency, ok)
+            self._cond.notify()
+
+    def _adjust(self, latency: float, ok: bool):
+        if ok:
+            # Минимум медленно «всплывает», чтобы лимит не застрял,
+            # если сервер стал стабильно медленнее
+            if self.min_latency is None:
+                self.min_latency = latency
+            else:
+                self.min_latency = min(latency, self.min_latency * 1.001)
+
+        congested = not ok or (self.min_latency is not None and
+                               latency > self.min_latency * self.tolerance + self.slack)
+        if congested:
+            # Уменьшаем не чаще одного раза за время ответа, иначе одна волна
+            # медленных ответов обрушит лимит до минимума
+            now = time.monotonic()
+            if now - self._last_decrease >= latency:
+                self.limit = max(self.min_limit, self.limit * self.backoff)
+                self._last_decrease = now
+        else:
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+
+    def stats(self) -> Dict:
+        with self._cond:
+            return {
+                "limit": round(self.limit, 2),
+                "in_flight": self.in_flight,
+                "queued": self.queued,
+                "rejected": self.rejected,
+            }
+
+
+# Ограничители для всех серверов пула
+class AdmissionController:
+    def __init__(self, **limiter_options):
+        self._options = limiter_options
+        self._limiters: Dict[str, AdaptiveLimiter] = {}
+        self._lock = threading.Lock()
+
+    def limiter(self, url: str) -> AdaptiveLimiter:
+        limiter = self._limiters.get(url)
+        if limiter is None:
+            with self._lock:
+                limiter = self._limiters.setdefault(url, AdaptiveLimiter(**self._options))
+        return limiter
+
+    # Удаление ограничителей серверов, которых больше нет в пуле
+    def retain(self, urls: Iterable[str]):
+        keep = set(urls)
+        with self._lock:
+            for url in [url for url in self._limiters if url not in keep]:
+                del self._limiters[url]
+
+    def stats(self) -> Dict[str, Dict]:
+        return {url: limiter.stats() for url, limiter in list(self._limiters.items())}
+
+    # Метрики в текстовом формате Prometheus
+    def render_prometheus(self) -> str:
+        stats = [(_escape(url), values) for url, values in sorted(self.stats().items())]
+        lines = []
+        for name, key, kind, help_text in (
+            ("lb_backend_concurrency_limit", "limit", "gauge", "Current adaptive concurrency limit"),
+            ("lb_backend_queued", "queued", "gauge", "Requests waiting for a concurrency slot"),
+            ("lb_backend_rejected_total", "rejected", "counter", "Requests rejected by admission control"),
+        ):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for url, values in stats:
+                lines.append(f'{name}{{backend="{url}"}} {values[key]}')
+        return "\n".join(lines) + "\n"
@@ -1,5 +1,8 @@
 from flask import Flask, jsonify
+import os
+import random
 import sys
+import time
 
 # Создаем экземпляр Flask приложения
 app = Flask(__name__)
@@ -13,6 +16,11 @@ else:
 # Генерируем уникальный ID для этого экземпляра на основе порта
 instance_id = f"instance-{port}"
 
+# Искусственная задержка и доля ошибок для нагрузочного тестирования
+LATENCY_MS = float(os.environ.get("INSTANCE_LATENCY_MS", 0))
+LATENCY_JITTER_MS = float(os.environ.get("INSTANCE_LATENCY_JITTER_MS", 0))
+FAILURE_RATE = float(os.environ.get("INSTANCE_FAILURE_RATE", 0))
+
 # Эндпоинт для проверки состояния
 @app.route('/health', methods=['GET'])
 def health():
@@ -24,6 +32,15 @@ def health():
 # Эндпоинт для обработки запросов
 @app.route('/process', methods=['GET', 'POST'])
 def process():
+    delay = LATENCY_MS + random.uniform(0, LATENCY_JITTER_MS)
+    if delay > 0:
+        time.sleep(delay / 1000)
+    if FAILURE_RATE > 0 and random.random() < FAILURE_RATE:
+        return jsonify({
+            "error": "Injected failure",
+            "instance_id": instance_id
+        }), 500
+
     return jsonify({
         "message": "Request processed successfully",
         "instance_id": instance_id
@@ -31,5 +48,5 @@ def process():
 
 if __name__ == '__main__':
     # Запускаем приложение на указанном порту
-    app.run(port=port, debug=True)
+    app.run(port=port, debug=os.environ.get("INSTANCE_DEBUG", "1") == "1")
     
\ No newline at end of file
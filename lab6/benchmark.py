@@ -0,0 +1,245 @@
+import argparse
+import importlib.util
+import itertools
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+
+import requests
+
+LAB_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+# Процент из отсортированного списка
+def percentile(sorted_values, q):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+# Ожидание, пока сервер начнет отвечать на /health
+def wait_ready(url, timeout=15.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if requests.get(f"{url}/health", timeout=1).status_code == 200:
+                return True
+        except requests.exceptions.RequestException:
+            pass
+        time.sleep(0.1)
+    return False
+
+
+def start_process(args, env):
+    return subprocess.Popen(
+        args, cwd=LAB_DIR, env={**os.environ, **env},
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+
+
+def stop_processes(processes):
+    for process in processes:
+        process.terminate()
+    for process in processes:
+        try:
+            process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+
+# Запуск N экземпляров app_instance.py с искусственной задержкой и ошибками
+def start_backends(options):
+    env = {
+        "INSTANCE_DEBUG": "0",
+        "INSTANCE_LATENCY_MS": str(options.latency_ms),
+        "INSTANCE_LATENCY_JITTER_MS": str(options.jitter_ms),
+        "INSTANCE_FAILURE_RATE": str(options.failure_rate),
+    }
+    urls = [f"http://localhost:{options.base_port + i}" for i in range(options.backends)]
+    processes = [
+        start_process([sys.executable, "app_instance.py", str(options.base_port + i)], env)
+        for i in range(options.backends)
+    ]
+    for url in urls:
+        if not wait_ready(url):
+            stop_processes(processes)
+            raise RuntimeError(f"Сервер {url} не запустился")
+    return urls, processes
+
+
+# Команда запуска балансировщика на выбранном WSGI-движке
+def balancer_command(engine, port, threads):
+    if engine == "werkzeug":
+        return [sys.executable, "load_balancer.py"]
+    if engine == "waitress":
+        return [sys.executable, "-m", "waitress", f"--port={port}",
+                f"--threads={threads}", "load_balancer:app"]
+    if engine == "gunicorn":
+        return [sys.executable, "-m", "gunicorn", "-b", f"127.0.0.1:{port}",
+                "-k", "gthread", "--threads", str(threads), "load_balancer:app"]
+    raise ValueError(f"Неизвестный движок: {engine}")
+
+
+def engine_available(engine):
+    return engine == "werkzeug" or importlib.util.find_spec(engine) is not None
+
+
+# Генератор нагрузки. Если rps > 0 — открытая модель с фиксированной
+# частотой запросов (задержка считается от запланированного момента
+# отправки, чтобы не скрывать очередь); иначе — замкнутая модель,
+# где каждый из concurrency потоков шлет запросы друг за другом.
+def run_load(url, concurrency, duration, rps=0.0):
+    latencies = []
+    errors = 0
+    status_counts = {}
+    lock = threading.Lock()
+    slots = itertools.count()
+    start = time.perf_counter()
+    deadline = start + duration
+
+    def worker():
+        nonlocal errors
+        session = requests.Session()
+        local_latencies = []
+        local_errors = 0
+        local_statuses = {}
+        while True:
+            if rps > 0:
+                scheduled = start + next(slots) / rps
+                if scheduled >= deadline:
+                    break
+                delay = scheduled - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+            else:
+                scheduled = time.perf_counter()
+                if scheduled >= deadline:
+                    break
+            try:
+                response = session.get(url, timeout=10)
+                status = response.status_code
+            except requests.exceptions.RequestException:
+                status = None
+            local_latencies.append(time.perf_counter() - scheduled)
+            if status is None or status >= 500:
+                local_errors += 1
+            local_statuses[str(status)] = local_statuses.get(str(status), 0) + 1
+        with lock:
+            latencies.extend(local_latencies)
+            errors += local_errors
+            for status, count in local_statuses.items():
+                status_counts[status] = status_counts.get(status, 0) + count
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    total = len(latencies)
+    return {
+        "requests": total,
+        "errors": errors,
+        "error_rate": round(errors / total, 4) if total else 0.0,
+        "throughput_rps": round(total / elapsed, 2),
+        "status_counts": status_counts,
+        "latency_ms": {
+            "mean": round(sum(latencies) / total * 1000, 3) if total else None,
+            "p50": round(percentile(latencies, 0.50) * 1000, 3) if total else None,
+            "p95": round(percentile(latencies, 0.95) * 1000, 3) if total else None,
+            "p99": round(percentile(latencies, 0.99) * 1000, 3) if total else None,
+            "max": round(latencies[-1] * 1000, 3) if total else None,
+        },
+    }
+
+
+# Один прогон: балансировщик со стратегией и движком поверх запущенных серверов
+def run_case(options, backend_urls, strategy, engine):
+    env = {
+        "LB_PORT": str(options.lb_port),
+        "LB_SERVERS": ",".join(backend_urls),
+        "LB_POOL_FILE": "",
+        "LB_STRATEGY": strategy,
+        "LB_DEBUG": "0",
+        "LB_LOG_LEVEL": "WARNING",
+    }
+    for item in options.lb_env:
+        name, _, value = item.partition("=")
+        env[name] = value
+
+    lb_url = f"http://localhost:{options.lb_port}"
+    balancer = start_process(balancer_command(engine, options.lb_port, options.concurrency), env)
+    try:
+        if not wait_ready(lb_url):
+            raise RuntimeError(f"Балансировщик ({engine}) не запустился")
+        target = f"{lb_url}{options.path}"
+        if options.warmup > 0:
+            run_load(target, options.concurrency, options.warmup, options.rps)
+        result = run_load(target, options.concurrency, options.duration, options.rps)
+    finally:
+        stop_processes([balancer])
+
+    result.update({"strategy": strategy, "engine": engine})
+    return result
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Нагрузочный тест балансировщика lab6")
+    parser.add_argument("--backends", type=int, default=3, help="число экземпляров app_instance.py")
+    parser.add_argument("--base-port", type=int, default=5101)
+    parser.add_argument("--lb-port", type=int, default=5100)
+    parser.add_argument("--latency-ms", type=float, default=0, help="задержка ответа сервера")
+    parser.add_argument("--jitter-ms", type=float, default=0, help="случайная добавка к задержке")
+    parser.add_argument("--failure-rate", type=float, default=0, help="доля ответов 500")
+    parser.add_argument("--strategies", default="round_robin,consistent_hash")
+    parser.add_argument("--engines", default="werkzeug", help="werkzeug, waitress, gunicorn")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--rps", type=float, default=0, help="фиксированная частота (0 — замкнутая модель)")
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--warmup", type=float, default=1)
+    parser.add_argument("--path", default="/process")
+    parser.add_argument("--lb-env", action="append", default=[], metavar="NAME=VALUE",
+                        help="дополнительные переменные окружения балансировщика")
+    parser.add_argument("--output", default="benchmark_results.json")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    options = parse_args(argv)
+    report = {
+        "started_at": datetime.now().isoformat(),
+        "config": vars(options),
+        "results": [],
+    }
+
+    backend_urls, backends = start_backends(options)
+    try:
+        for engine in options.engines.split(","):
+            if not engine_available(engine):
+                print(f"Движок {engine} не установлен, пропуск")
+                continue
+            for strategy in options.strategies.split(","):
+                print(f"Прогон: стратегия={strategy}, движок={engine}")
+                result = run_case(options, backend_urls, strategy, engine)
+                report["results"].append(result)
+                print(f"  {result['throughput_rps']} запросов/с, "
+                      f"p50={result['latency_ms']['p50']} мс, "
+                      f"p99={result['latency_ms']['p99']} мс, "
+                      f"ошибки={result['error_rate']:.2%}")
+    finally:
+        stop_processes(backends)
+
+    with open(options.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"Результаты сохранены в {options.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,6 @@
+# Общие вспомогательные функции тестов lab6
+
+
+# Описание сервера пула для тестов
+def make_server(port, active=True):
+    return {"url": f"http://localhost:{port}", "weight": 1, "active": active}
@@ -0,0 +1,72 @@
+import bisect
+import hashlib
+import heapq
+import threading
+from typing import FrozenSet, Iterator, List, Tuple
+
+
+def ring_hash(value: str) -> int:
+    return int.from_bytes(hashlib.md5(value.encode("utf-8")).digest()[:8], "big")
+
+
+# Кольцо консистентного хеширования с виртуальными узлами.
+# Состояние (отсортированные хеши и соответствующие им узлы) публикуется
+# одним кортежем, поэтому поиск идет без блокировки; при добавлении или
+# удалении узла пересчитываются только его виртуальные точки.
+class HashRing:
+    def __init__(self, nodes=(), vnodes: int = 160):
+        self.vnodes = vnodes
+        self._state: Tuple[List[int], List[str], FrozenSet[str]] = ([], [], frozenset())
+        self._write_lock = threading.Lock()
+        for node in nodes:
+            self.add(node)
+
+    def _points(self, node: str) -> List[int]:
+        return sorted(ring_hash(f"{node}#{i}") for i in range(self.vnodes))
+
+    def __contains__(self, node: str) -> bool:
+        return node in self._state[2]
+
+    def __len__(self) -> int:
+        return len(self._state[2])
+
+    def nodes(self) -> List[str]:
+        return sorted(self._state[2])
+
+    # Добавление узла: новые точки вливаются в уже отсортированное кольцо
+    def add(self, node: str):
+        points = self._points(node)
+        with self._write_lock:
+            hashes, owners, members = self._state
+            if node in members:
+                return
+            merged = list(heapq.merge(zip(hashes, owners), ((p, node) for p in points)))
+            self._state = ([h for h, _ in merged], [o for _, o in merged], members | {node})
+
+    def remove(self, node: str):
+        with self._write_lock:
+            hashes, owners, members = self._state
+            if node not in members:
+                return
+            kept = [(h, o) for h, o in zip(hashes, owners) if o != node]
+            self._state = ([h for h, _ in kept], [o for _, o in kept], members - {node})
+
+    # Узлы по часовой стрелке от позиции ключа (без повторов).
+    # Первый узел — владелец ключа, следующие — запасные для повторов
+    def walk(self, key: str) -> Iterator[str]:
+        hashes, owners, members = self._state
+        if not hashes:
+            return
+        start = bisect.bisect_right(hashes, ring_hash(key))
+        seen = set()
+        total = len(members)
+        for offset in range(len(hashes)):
+            node = owners[(start + offset) % len(hashes)]
+            if node not in seen:
+                seen.add(node)
+                yield node
+                if len(seen) == total:
+                    return
+
+    def lookup(self, key: str):
+        return next(self.walk(key), None)
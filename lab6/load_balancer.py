@@ -1,18 +1,125 @@
 from flask import Flask, jsonify, request, redirect, render_template
+from functools import partial
+from urllib.parse import urlencode
+import logging
+import os
+import random
 import requests
 import threading
 import time
+from admission import AdmissionController, BackendOverloaded
+from hash_ring import HashRing
+from metrics import Metrics
+from pool_store import PoolStore
+from response_cache import ResponseCache
+from retry_policy import IDEMPOTENT_METHODS, Hedger, RetryBudget, cancellable_request
+from server_pool import ServerPool
 
 app = Flask(__name__)
+logger = logging.getLogger("load_balancer")
 
-# Начальный пул серверов
-server_pool = [
-    {"url": "http://localhost:5001", "weight": 1, "active": True},
-    {"url": "http://localhost:5002", "weight": 1, "active": True},
-    {"url": "http://localhost:5003", "weight": 1, "active": True}
-]
+# Доля запросов, для которых выбор сервера пишется в журнал (уровень DEBUG)
+SELECTION_LOG_SAMPLE_RATE = float(os.environ.get("LB_SELECTION_LOG_SAMPLE", 0.01))
 
-current_index = 0
+metrics = Metrics()
+
+# Кэш ответов на идемпотентные GET-запросы (LB_CACHE_MAX_BYTES=0 отключает кэш)
+CACHE_MAX_BYTES = int(os.environ.get("LB_CACHE_MAX_BYTES", 16 * 1024 * 1024))
+CACHE_DEFAULT_TTL = float(os.environ.get("LB_CACHE_TTL", 5))
+
+# Таймаут запроса к серверу; столько же объединенные в кэше запросы ждут
+# ответа лидера, прежде чем идти на сервер самостоятельно
+UPSTREAM_TIMEOUT = float(os.environ.get("LB_UPSTREAM_TIMEOUT", 30))
+
+response_cache = ResponseCache(CACHE_MAX_BYTES, CACHE_DEFAULT_TTL,
+                               wait_timeout=UPSTREAM_TIMEOUT) if CACHE_MAX_BYTES > 0 else None
+
+# Повторы идемпотентных запросов на другой сервер при ошибке соединения,
+# ограниченные бюджетом (доля от общего числа запросов)
+MAX_RETRIES = int(os.environ.get("LB_MAX_RETRIES", 2))
+RETRY_BUDGET_RATIO = float(os.environ.get("LB_RETRY_BUDGET_RATIO", 0.2))
+
+# Дублирование медленных запросов на второй сервер после задержки,
+# равной p95 задержки выбранного сервера (LB_HEDGING=1 включает режим)
+HEDGING_ENABLED = os.environ.get("LB_HEDGING", "0") == "1"
+HEDGE_MIN_DELAY = float(os.environ.get("LB_HEDGE_MIN_DELAY_MS", 5)) / 1000
+HEDGE_MIN_SAMPLES = 20
+
+retry_budget = RetryBudget(ratio=RETRY_BUDGET_RATIO)
+hedger = Hedger() if HEDGING_ENABLED else None
+
+# Ограничение одновременных запросов к каждому серверу (0 — без ограничения),
+# очередь ожидания свободного слота и адаптивная подстройка лимита (AIMD)
+MAX_IN_FLIGHT = int(os.environ.get("LB_MAX_IN_FLIGHT", 64))
+QUEUE_SIZE = int(os.environ.get("LB_QUEUE_SIZE", 32))
+QUEUE_TIMEOUT = float(os.environ.get("LB_QUEUE_TIMEOUT_MS", 100)) / 1000
+ADAPTIVE_LIMIT = os.environ.get("LB_ADAPTIVE_LIMIT", "1") == "1"
+
+admission = AdmissionController(
+    max_limit=MAX_IN_FLIGHT,
+    queue_size=QUEUE_SIZE,
+    queue_timeout=QUEUE_TIMEOUT,
+    adaptive=ADAPTIVE_LIMIT
+) if MAX_IN_FLIGHT > 0 else None
+
+# Стратегия выбора сервера: round_robin или consistent_hash (липкая маршрутизация)
+LB_STRATEGY = os.environ.get("LB_STRATEGY", "round_robin")
+# Источник ключа для consistent_hash: ip, header:<имя> или cookie:<имя>
+HASH_KEY_SOURCE = os.environ.get("LB_HASH_KEY", "ip")
+HASH_VNODES = int(os.environ.get("LB_HASH_VNODES", 160))
+
+# Условные заголовки клиента не пересылаются при заполнении кэша:
+# кэшу нужен полный ответ, а не 304
+CONDITIONAL_HEADERS = {"if-none-match", "if-modified-since"}
+
+# Порт балансировщика и начальный пул серверов
+# (LB_SERVERS — список URL через запятую)
+LB_PORT = int(os.environ.get("LB_PORT", 5000))
+DEFAULT_SERVERS = "http://localhost:5001,http://localhost:5002,http://localhost:5003"
+
+# Файл, в котором сохраняется пул вместе с последним известным состоянием
+# серверов (пустое значение отключает сохранение)
+POOL_FILE = os.environ.get("LB_POOL_FILE", "server_pool.json")
+POOL_RELOAD_INTERVAL = float(os.environ.get("LB_POOL_RELOAD_INTERVAL", 1))
+
+pool_store = PoolStore(POOL_FILE) if POOL_FILE else None
+
+# Начальный пул: явно заданный LB_SERVERS, иначе сохраненный файл
+# (сервер, бывший недоступным, стартует неактивным до проверки здоровья),
+# иначе пул по умолчанию
+def initial_servers():
+    if "LB_SERVERS" not in os.environ and pool_store:
+        saved = pool_store.load()
+        if saved is not None:
+            return saved
+    urls = os.environ.get("LB_SERVERS", DEFAULT_SERVERS).split(",")
+    return [{"url": url.strip(), "weight": 1, "active": True} for url in urls if url.strip()]
+
+server_pool = ServerPool(
+    initial_servers(),
+    HashRing(vnodes=HASH_VNODES) if LB_STRATEGY == "consistent_hash" else None
+)
+
+# Сохранение текущего пула в файл
+def persist_pool():
+    if pool_store:
+        try:
+            pool_store.save(server_pool.snapshot)
+        except OSError as e:
+            logger.warning("Не удалось сохранить пул серверов: %s", e)
+
+# Удаление метрик и ограничителей серверов, убранных из пула
+def prune_backend_state():
+    urls = [server['url'] for server in server_pool.snapshot()]
+    metrics.retain(urls)
+    if admission:
+        admission.retain(urls)
+
+# Применение изменений, внесенных в файл пула извне
+def reload_pool(servers):
+    server_pool.sync(servers)
+    prune_backend_state()
+    print(f"Пул серверов перезагружен из {POOL_FILE}: {len(servers)} серверов")
 
 def health_check(server):
     try:
@@ -26,37 +133,50 @@ def health_check(server):
 def background_health_check():
     while True:
         active_count = 0
-        for server in server_pool:
+        changed = False
+        snapshot = server_pool.snapshot()
+        for server in snapshot:
             is_healthy = health_check(server)
-            server['active'] = is_healthy
+            if is_healthy != server['active']:
+                server_pool.set_active(server['url'], is_healthy)
+                changed = True
             status = "Доступен" if is_healthy else "Недоступен"
             if is_healthy:
                 active_count += 1
             print(f"{server['url']}: {status}")
-        print(f"Активных серверов: {active_count}/{len(server_pool)}")
+        print(f"Активных серверов: {active_count}/{len(snapshot)}")
+        if changed:
+            persist_pool()
         time.sleep(5)
 
-def get_next_server():
-    global current_index
-    start_index = current_index
-    
-    for i in range(len(server_pool)):
-        server = server_pool[current_index]
-        current_index = (current_index + 1) % len(server_pool)
-        
-        if server['active']:
-            print(f"Выбран сервер: {server['url']}")
-            return server
-            
-        if current_index == start_index:
-            break
-            
-    return None
+# Ключ липкой маршрутизации для текущего запроса
+def routing_key():
+    source, _, name = HASH_KEY_SOURCE.partition(':')
+    value = None
+    if source == 'header':
+        value = request.headers.get(name)
+    elif source == 'cookie':
+        value = request.cookies.get(name)
+    return value or request.remote_addr or ''
+
+def get_next_server(exclude=None, key=None):
+    if key is not None and server_pool.hash_ring is not None:
+        server = server_pool.server_for_key(key, exclude)
+    else:
+        server = server_pool.next_server(exclude)
+    if server and logger.isEnabledFor(logging.DEBUG) and random.random() < SELECTION_LOG_SAMPLE_RATE:
+        logger.debug("Выбран сервер: %s", server['url'])
+    return server
 
 # Запускаем поток с проверкой здоровья
 health_thread = threading.Thread(target=background_health_check, daemon=True)
 health_thread.start()
 
+# Сохраняем начальный пул и следим за изменениями файла
+if pool_store:
+    persist_pool()
+    pool_store.watch(reload_pool, POOL_RELOAD_INTERVAL)
+
 @app.route('/health', methods=['GET'])
 def lb_health():
     server_statuses = []
@@ -65,38 +185,194 @@ def lb_health():
             "url": server['url'],
             "active": server['active']
         })
-    return jsonify({"server_pool": server_statuses})
+    result = {"strategy": LB_STRATEGY, "server_pool": server_statuses}
+    if response_cache:
+        result["cache"] = response_cache.stats()
+    return jsonify(result)
 
-@app.route('/process', methods=['GET', 'POST'])
-def lb_process():
-    target_server = get_next_server()
-    if not target_server:
-        return jsonify({"error": "Нет доступных серверов"}), 503
+# Параметры исходящего запроса; собираются в потоке обработчика, так как
+# объект request Flask недоступен из потоков дублирующих запросов
+def build_upstream_request(path, headers=None):
+    if headers is None:
+        headers = {key: value for (key, value) in request.headers if key != 'Host'}
+    return {
+        "method": request.method,
+        "path": path,
+        "headers": headers,
+        "data": request.get_data(),
+        "params": request.args,
+        "cookies": request.cookies,
+        "routing_key": routing_key() if server_pool.hash_ring is not None else None,
+    }
 
+# Отправка запроса на конкретный сервер с записью метрик.
+# Если сервер перегружен, выбрасывается BackendOverloaded.
+# Запрос с cancellation можно прервать из другого потока (дублирование)
+def send_to_server(server, upstream, cancellation=None):
+    limiter = admission.limiter(server['url']) if admission else None
+    if limiter:
+        limiter.acquire()
+
+    stats = metrics.backend(server['url'])
+    stats.start()
+    started = time.perf_counter()
+    status_code = None
+    send = requests.request if cancellation is None else partial(cancellable_request, cancellation)
     try:
-        response = requests.request(
-            method=request.method,
-            url=f"{target_server['url']}/process",
-            headers={key: value for (key, value) in request.headers if key != 'Host'},
-            data=request.get_data(),
-            params=request.args,
-            cookies=request.cookies,
-            allow_redirects=False
+        response = send(
+            method=upstream['method'],
+            url=f"{server['url']}/{upstream['path']}",
+            headers=upstream['headers'],
+            data=upstream['data'],
+            params=upstream['params'],
+            cookies=upstream['cookies'],
+            allow_redirects=False,
+            timeout=UPSTREAM_TIMEOUT
         )
-        return (response.content, response.status_code, response.headers.items())
+        status_code = response.status_code
+        return response
+    finally:
+        latency = time.perf_counter() - started
+        if status_code is None and cancellation is not None and cancellation.cancelled:
+            # Прерванный проигравший запрос — не ошибка сервера
+            stats.abandon()
+            if limiter:
+                limiter.release(latency, True)
+        else:
+            stats.finish(latency, status_code)
+            if limiter:
+                limiter.release(latency, status_code is not None and status_code < 500)
+
+# Задержка перед дублирующим запросом: p95 задержки сервера;
+# None, если наблюдений еще слишком мало
+def hedge_delay(server):
+    stats = metrics.backend(server['url'])
+    if stats.latency.count < HEDGE_MIN_SAMPLES:
+        return None
+    return max(stats.quantile(0.95), HEDGE_MIN_DELAY)
+
+# Отправка с дублированием на запасной сервер, если основной отвечает дольше p95
+def send_hedged(server, upstream, tried):
+    delay = hedge_delay(server)
+    if delay is None:
+        return send_to_server(server, upstream)
+
+    def pick_secondary():
+        secondary = get_next_server(exclude=tried, key=upstream['routing_key'])
+        if not secondary or not retry_budget.try_withdraw():
+            return None
+        tried.add(secondary['url'])
+        return partial(send_to_server, secondary, upstream)
+
+    return hedger.run(partial(send_to_server, server, upstream), delay, pick_secondary)
+
+# Пересылка текущего запроса на следующий сервер; None, если серверов нет.
+# Идемпотентные запросы при ошибке соединения повторяются на другом сервере
+def forward_request(path, headers=None):
+    upstream = build_upstream_request(path, headers)
+    idempotent = upstream['method'] in IDEMPOTENT_METHODS
+    attempts = 1 + (MAX_RETRIES if idempotent else 0)
+    retry_budget.deposit()
+
+    tried = set()
+    last_error = None
+    for attempt in range(attempts):
+        target_server = get_next_server(exclude=tried, key=upstream['routing_key'])
+        if not target_server:
+            break
+        if attempt > 0 and not retry_budget.try_withdraw():
+            break
+        tried.add(target_server['url'])
+
+        try:
+            if hedger and idempotent:
+                return send_hedged(target_server, upstream, tried)
+            return send_to_server(target_server, upstream)
+        except requests.exceptions.RequestException as e:
+            last_error = e
+            logger.warning("Ошибка запроса к %s: %s", target_server['url'], e)
+
+    if last_error is not None:
+        raise last_error
+    return None
+
+# Обработка запроса через кэш ответов
+def cached_proxy_request(path):
+    cache_key = f"/{path}?{urlencode(sorted(request.args.items(multi=True)))}"
+    headers = {key: value for (key, value) in request.headers
+               if key != 'Host' and key.lower() not in CONDITIONAL_HEADERS}
+
+    def fetch(etag):
+        upstream_headers = dict(headers)
+        if etag:
+            upstream_headers['If-None-Match'] = etag
+        return forward_request(path, upstream_headers)
+
+    cached = response_cache.get_or_fetch(cache_key, fetch)
+    if cached is None:
+        return None
+    if cached.etag and cached.etag == request.headers.get('If-None-Match'):
+        return (b'', 304, [(k, v) for k, v in cached.headers if k.lower() == 'etag'])
+    return (cached.content, cached.status_code, cached.headers)
+
+def proxy_request(path, use_cache=False):
+    try:
+        if use_cache and response_cache and ResponseCache.is_request_cacheable(request.method, request.headers):
+            result = cached_proxy_request(path)
+        else:
+            response = forward_request(path)
+            result = None
+            if response is not None:
+                result = (response.content, response.status_code, response.headers.items())
+    except BackendOverloaded:
+        return jsonify({"error": "Сервер перегружен, повторите запрос позже"}), 503, {"Retry-After": "1"}
     except requests.exceptions.RequestException as e:
         return jsonify({"error": f"Ошибка подключения к серверу: {str(e)}"}), 502
 
+    if result is None:
+        return jsonify({"error": "Нет доступных серверов"}), 503
+    return result
+
+# Монотонные счетчики в статистике бюджета повторов, дублирования и кэша;
+# остальные значения экспортируются как gauge
+COUNTER_STATS = {"retries", "exhausted", "hedged", "hedge_wins", "hits", "misses",
+                 "coalesced", "coalesce_timeouts", "revalidated", "evictions", "bytes_saved"}
+
+# Метрики в текстовом формате Prometheus
+@app.route('/metrics', methods=['GET'])
+def lb_metrics():
+    sources = [("lb_retry_", retry_budget.stats())]
+    if hedger:
+        sources.append(("lb_", hedger.stats()))
+    if response_cache:
+        sources.append(("lb_cache_", response_cache.stats()))
+    gauges, counters = {}, {}
+    for prefix, values in sources:
+        for name, value in values.items():
+            (counters if name in COUNTER_STATS else gauges)[prefix + name] = value
+    body = metrics.render_prometheus(gauges, counters)
+    if admission:
+        body += admission.render_prometheus()
+    return body, 200, {"Content-Type": "text/plain; version=0.0.4; charset=utf-8"}
+
+@app.route('/process', methods=['GET', 'POST'])
+def lb_process():
+    return proxy_request('process')
+
 # Web UI для управления пулом инстансов
 @app.route('/', methods=['GET'])
 def web_ui():
-    active_count = sum(1 for server in server_pool if server['active'])
+    servers = server_pool.snapshot()
+    active_count = sum(1 for server in servers if server['active'])
     return render_template(
         'admin.html', 
-        servers=server_pool,
+        servers=servers,
         active_count=active_count,
-        total_count=len(server_pool),
-        current_index=current_index
+        total_count=len(servers),
+        current_index=server_pool.current_index,
+        cache_stats=response_cache.stats() if response_cache else None,
+        backend_metrics=metrics.summary(),
+        admission_stats=admission.stats() if admission else {}
     )
 
 # Добавление нового инстанса в пул
@@ -110,9 +386,8 @@ def add_instance():
     
     new_server_url = f"http://{ip}:{port}"
     
-    for server in server_pool:
-        if server['url'] == new_server_url:
-            return "Ошибка: Сервер уже существует в пуле", 400
+    if any(server['url'] == new_server_url for server in server_pool.snapshot()):
+        return "Ошибка: Сервер уже существует в пуле", 400
     
     is_healthy = health_check({"url": new_server_url})
     
@@ -121,8 +396,10 @@ def add_instance():
         "weight": 1,
         "active": is_healthy
     }
-    server_pool.append(new_server)
+    if not server_pool.add(new_server):
+        return "Ошибка: Сервер уже существует в пуле", 400
     
+    persist_pool()
     print(f"Добавлен новый сервер: {new_server_url} (Активен: {is_healthy})")
     return redirect('/')
 
@@ -131,49 +408,33 @@ def add_instance():
 def remove_instance():
     try:
         index = int(request.form.get('index'))
-        if 0 <= index < len(server_pool):
-            removed_server = server_pool.pop(index)
-            
-            global current_index
-            if current_index >= len(server_pool) and len(server_pool) > 0:
-                current_index = current_index % len(server_pool)
-            
+        removed_server = server_pool.remove_at(index)
+        if removed_server:
+            persist_pool()
+            prune_backend_state()
             print(f"Удален сервер: {removed_server['url']}")
             return redirect('/')
         else:
             return "Ошибка: Неверный индекс сервера", 400
-    except ValueError:
+    except (TypeError, ValueError):
         return "Ошибка: Неверный формат индекса", 400
 
 # Универсальный обработчик для перехвата всех других запросов
 @app.route('/<path:path>', methods=['GET', 'POST', 'PUT', 'DELETE', 'PATCH'])
 def catch_all(path):
-    target_server = get_next_server()
-    if not target_server:
-        return jsonify({"error": "Нет доступных серверов"}), 503
-    
-    try:
-        response = requests.request(
-            method=request.method,
-            url=f"{target_server['url']}/{path}",
-            headers={key: value for (key, value) in request.headers if key != 'Host'},
-            data=request.get_data(),
-            params=request.args,
-            cookies=request.cookies,
-            allow_redirects=False
-        )
-        return (response.content, response.status_code, response.headers.items())
-    except requests.exceptions.RequestException as e:
-        return jsonify({"error": f"Ошибка подключения к серверу: {str(e)}"}), 502
+    return proxy_request(path, use_cache=True)
 
 if __name__ == '__main__':
-    print("Балансировщик нагрузки запущен на http://localhost:5000")
+    logging.basicConfig(level=os.environ.get("LB_LOG_LEVEL", "INFO"),
+                        format="%(asctime)s %(levelname)s %(message)s")
+    print(f"Балансировщик нагрузки запущен на http://localhost:{LB_PORT}")
     print("Доступные эндпоинты:")
-    print("   - http://localhost:5000/ (Web интерфейс)")
-    print("   - http://localhost:5000/health (Проверка состояния)")
-    print("   - http://localhost:5000/process (Тест балансировки)")
+    print(f"   - http://localhost:{LB_PORT}/ (Web интерфейс)")
+    print(f"   - http://localhost:{LB_PORT}/health (Проверка состояния)")
+    print(f"   - http://localhost:{LB_PORT}/process (Тест балансировки)")
+    print(f"   - http://localhost:{LB_PORT}/metrics (Метрики Prometheus)")
     print("\nНачальный пул серверов:")
-    for i, server in enumerate(server_pool):
+    for i, server in enumerate(server_pool.snapshot()):
         print(f"   {i+1}. {server['url']}")
-    app.run(port=5000, debug=True)
+    app.run(port=LB_PORT, debug=os.environ.get("LB_DEBUG", "1") == "1")
     
\ No newline at end of file
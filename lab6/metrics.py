@@ -0,0 +1,192 @@
+import bisect
+import threading
+from typing import Dict, Iterable, List, Optional
+
+# Границы корзин гистограммы задержек (в секундах)
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                   0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+# Гистограмма с фиксированными корзинами, как в Prometheus
+class Histogram:
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # последняя корзина — +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    # Оценка квантиля линейной интерполяцией внутри корзины
+    def quantile(self, q: float) -> Optional[float]:
+        if self.count == 0:
+            return None
+        rank = q * self.count
+        seen = 0
+        lower = 0.0
+        for i, bucket_count in enumerate(self.counts):
+            upper = self.buckets[i] if i < len(self.buckets) else self.buckets[-1]
+            if bucket_count and seen + bucket_count >= rank:
+                return lower + (upper - lower) * (rank - seen) / bucket_count
+            seen += bucket_count
+            lower = upper
+        return self.buckets[-1]
+
+    # Накопительные значения корзин для экспорта
+    def cumulative(self) -> List[int]:
+        result = []
+        total = 0
+        for bucket_count in self.counts:
+            total += bucket_count
+            result.append(total)
+        return result
+
+
+# Метрики одного бэкенда; у каждого свой замок, поэтому запросы
+# к разным серверам не конкурируют между собой
+class BackendStats:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+        self.cancelled = 0
+        self.in_flight = 0
+        self.responses: Dict[int, int] = {}
+        self.latency = Histogram()
+
+    def start(self):
+        with self._lock:
+            self.in_flight += 1
+
+    def finish(self, latency: float, status_code: Optional[int]):
+        with self._lock:
+            self.in_flight -= 1
+            self.requests += 1
+            self.latency.observe(latency)
+            if status_code is None or status_code >= 500:
+                self.errors += 1
+            if status_code is not None:
+                self.responses[status_code] = self.responses.get(status_code, 0) + 1
+
+    # Запрос прерван балансировщиком (проиграл дублирующему): не ответ и не ошибка
+    def abandon(self):
+        with self._lock:
+            self.in_flight -= 1
+            self.cancelled += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        with self._lock:
+            return self.latency.quantile(q)
+
+    # Согласованная копия счетчиков для экспорта
+    def export(self) -> Dict:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "errors": self.errors,
+                "cancelled": self.cancelled,
+                "in_flight": self.in_flight,
+                "responses": dict(self.responses),
+                "buckets": self.latency.cumulative(),
+                "latency_sum": self.latency.sum,
+                "latency_count": self.latency.count,
+            }
+
+    def summary(self) -> Dict:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "errors": self.errors,
+                "in_flight": self.in_flight,
+                "avg_latency_ms": round(self.latency.sum / self.requests * 1000, 2) if self.requests else None,
+                "p50_ms": _to_ms(self.latency.quantile(0.5)),
+                "p95_ms": _to_ms(self.latency.quantile(0.95)),
+                "p99_ms": _to_ms(self.latency.quantile(0.99)),
+            }
+
+
+def _to_ms(seconds: Optional[float]) -> Optional[float]:
+    return round(seconds * 1000, 2) if seconds is not None else None
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+# Реестр метрик балансировщика по бэкендам
+class Metrics:
+    def __init__(self):
+        self._backends: Dict[str, BackendStats] = {}
+        self._lock = threading.Lock()
+
+    def backend(self, url: str) -> BackendStats:
+        stats = self._backends.get(url)
+        if stats is None:
+            with self._lock:
+                stats = self._backends.setdefault(url, BackendStats())
+        return stats
+
+    # Удаление серий серверов, которых больше нет в пуле
+    def retain(self, urls: Iterable[str]):
+        keep = set(urls)
+        with self._lock:
+            for url in [url for url in self._backends if url not in keep]:
+                del self._backends[url]
+
+    def summary(self) -> Dict[str, Dict]:
+        return {url: stats.summary() for url, stats in list(self._backends.items())}
+
+    # Экспорт в текстовом формате Prometheus; extra_counters — монотонные
+    # счетчики (к имени добавляется суффикс _total), extra_gauges — текущие значения
+    def render_prometheus(self, extra_gauges: Optional[Dict[str, float]] = None,
+                          extra_counters: Optional[Dict[str, float]] = None) -> str:
+        backends = sorted(self._backends.items())
+        lines = []
+
+        def family(name, kind, help_text):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        snapshots = [(_escape(url), stats.export()) for url, stats in backends]
+
+        family("lb_backend_requests_total", "counter", "Requests forwarded to the backend")
+        for label, data in snapshots:
+            lines.append(f'lb_backend_requests_total{{backend="{label}"}} {data["requests"]}')
+
+        family("lb_backend_errors_total", "counter", "Connection errors and 5xx responses")
+        for label, data in snapshots:
+            lines.append(f'lb_backend_errors_total{{backend="{label}"}} {data["errors"]}')
+
+        family("lb_backend_cancelled_total", "counter", "Requests cancelled after losing to a hedged request")
+        for label, data in snapshots:
+            lines.append(f'lb_backend_cancelled_total{{backend="{label}"}} {data["cancelled"]}')
+
+        family("lb_backend_responses_total", "counter", "Backend responses by status code")
+        for label, data in snapshots:
+            for code, count in sorted(data["responses"].items()):
+                lines.append(f'lb_backend_responses_total{{backend="{label}",code="{code}"}} {count}')
+
+        family("lb_backend_in_flight", "gauge", "Requests currently in flight to the backend")
+        for label, data in snapshots:
+            lines.append(f'lb_backend_in_flight{{backend="{label}"}} {data["in_flight"]}')
+
+        family("lb_backend_latency_seconds", "histogram", "Backend response latency")
+        bounds = [str(b) for b in LATENCY_BUCKETS] + ["+Inf"]
+        for label, data in snapshots:
+            for bound, value in zip(bounds, data["buckets"]):
+                lines.append(f'lb_backend_latency_seconds_bucket{{backend="{label}",le="{bound}"}} {value}')
+            lines.append(f'lb_backend_latency_seconds_sum{{backend="{label}"}} {data["latency_sum"]}')
+            lines.append(f'lb_backend_latency_seconds_count{{backend="{label}"}} {data["latency_count"]}')
+
+        for name, value in (extra_counters or {}).items():
+            family(f"{name}_total", "counter", name.replace("_", " "))
+            lines.append(f"{name}_total {value}")
+
+        for name, value in (extra_gauges or {}).items():
+            family(name, "gauge", name.replace("_", " "))
+            lines.append(f"{name} {value}")
+
+        return "\n".join(lines) + "\n"
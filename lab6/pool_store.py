@@ -0,0 +1,104 @@
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional, Union
+
+POOL_FIELDS = ("url", "weight", "active")
+
+logger = logging.getLogger(__name__)
+
+
+# Хранение конфигурации пула серверов в JSON-файле.
+# Запись атомарная (временный файл + os.replace), поэтому читатель никогда
+# не увидит наполовину записанный файл. Изменения, сделанные другим
+# процессом или вручную, обнаруживаются по сигнатуре файла.
+class PoolStore:
+    def __init__(self, path: str):
+        self.path = path
+        self._signature = None
+        self._lock = threading.Lock()
+
+    def _stat_signature(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, st.st_size, st.st_mtime_ns)
+
+    # Загрузка пула; None, если файла нет, он поврежден или имеет другую структуру
+    def load(self) -> Optional[List[Dict[str, Any]]]:
+        with self._lock:
+            signature = self._stat_signature()
+            try:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+            except (FileNotFoundError, json.JSONDecodeError, UnicodeDecodeError):
+                return None
+            self._signature = signature
+
+        if not isinstance(data, dict) or not isinstance(data.get("servers", []), list):
+            logger.warning("Файл пула %s не содержит объект со списком servers", self.path)
+            return None
+        servers = []
+        for server in data.get("servers", []):
+            if not isinstance(server, dict) or not server.get("url"):
+                continue
+            servers.append({
+                "url": server["url"],
+                "weight": server.get("weight", 1),
+                "active": bool(server.get("active", False)),
+            })
+        return servers
+
+    # servers — список серверов или функция, возвращающая текущий список.
+    # Функция вызывается под блокировкой записи, поэтому при параллельных
+    # сохранениях последним в файл попадает самый свежий снимок
+    def save(self, servers: Union[Iterable[Dict[str, Any]], Callable[[], Iterable[Dict[str, Any]]]]):
+        directory = os.path.dirname(os.path.abspath(self.path))
+        with self._lock:
+            if callable(servers):
+                servers = servers()
+            data = {
+                "saved_at": datetime.now().isoformat(),
+                "servers": [{field: server[field] for field in POOL_FIELDS} for server in servers],
+            }
+            fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".pool-", suffix=".tmp")
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    json.dump(data, f, indent=2, ensure_ascii=False)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp_path, self.path)
+            except BaseException:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                raise
+            self._signature = self._stat_signature()
+
+    # Изменен ли файл кем-то кроме нас с момента последнего чтения/записи
+    def changed_on_disk(self) -> bool:
+        signature = self._stat_signature()
+        return signature is not None and signature != self._signature
+
+    # Фоновое отслеживание изменений файла; on_change получает новый список
+    # серверов. Ошибка одной проверки записывается в журнал и не
+    # останавливает отслеживание
+    def watch(self, on_change: Callable[[List[Dict[str, Any]]], None], interval: float = 1.0):
+        def loop():
+            while True:
+                time.sleep(interval)
+                try:
+                    if self.changed_on_disk():
+                        servers = self.load()
+                        if servers is not None:
+                            on_change(servers)
+                except Exception:
+                    logger.exception("Ошибка перезагрузки пула из %s", self.path)
+
+        thread = threading.Thread(target=loop, daemon=True)
+        thread.start()
+        return thread
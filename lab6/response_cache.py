@@ -0,0 +1,226 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+# Заголовки, которые не сохраняются в кэше: они относятся к конкретному
+# соединению или описывают уже декодированное тело
+SKIPPED_HEADERS = {
+    "connection", "keep-alive", "transfer-encoding", "content-encoding",
+    "content-length", "age",
+}
+
+CACHEABLE_STATUSES = {200, 203, 204, 300, 301, 404, 410}
+
+
+# Разбор заголовка Cache-Control в словарь директив
+def parse_cache_control(value: Optional[str]) -> Dict[str, Optional[str]]:
+    directives = {}
+    if not value:
+        return directives
+    for part in value.split(","):
+        name, _, argument = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = argument.strip('"') or None
+    return directives
+
+
+# Закэшированный ответ вышестоящего сервера
+class CachedResponse:
+    def __init__(self, content: bytes, status_code: int, headers: List[Tuple[str, str]],
+                 etag: Optional[str], ttl: float):
+        self.content = content
+        self.status_code = status_code
+        self.headers = headers
+        self.etag = etag
+        self.expires_at = time.monotonic() + ttl
+        self.size = len(content) + sum(len(k) + len(v) for k, v in headers)
+
+    def is_fresh(self) -> bool:
+        return time.monotonic() < self.expires_at
+
+
+# Результат запроса, который ждут объединенные (coalesced) запросы
+class _InFlight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.response: Any = None
+        self.error: Optional[BaseException] = None
+        self.shared = False
+
+
+# LRU-кэш ответов с TTL, ограничением по памяти, поддержкой
+# Cache-Control/ETag и объединением одновременных одинаковых запросов.
+# Объединенный запрос ждет лидера не дольше wait_timeout секунд (таймаут
+# запроса к серверу), после чего выполняет собственный запрос
+class ResponseCache:
+    def __init__(self, max_bytes: int = 16 * 1024 * 1024, default_ttl: float = 5.0,
+                 max_entry_bytes: Optional[int] = None, wait_timeout: Optional[float] = None):
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.max_entry_bytes = max_entry_bytes or max(max_bytes // 8, 1)
+        self.wait_timeout = wait_timeout
+        self._entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self._in_flight: Dict[str, _InFlight] = {}
+        self._lock = threading.Lock()
+        self.bytes_used = 0
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.coalesce_timeouts = 0
+        self.revalidated = 0
+        self.evictions = 0
+        self.bytes_saved = 0
+
+    # Можно ли обслужить запрос из кэша (по заголовкам клиента). Ключ кэша —
+    # только путь и параметры, поэтому запросы с Cookie (ответ может зависеть
+    # от пользователя) идут на сервер мимо кэша
+    @staticmethod
+    def is_request_cacheable(method: str, headers) -> bool:
+        if method != "GET" or headers.get("Authorization") or headers.get("Cookie"):
+            return False
+        directives = parse_cache_control(headers.get("Cache-Control"))
+        if "no-store" in directives or "no-cache" in directives:
+            return False
+        return "no-cache" not in headers.get("Pragma", "").lower()
+
+    # Время жизни ответа по его заголовкам; None, если ответ нельзя кэшировать
+    def response_ttl(self, status_code: int, headers) -> Optional[float]:
+        if status_code not in CACHEABLE_STATUSES:
+            return None
+        if headers.get("Vary") or headers.get("Set-Cookie"):
+            return None
+        directives = parse_cache_control(headers.get("Cache-Control"))
+        if {"no-store", "no-cache", "private"} & directives.keys():
+            return None
+        for name in ("s-maxage", "max-age"):
+            if name in directives:
+                try:
+                    ttl = float(directives[name])
+                except (TypeError, ValueError):
+                    return None
+                return ttl if ttl > 0 else None
+        return self.default_ttl if self.default_ttl > 0 else None
+
+    # Получение ответа из кэша или от сервера.
+    # fetch(etag) выполняет запрос к серверу (с If-None-Match, если etag задан)
+    # и возвращает объект ответа requests или None, если серверов нет.
+    def get_or_fetch(self, key: str, fetch: Callable[[Optional[str]], Any]):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.is_fresh():
+                self._entries.move_to_end(key)
+                self.hits += 1
+                self.bytes_saved += entry.size
+                return entry
+
+            in_flight = self._in_flight.get(key)
+            leader = in_flight is None
+            if leader:
+                in_flight = _InFlight()
+                self._in_flight[key] = in_flight
+
+        if not leader:
+            if not in_flight.done.wait(self.wait_timeout):
+                # Лидер завис — не держим поток, идем на сервер сами
+                with self._lock:
+                    self.coalesce_timeouts += 1
+                return self._to_cached(fetch(None))
+            if in_flight.error is not None:
+                raise in_flight.error
+            if in_flight.shared:
+                with self._lock:
+                    self.coalesced += 1
+                    self.bytes_saved += in_flight.response.size
+                return in_flight.response
+            # Ответ лидера не подлежит разделению (например, private) —
+            # выполняем собственный запрос
+            return self._to_cached(fetch(None))
+
+        try:
+            response, shared = self._fetch_and_store(key, entry, fetch)
+            in_flight.response = response
+            in_flight.shared = shared
+            return response
+        except BaseException as e:
+            in_flight.error = e
+            raise
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+            in_flight.done.set()
+
+    # Запрос к серверу (или повторная валидация по ETag) и сохранение ответа.
+    # Возвращает ответ и признак того, что его можно отдать объединенным запросам
+    def _fetch_and_store(self, key: str, stale: Optional[CachedResponse], fetch):
+        etag = stale.etag if stale is not None else None
+        response = fetch(etag)
+        if response is None:
+            return None, False
+
+        if response.status_code == 304 and stale is not None:
+            ttl = self.response_ttl(stale.status_code, response.headers) or 0
+            with self._lock:
+                stale.expires_at = time.monotonic() + ttl
+                if key in self._entries:
+                    self._entries.move_to_end(key)
+                self.revalidated += 1
+                self.bytes_saved += stale.size
+            return stale, True
+
+        with self._lock:
+            self.misses += 1
+        ttl = self.response_ttl(response.status_code, response.headers)
+        cached = self._to_cached(response, ttl or 0)
+        if ttl is None:
+            return cached, False
+        return cached, self._store(key, cached)
+
+    # Преобразование ответа requests в CachedResponse
+    @staticmethod
+    def _to_cached(response, ttl: float = 0) -> Optional[CachedResponse]:
+        if response is None:
+            return None
+        headers = [(k, v) for k, v in response.headers.items()
+                   if k.lower() not in SKIPPED_HEADERS]
+        return CachedResponse(response.content, response.status_code, headers,
+                              response.headers.get("ETag"), ttl)
+
+    def _store(self, key: str, entry: CachedResponse) -> bool:
+        if entry.size > self.max_entry_bytes:
+            return False
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self.bytes_used -= old.size
+            self._entries[key] = entry
+            self.bytes_used += entry.size
+            while self.bytes_used > self.max_bytes and self._entries:
+                _, evicted = self._entries.popitem(last=False)
+                self.bytes_used -= evicted.size
+                self.evictions += 1
+        return True
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes_used = 0
+
+    # Статистика для /health и панели управления
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses + self.coalesced + self.revalidated
+            served = self.hits + self.coalesced + self.revalidated
+            return {
+                "entries": len(self._entries),
+                "bytes_used": self.bytes_used,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "coalesced": self.coalesced,
+                "coalesce_timeouts": self.coalesce_timeouts,
+                "revalidated": self.revalidated,
+                "evictions": self.evictions,
+                "hit_rate": round(served / lookups, 4) if lookups else 0.0,
+                "bytes_saved": self.bytes_saved,
+            }
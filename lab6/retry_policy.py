@@ -0,0 +1,252 @@
+import heapq
+import itertools
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+# Методы, повтор которых не меняет результат на сервере
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+
+
+# Бюджет повторов: каждый исходный запрос пополняет бюджет на ratio,
+# каждый повтор или дублирующий запрос тратит одну единицу. Кроме того,
+# бюджет равномерно пополняется на min_per_second в секунду, чтобы при малой
+# нагрузке повторы тоже были возможны. Так повторы не могут увеличить
+# нагрузку на серверы больше чем в (1 + ratio) раз.
+class RetryBudget:
+    def __init__(self, ratio: float = 0.2, min_per_second: float = 10.0, max_tokens: float = 100.0):
+        self.ratio = ratio
+        self.min_per_second = min_per_second
+        self.max_tokens = max_tokens
+        self._tokens = min_per_second
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self.retries = 0
+        self.exhausted = 0
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.max_tokens, self._tokens + (now - self._updated) * self.min_per_second)
+        self._updated = now
+
+    # Учет исходного запроса
+    def deposit(self):
+        with self._lock:
+            self._refill()
+            self._tokens = min(self.max_tokens, self._tokens + self.ratio)
+
+    # Попытка потратить единицу бюджета на повтор
+    def try_withdraw(self) -> bool:
+        with self._lock:
+            self._refill()
+            if self._tokens >= 1:
+                self._tokens -= 1
+                self.retries += 1
+                return True
+            self.exhausted += 1
+            return False
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._refill()
+            return {
+                "tokens": round(self._tokens, 2),
+                "retries": self.retries,
+                "exhausted": self.exhausted,
+            }
+
+
+# Отмена операции из другого потока: обработчики, зарегистрированные через
+# on_cancel, вызываются при cancel() или сразу, если отмена уже произошла
+class Cancellation:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._callbacks: List[Callable[[], None]] = []
+        self.cancelled = False
+
+    def on_cancel(self, callback: Callable[[], None]):
+        with self._lock:
+            if not self.cancelled:
+                self._callbacks.append(callback)
+                return
+        callback()
+
+    def cancel(self):
+        with self._lock:
+            if self.cancelled:
+                return
+            self.cancelled = True
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            callback()
+
+
+# Отмена, действующая для запросов текущего потока (см. cancellable_request)
+_active = threading.local()
+
+
+# Соединение, которое при отмене закрывает свой сокет: ожидающий ответа
+# поток сразу получает ошибку соединения
+class _AbortableMixin:
+    def request(self, *args, **kwargs):
+        super().request(*args, **kwargs)
+        cancellation = getattr(_active, "cancellation", None)
+        if cancellation is not None:
+            cancellation.on_cancel(self._abort)
+
+    def _abort(self):
+        sock = self.sock
+        if sock is not None:
+            try:
+                sock.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+
+class _AbortableHTTPConnection(_AbortableMixin, HTTPConnection):
+    pass
+
+
+class _AbortableHTTPSConnection(_AbortableMixin, HTTPSConnection):
+    pass
+
+
+class _AbortableHTTPPool(HTTPConnectionPool):
+    ConnectionCls = _AbortableHTTPConnection
+
+
+class _AbortableHTTPSPool(HTTPSConnectionPool):
+    ConnectionCls = _AbortableHTTPSConnection
+
+
+class _AbortableAdapter(HTTPAdapter):
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {"http": _AbortableHTTPPool, "https": _AbortableHTTPSPool}
+
+
+# requests.request, который прерывается вызовом cancellation.cancel()
+# из другого потока (запрос завершается requests.exceptions.ConnectionError)
+def cancellable_request(cancellation: Cancellation, method: str, url: str, **kwargs):
+    with requests.Session() as session:
+        adapter = _AbortableAdapter()
+        session.mount("http://", adapter)
+        session.mount("https://", adapter)
+        _active.cancellation = cancellation
+        try:
+            return session.request(method, url, **kwargs)
+        finally:
+            _active.cancellation = None
+
+
+# Состояние одного запроса с дублированием
+class _HedgedCall:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.primary_done = False
+        self.winner: Optional[str] = None
+        self.hedge = None  # Future дублирующего запроса, если он запущен
+        self.primary_cancel = Cancellation()
+        self.secondary_cancel = Cancellation()
+
+
+# Отправка запроса с дублированием (hedging): основной запрос выполняется в
+# потоке обработчика; если он не ответил за delay секунд, тот же запрос
+# отправляется на запасной сервер в пуле потоков. Используется ответ,
+# пришедший первым, а проигравший запрос прерывается. Таймеры всех запросов
+# обслуживает один поток, поэтому пул занят только реально отправленными дублями.
+class Hedger:
+    def __init__(self, max_workers: int = 32):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="hedge")
+        self._lock = threading.Lock()
+        self._timers: list = []  # (срок, номер, функция)
+        self._timer_seq = itertools.count()
+        self._timer_cond = threading.Condition()
+        self._timer_thread = threading.Thread(target=self._run_timers, daemon=True)
+        self._timer_thread.start()
+        self.hedged = 0
+        self.hedge_wins = 0
+
+    def _schedule(self, deadline: float, callback: Callable[[], None]):
+        with self._timer_cond:
+            heapq.heappush(self._timers, (deadline, next(self._timer_seq), callback))
+            self._timer_cond.notify()
+
+    def _run_timers(self):
+        while True:
+            with self._timer_cond:
+                while not self._timers or self._timers[0][0] > time.monotonic():
+                    timeout = self._timers[0][0] - time.monotonic() if self._timers else None
+                    self._timer_cond.wait(timeout)
+                _, _, callback = heapq.heappop(self._timers)
+            callback()
+
+    # Срабатывание таймера: дубль запускается, только если основной запрос
+    # еще не завершился
+    def _launch(self, call: _HedgedCall, pick_secondary):
+        with call.lock:
+            if not call.primary_done:
+                call.hedge = self._executor.submit(self._send_secondary, call, pick_secondary)
+
+    def _send_secondary(self, call: _HedgedCall, pick_secondary):
+        send_secondary = pick_secondary()
+        if send_secondary is None:
+            return None, False
+        with self._lock:
+            self.hedged += 1
+        result = send_secondary(call.secondary_cancel)
+        with call.lock:
+            won = call.winner is None
+            if won:
+                call.winner = "secondary"
+        if won:
+            call.primary_cancel.cancel()
+        return result, True
+
+    # send_primary/send_secondary выполняют запрос и принимают Cancellation,
+    # по которой запрос прерывается; pick_secondary вызывается, только если
+    # основной запрос не уложился в delay, и возвращает функцию отправки на
+    # запасной сервер или None
+    def run(self, send_primary: Callable[[Cancellation], Any], delay: float,
+            pick_secondary: Callable[[], Optional[Callable[[Cancellation], Any]]]):
+        call = _HedgedCall()
+        self._schedule(time.monotonic() + delay, lambda: self._launch(call, pick_secondary))
+
+        result, error = None, None
+        try:
+            result = send_primary(call.primary_cancel)
+        except Exception as e:
+            error = e
+        with call.lock:
+            call.primary_done = True
+            if error is None and call.winner is None:
+                call.winner = "primary"
+            winner, hedge = call.winner, call.hedge
+
+        if winner == "primary":
+            call.secondary_cancel.cancel()
+            return result
+        if hedge is None:
+            raise error
+        # Основной запрос прерван выигравшим дублем или завершился ошибкой —
+        # ждем дубль; если и он не удался, пробрасываем ошибку основного
+        try:
+            secondary_result, sent = hedge.result()
+        except Exception:
+            sent = False
+        if not sent:
+            raise error
+        with self._lock:
+            self.hedge_wins += 1
+        return secondary_result
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hedged": self.hedged, "hedge_wins": self.hedge_wins}
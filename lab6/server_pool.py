@@ -0,0 +1,143 @@
+import itertools
+import threading
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+# Атомарный счетчик: next() у itertools.count выполняется под GIL целиком,
+# поэтому инкремент не требует отдельной блокировки
+class AtomicCounter:
+    def __init__(self, start: int = 0):
+        self._count = itertools.count(start)
+        self._value = start
+
+    def increment(self) -> int:
+        value = next(self._count)
+        self._value = value + 1
+        return value
+
+    @property
+    def value(self) -> int:
+        return self._value
+
+
+# Пул серверов с неизменяемыми снимками (copy-on-write).
+# Читатели берут текущий кортеж одной операцией и никогда не видят
+# частично измененный пул; писатели собирают новый кортеж под блокировкой
+# и атомарно подменяют ссылку на него.
+# Если передано кольцо консистентного хеширования, оно обновляется
+# инкрементально при каждом добавлении и удалении сервера.
+class ServerPool:
+    def __init__(self, servers: List[Dict[str, Any]], hash_ring=None):
+        self._snapshot: Tuple[Dict[str, Any], ...] = tuple(dict(s) for s in servers)
+        self._by_url: Dict[str, Dict[str, Any]] = {s['url']: s for s in self._snapshot}
+        self._write_lock = threading.Lock()
+        self._counter = AtomicCounter()
+        self.hash_ring = hash_ring
+        if hash_ring is not None:
+            for server in self._snapshot:
+                hash_ring.add(server['url'])
+
+    # Текущий снимок пула (кортеж словарей, которые не изменяются после публикации)
+    def snapshot(self) -> Tuple[Dict[str, Any], ...]:
+        return self._snapshot
+
+    def __len__(self) -> int:
+        return len(self._snapshot)
+
+    def __iter__(self):
+        return iter(self._snapshot)
+
+    # Индекс следующего кандидата для round-robin (для отображения в интерфейсе)
+    @property
+    def current_index(self) -> int:
+        snapshot = self._snapshot
+        return self._counter.value % len(snapshot) if snapshot else 0
+
+    # Сборка нового снимка и атомарная подмена ссылки
+    def _replace(self, mutate: Callable[[List[Dict[str, Any]]], Any]) -> Any:
+        with self._write_lock:
+            old_urls = set(self._by_url)
+            servers = list(self._snapshot)
+            result = mutate(servers)
+            self._snapshot = tuple(servers)
+            self._by_url = {s['url']: s for s in servers}
+            if self.hash_ring is not None:
+                for url in self._by_url.keys() - old_urls:
+                    self.hash_ring.add(url)
+                for url in old_urls - self._by_url.keys():
+                    self.hash_ring.remove(url)
+            return result
+
+    # Добавление сервера; False, если сервер с таким URL уже есть
+    def add(self, server: Dict[str, Any]) -> bool:
+        def mutate(servers):
+            if any(s['url'] == server['url'] for s in servers):
+                return False
+            servers.append(dict(server))
+            return True
+        return self._replace(mutate)
+
+    # Удаление сервера по индексу; возвращает удаленный сервер или None
+    def remove_at(self, index: int) -> Optional[Dict[str, Any]]:
+        def mutate(servers):
+            if 0 <= index < len(servers):
+                return servers.pop(index)
+            return None
+        return self._replace(mutate)
+
+    # Удаление сервера по URL; возвращает удаленный сервер или None
+    def remove(self, url: str) -> Optional[Dict[str, Any]]:
+        def mutate(servers):
+            for i, server in enumerate(servers):
+                if server['url'] == url:
+                    return servers.pop(i)
+            return None
+        return self._replace(mutate)
+
+    # Обновление статуса сервера (копия словаря вместо изменения на месте)
+    def set_active(self, url: str, active: bool) -> bool:
+        def mutate(servers):
+            for i, server in enumerate(servers):
+                if server['url'] == url:
+                    if server['active'] != active:
+                        servers[i] = {**server, "active": active}
+                    return True
+            return False
+        return self._replace(mutate)
+
+    # Замена состава пула (например, при перезагрузке конфигурации).
+    # Для уже известных серверов сохраняется текущий статус — он точнее
+    # сохраненного; снимки, которые читают текущие запросы, не затрагиваются
+    def sync(self, servers: List[Dict[str, Any]]):
+        def mutate(current):
+            known = {s['url']: s for s in current}
+            current[:] = [
+                {**server, "active": known[server['url']]['active']} if server['url'] in known else dict(server)
+                for server in servers
+            ]
+        self._replace(mutate)
+
+    # Выбор следующего активного сервера по кругу без глобальной блокировки;
+    # серверы из exclude пропускаются (например, уже опробованные при повторе)
+    def next_server(self, exclude=None) -> Optional[Dict[str, Any]]:
+        snapshot = self._snapshot
+        size = len(snapshot)
+        if size == 0:
+            return None
+
+        start = self._counter.increment()
+        for offset in range(size):
+            server = snapshot[(start + offset) % size]
+            if server['active'] and not (exclude and server['url'] in exclude):
+                return server
+        return None
+
+    # Выбор сервера по ключу через кольцо консистентного хеширования:
+    # владелец ключа, а если он недоступен — следующий по кольцу
+    def server_for_key(self, key: str, exclude=None) -> Optional[Dict[str, Any]]:
+        by_url = self._by_url
+        for url in self.hash_ring.walk(key):
+            server = by_url.get(url)
+            if server and server['active'] and not (exclude and url in exclude):
+                return server
+        return None
@@ -0,0 +1,63 @@
+import threading
+import time
+import unittest
+from admission import AdaptiveLimiter, AdmissionController, BackendOverloaded
+
+
+class TestAdaptiveLimiter(unittest.TestCase):
+    def test_rejects_when_queue_is_full(self):
+        limiter = AdaptiveLimiter(max_limit=1, queue_size=0)
+        limiter.acquire()
+        with self.assertRaises(BackendOverloaded):
+            limiter.acquire()
+        self.assertEqual(limiter.stats()["rejected"], 1)
+
+    def test_queue_timeout(self):
+        limiter = AdaptiveLimiter(max_limit=1, queue_size=1, queue_timeout=0.05)
+        limiter.acquire()
+        started = time.monotonic()
+        with self.assertRaises(BackendOverloaded):
+            limiter.acquire()
+        self.assertLess(time.monotonic() - started, 1)
+
+    def test_queued_request_gets_released_slot(self):
+        limiter = AdaptiveLimiter(max_limit=1, queue_size=1, queue_timeout=2, adaptive=False)
+        limiter.acquire()
+        acquired = threading.Event()
+
+        def waiter():
+            limiter.acquire()
+            acquired.set()
+
+        thread = threading.Thread(target=waiter)
+        thread.start()
+        time.sleep(0.05)
+        self.assertFalse(acquired.is_set())
+        limiter.release(0.01, True)
+        thread.join()
+        self.assertTrue(acquired.is_set())
+
+    def test_limit_decreases_on_errors_and_recovers(self):
+        limiter = AdaptiveLimiter(max_limit=10)
+        limiter.acquire()
+        limiter.release(0.001, False)
+        self.assertLess(limiter.limit, 10)
+        reduced = limiter.limit
+        for _ in range(20):
+            limiter.acquire()
+            limiter.release(0.001, True)
+        self.assertGreater(limiter.limit, reduced)
+
+
+class TestAdmissionController(unittest.TestCase):
+    def test_render_escapes_labels_and_retain_drops_backends(self):
+        admission = AdmissionController(max_limit=4)
+        admission.limiter('http://a"1')
+        admission.limiter("http://b:2")
+        self.assertIn('lb_backend_concurrency_limit{backend="http://a\\"1"} 4.0', admission.render_prometheus())
+        admission.retain(["http://b:2"])
+        self.assertNotIn("http://a", admission.render_prometheus())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,58 @@
+import unittest
+from hash_ring import HashRing
+from server_pool import ServerPool
+
+NODES = [f"http://localhost:{5001 + i}" for i in range(5)]
+KEYS = [f"user-{i}" for i in range(10000)]
+
+
+class TestHashRing(unittest.TestCase):
+    def test_lookup_is_stable(self):
+        ring = HashRing(NODES)
+        self.assertEqual([ring.lookup(k) for k in KEYS[:100]],
+                         [ring.lookup(k) for k in KEYS[:100]])
+
+    def test_empty_ring(self):
+        self.assertIsNone(HashRing().lookup("user-1"))
+
+    def test_distribution(self):
+        ring = HashRing(NODES)
+        counts = {node: 0 for node in NODES}
+        for key in KEYS:
+            counts[ring.lookup(key)] += 1
+        for count in counts.values():
+            self.assertGreater(count, len(KEYS) / len(NODES) * 0.7)
+
+    def test_add_remaps_about_one_nth(self):
+        ring = HashRing(NODES)
+        before = {k: ring.lookup(k) for k in KEYS}
+        ring.add("http://localhost:5006")
+        moved = [k for k in KEYS if ring.lookup(k) != before[k]]
+        # Перемещаются только ключи, доставшиеся новому узлу (~1/6)
+        self.assertTrue(all(ring.lookup(k) == "http://localhost:5006" for k in moved))
+        self.assertLess(len(moved), len(KEYS) / 6 * 1.4)
+
+    def test_remove_remaps_only_removed_keys(self):
+        ring = HashRing(NODES)
+        before = {k: ring.lookup(k) for k in KEYS}
+        ring.remove(NODES[0])
+        for key in KEYS:
+            if before[key] != NODES[0]:
+                self.assertEqual(ring.lookup(key), before[key])
+
+    def test_walk_visits_each_node_once(self):
+        ring = HashRing(NODES)
+        self.assertEqual(sorted(ring.walk("user-1")), sorted(NODES))
+
+    def test_pool_skips_inactive_owner(self):
+        pool = ServerPool([{"url": url, "weight": 1, "active": True} for url in NODES], HashRing())
+        owner = pool.server_for_key("user-1")['url']
+        pool.set_active(owner, False)
+        fallback = pool.server_for_key("user-1")['url']
+        self.assertNotEqual(fallback, owner)
+        pool.remove(fallback)
+        self.assertNotIn(fallback, pool.hash_ring)
+
+
+if __name__ == "__main__":
+    unittest.main()
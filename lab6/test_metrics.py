@@ -0,0 +1,44 @@
+import unittest
+from metrics import Histogram, Metrics
+
+
+class TestHistogram(unittest.TestCase):
+    def test_quantile_and_cumulative(self):
+        histogram = Histogram(buckets=(0.1, 0.2, 0.4))
+        for value in (0.05, 0.15, 0.15, 0.3, 1.0):
+            histogram.observe(value)
+        self.assertEqual(histogram.cumulative(), [1, 3, 4, 5])
+        self.assertAlmostEqual(histogram.quantile(0.5), 0.175)
+        self.assertIsNone(Histogram().quantile(0.5))
+
+
+class TestMetrics(unittest.TestCase):
+    def setUp(self):
+        self.metrics = Metrics()
+        for url, status in (("http://a:1", 200), ("http://a:1", 503), ('http://b"2', None)):
+            stats = self.metrics.backend(url)
+            stats.start()
+            stats.finish(0.02, status)
+
+    def test_render_prometheus(self):
+        body = self.metrics.render_prometheus({"lb_cache_entries": 3}, {"lb_cache_hits": 7})
+        lines = body.splitlines()
+        self.assertIn('lb_backend_requests_total{backend="http://a:1"} 2', lines)
+        self.assertIn('lb_backend_errors_total{backend="http://a:1"} 1', lines)
+        self.assertIn('lb_backend_responses_total{backend="http://a:1",code="503"} 1', lines)
+        self.assertIn('lb_backend_requests_total{backend="http://b\\"2"} 1', lines)
+        self.assertIn('lb_backend_latency_seconds_bucket{backend="http://a:1",le="+Inf"} 2', lines)
+        self.assertIn("# TYPE lb_cache_hits_total counter", lines)
+        self.assertIn("lb_cache_hits_total 7", lines)
+        self.assertIn("# TYPE lb_cache_entries gauge", lines)
+        self.assertIn("lb_cache_entries 3", lines)
+
+    def test_retain_drops_removed_backends(self):
+        self.metrics.retain(["http://a:1"])
+        body = self.metrics.render_prometheus()
+        self.assertNotIn("http://b", body)
+        self.assertEqual(list(self.metrics.summary()), ["http://a:1"])
+
+
+if __name__ == "__main__":
+    unittest.main()
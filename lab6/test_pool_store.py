@@ -0,0 +1,77 @@
+import json
+import os
+import tempfile
+import threading
+import time
+import unittest
+from conftest import make_server
+from pool_store import PoolStore
+from server_pool import ServerPool
+
+
+class TestPoolStore(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, "server_pool.json")
+        self.store = PoolStore(self.path)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write_raw(self, data):
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.write(data)
+
+    def test_save_and_load(self):
+        self.assertIsNone(self.store.load())
+        self.store.save([make_server(5001), make_server(5002, active=False)])
+        self.assertEqual(self.store.load(), [make_server(5001), make_server(5002, active=False)])
+        self.assertEqual(os.listdir(self.directory.name), ["server_pool.json"])  # временный файл удален
+        self.assertFalse(self.store.changed_on_disk())
+
+    def test_invalid_content(self):
+        for content in ("{broken", "[1, 2]", '{"servers": 5}', "null"):
+            self.write_raw(content)
+            self.assertIsNone(self.store.load(), content)
+        self.write_raw(json.dumps({"servers": [{"url": "http://a"}, "junk", {"weight": 2}]}))
+        self.assertEqual(self.store.load(), [{"url": "http://a", "weight": 1, "active": False}])
+
+    # Снимок берется под блокировкой записи: после параллельных изменений
+    # и сохранений в файле оказывается последнее состояние пула
+    def test_concurrent_saves_keep_latest_snapshot(self):
+        pool = ServerPool([])
+
+        def worker(base):
+            for i in range(20):
+                pool.add(make_server(base + i))
+                self.store.save(pool.snapshot)
+
+        threads = [threading.Thread(target=worker, args=(6000 + n * 100,)) for n in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(self.store.load()), 80)
+
+    def test_watch_survives_bad_files(self):
+        self.store.save([make_server(5001)])
+        changes = []
+        self.store.watch(changes.append, interval=0.01)
+
+        def wait_for(count):
+            deadline = time.monotonic() + 5
+            while len(changes) < count and time.monotonic() < deadline:
+                time.sleep(0.01)
+            self.assertEqual(len(changes), count)
+
+        time.sleep(0.05)
+        self.write_raw("[]")  # корректный JSON, но не объект
+        time.sleep(0.05)
+        other = PoolStore(self.path)
+        other.save([make_server(5002)])
+        wait_for(1)
+        self.assertEqual(changes[0], [make_server(5002)])
+
+
+if __name__ == "__main__":
+    unittest.main()
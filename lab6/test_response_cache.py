@@ -0,0 +1,109 @@
+import threading
+import time
+import unittest
+from response_cache import ResponseCache, parse_cache_control
+
+
+class FakeResponse:
+    def __init__(self, content=b"ok", status_code=200, headers=None):
+        self.content = content
+        self.status_code = status_code
+        self.headers = headers or {}
+
+
+class TestResponseCache(unittest.TestCase):
+    def test_parse_cache_control(self):
+        self.assertEqual(parse_cache_control('max-age=60, private'),
+                         {"max-age": "60", "private": None})
+
+    def test_hit_after_miss(self):
+        cache = ResponseCache()
+        calls = []
+        fetch = lambda etag: calls.append(etag) or FakeResponse()
+        cache.get_or_fetch("/a", fetch)
+        self.assertEqual(cache.get_or_fetch("/a", fetch).content, b"ok")
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(cache.stats()["hits"], 1)
+
+    def test_no_store_is_not_cached(self):
+        cache = ResponseCache()
+        calls = []
+        fetch = lambda etag: calls.append(etag) or FakeResponse(headers={"Cache-Control": "no-store"})
+        cache.get_or_fetch("/a", fetch)
+        cache.get_or_fetch("/a", fetch)
+        self.assertEqual(len(calls), 2)
+
+    def test_etag_revalidation(self):
+        cache = ResponseCache()
+        cache.get_or_fetch("/a", lambda etag: FakeResponse(
+            headers={"Cache-Control": "max-age=0.05", "ETag": '"v1"'}))
+        time.sleep(0.1)
+        sent = []
+        fetch = lambda etag: sent.append(etag) or FakeResponse(b"", 304, {})
+        self.assertEqual(cache.get_or_fetch("/a", fetch).content, b"ok")
+        self.assertEqual(sent, ['"v1"'])
+        self.assertEqual(cache.stats()["revalidated"], 1)
+
+    def test_lru_eviction_by_memory(self):
+        cache = ResponseCache(max_bytes=250, max_entry_bytes=100)
+        for key in ("/a", "/b", "/c"):
+            cache.get_or_fetch(key, lambda etag: FakeResponse(b"x" * 100))
+        stats = cache.stats()
+        self.assertEqual(stats["entries"], 2)
+        self.assertEqual(stats["evictions"], 1)
+        self.assertLessEqual(stats["bytes_used"], 250)
+
+    def test_request_coalescing(self):
+        cache = ResponseCache()
+        calls = []
+        release = threading.Event()
+
+        def fetch(etag):
+            calls.append(etag)
+            release.wait(2)
+            return FakeResponse()
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(cache.get_or_fetch("/a", fetch)))
+                   for _ in range(10)]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.1)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(len(results), 10)
+        self.assertEqual(cache.stats()["coalesced"], 9)
+
+    # Лидер завис: объединенные запросы ждут не дольше wait_timeout
+    # и выполняют собственный запрос
+    def test_coalesced_wait_times_out(self):
+        cache = ResponseCache(wait_timeout=0.1)
+        release = threading.Event()
+
+        def hung(etag):
+            release.wait(5)
+            return FakeResponse(b"late")
+
+        leader = threading.Thread(target=cache.get_or_fetch, args=("/a", hung))
+        leader.start()
+        time.sleep(0.05)
+        started = time.monotonic()
+        try:
+            self.assertEqual(cache.get_or_fetch("/a", lambda etag: FakeResponse(b"direct")).content, b"direct")
+            self.assertLess(time.monotonic() - started, 2)
+            self.assertEqual(cache.stats()["coalesce_timeouts"], 1)
+        finally:
+            release.set()
+            leader.join()
+
+    def test_cookie_bypasses_cache(self):
+        self.assertTrue(ResponseCache.is_request_cacheable("GET", {}))
+        self.assertFalse(ResponseCache.is_request_cacheable("GET", {"Cookie": "session=1"}))
+        self.assertFalse(ResponseCache.is_request_cacheable("GET", {"Authorization": "Bearer x"}))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,123 @@
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from retry_policy import Cancellation, Hedger, RetryBudget, cancellable_request
+
+
+class TestRetryBudget(unittest.TestCase):
+    def test_retries_limited_by_ratio(self):
+        budget = RetryBudget(ratio=0.25, min_per_second=0)
+        for _ in range(10):
+            budget.deposit()
+        self.assertEqual([budget.try_withdraw() for _ in range(3)], [True, True, False])
+        stats = budget.stats()
+        self.assertEqual((stats["retries"], stats["exhausted"]), (2, 1))
+
+    def test_tokens_capped(self):
+        budget = RetryBudget(ratio=1, min_per_second=0, max_tokens=3)
+        for _ in range(10):
+            budget.deposit()
+        self.assertEqual(sum(budget.try_withdraw() for _ in range(10)), 3)
+
+
+# Запрос, который ждет release или отмены; отмена — ошибка соединения
+def blocking_send(release, result):
+    def send(cancellation):
+        cancelled = threading.Event()
+        cancellation.on_cancel(cancelled.set)
+        while not release.is_set():
+            if cancelled.wait(0.01):
+                raise requests.exceptions.ConnectionError("cancelled")
+        return result
+    return send
+
+
+class TestHedger(unittest.TestCase):
+    def setUp(self):
+        self.hedger = Hedger(max_workers=2)
+        self.picked = 0
+
+    def pick(self, send):
+        def pick_secondary():
+            self.picked += 1
+            return send
+        return pick_secondary
+
+    def test_fast_primary_is_not_hedged(self):
+        threads = []
+
+        def primary(cancellation):
+            threads.append(threading.current_thread())
+            return "primary"
+        self.assertEqual(self.hedger.run(primary, 0.05, self.pick(lambda c: "secondary")), "primary")
+        time.sleep(0.1)
+        self.assertEqual(threads, [threading.current_thread()])  # основной — в потоке вызывающего
+        self.assertEqual(self.picked, 0)
+        self.assertEqual(self.hedger.stats(), {"hedged": 0, "hedge_wins": 0})
+
+    def test_hedge_fires_after_delay_and_wins(self):
+        release = threading.Event()
+        started = time.monotonic()
+        result = self.hedger.run(blocking_send(release, "primary"), 0.1, self.pick(lambda c: "secondary"))
+        self.assertEqual(result, "secondary")
+        self.assertGreaterEqual(time.monotonic() - started, 0.1)
+        self.assertEqual(self.hedger.stats(), {"hedged": 1, "hedge_wins": 1})
+
+    def test_primary_wins_and_cancels_hedge(self):
+        primary_release, secondary_release = threading.Event(), threading.Event()
+        secondary_cancelled = threading.Event()
+
+        def secondary(cancellation):
+            cancellation.on_cancel(secondary_cancelled.set)
+            primary_release.set()
+            secondary_release.wait(5)
+            return "secondary"
+        result = self.hedger.run(blocking_send(primary_release, "primary"), 0.05, self.pick(secondary))
+        self.assertEqual(result, "primary")
+        self.assertTrue(secondary_cancelled.is_set())
+        secondary_release.set()
+        self.assertEqual(self.hedger.stats()["hedge_wins"], 0)
+
+    def test_primary_error_without_hedge(self):
+        def failing(cancellation):
+            raise requests.exceptions.ConnectionError("down")
+        with self.assertRaises(requests.exceptions.ConnectionError):
+            self.hedger.run(failing, 1.0, self.pick(lambda c: "secondary"))
+        self.assertEqual(self.picked, 0)
+
+
+class SlowHandler(BaseHTTPRequestHandler):
+    release = threading.Event()
+
+    def do_GET(self):
+        self.release.wait(5)
+        self.send_response(200)
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+
+class TestCancellableRequest(unittest.TestCase):
+    def test_cancel_aborts_waiting_request(self):
+        server = ThreadingHTTPServer(("127.0.0.1", 0), SlowHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        try:
+            cancellation = Cancellation()
+            threading.Timer(0.1, cancellation.cancel).start()
+            started = time.monotonic()
+            with self.assertRaises(requests.exceptions.ConnectionError):
+                cancellable_request(cancellation, "GET", f"http://127.0.0.1:{server.server_port}/", timeout=5)
+            self.assertLess(time.monotonic() - started, 2)
+        finally:
+            SlowHandler.release.set()
+            server.shutdown()
+            server.server_close()
+
+
+if __name__ == "__main__":
+    unittest.main()
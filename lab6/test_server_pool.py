@@ -0,0 +1,111 @@
+import threading
+import unittest
+from conftest import make_server
+from hash_ring import HashRing
+from server_pool import AtomicCounter, ServerPool
+
+
+class TestServerPool(unittest.TestCase):
+    def test_round_robin(self):
+        pool = ServerPool([make_server(5001), make_server(5002), make_server(5003)])
+        urls = [pool.next_server()['url'] for _ in range(6)]
+        self.assertEqual(urls[:3], urls[3:])
+        self.assertEqual(len(set(urls)), 3)
+
+    def test_skips_inactive(self):
+        pool = ServerPool([make_server(5001), make_server(5002, active=False)])
+        for _ in range(4):
+            self.assertEqual(pool.next_server()['url'], "http://localhost:5001")
+
+    def test_no_active_servers(self):
+        self.assertIsNone(ServerPool([]).next_server())
+        self.assertIsNone(ServerPool([make_server(5001, active=False)]).next_server())
+
+    def test_add_duplicate(self):
+        pool = ServerPool([make_server(5001)])
+        self.assertFalse(pool.add(make_server(5001)))
+        self.assertTrue(pool.add(make_server(5002)))
+        self.assertEqual(len(pool), 2)
+
+    def test_remove_at_invalid_index(self):
+        pool = ServerPool([make_server(5001)])
+        self.assertIsNone(pool.remove_at(5))
+        self.assertEqual(pool.remove_at(0)['url'], "http://localhost:5001")
+        self.assertEqual(len(pool), 0)
+
+    def test_snapshot_is_not_mutated(self):
+        pool = ServerPool([make_server(5001)])
+        snapshot = pool.snapshot()
+        pool.set_active("http://localhost:5001", False)
+        pool.add(make_server(5002))
+        self.assertTrue(snapshot[0]['active'])
+        self.assertEqual(len(snapshot), 1)
+        self.assertFalse(pool.snapshot()[0]['active'])
+
+    def test_sync_keeps_known_status(self):
+        ring = HashRing(vnodes=8)
+        pool = ServerPool([make_server(5001, active=False), make_server(5002)], ring)
+        pool.sync([make_server(5001), make_server(5003, active=False)])
+        self.assertEqual([(s['url'][-4:], s['active']) for s in pool.snapshot()],
+                         [("5001", False), ("5003", False)])
+        self.assertEqual(sorted(ring.nodes()), ["http://localhost:5001", "http://localhost:5003"])
+
+    def test_atomic_counter(self):
+        counter = AtomicCounter()
+        seen = []
+
+        def worker():
+            seen.extend(counter.increment() for _ in range(1000))
+
+        threads = [threading.Thread(target=worker) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(sorted(seen), list(range(8000)))
+
+    # Стресс-тест: одновременное добавление/удаление серверов,
+    # смена статусов и выбор сервера из множества потоков
+    def test_concurrent_add_remove(self):
+        stable = [make_server(5000 + i) for i in range(4)]
+        pool = ServerPool(stable)
+        errors = []
+        stop = threading.Event()
+
+        def writer(base_port):
+            for i in range(200):
+                server = make_server(base_port + i % 10)
+                pool.add(server)
+                pool.set_active(server['url'], i % 2 == 0)
+                pool.remove(server['url'])
+
+        def reader():
+            while not stop.is_set():
+                try:
+                    snapshot = pool.snapshot()
+                    urls = [s['url'] for s in snapshot]
+                    if len(urls) != len(set(urls)):
+                        errors.append("duplicate url in snapshot")
+                    server = pool.next_server()
+                    if server is None or not server['active']:
+                        errors.append("inactive or missing server selected")
+                except Exception as e:
+                    errors.append(repr(e))
+
+        readers = [threading.Thread(target=reader) for _ in range(8)]
+        writers = [threading.Thread(target=writer, args=(6000 + i * 100,)) for i in range(8)]
+        for thread in readers + writers:
+            thread.start()
+        for thread in writers:
+            thread.join()
+        stop.set()
+        for thread in readers:
+            thread.join()
+
+        self.assertEqual(errors, [])
+        self.assertEqual(sorted(s['url'] for s in pool.snapshot()),
+                         sorted(s['url'] for s in stable))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,23 +1,70 @@
+import atexit
+import base64
+import binascii
 import json
 import os
+import shutil
+import tempfile
 from flask import Flask, request, jsonify
-from flask_limiter import Limiter
-from flask_limiter.util import get_remote_address
+from log_store import FSYNC_ALWAYS, FSYNC_NEVER, LogStore
+from rate_limiter import RateLimiter
+from replication import Follower, LeaderClient, ReplicationLog, SnapshotRequired
 
 # Инициализация Flask-приложения
 app = Flask(__name__)
 
-# Инициализация Flask-Limiter
-limiter = Limiter(
-    app=app,
-    key_func=get_remote_address,
-    default_limits=["100 per day"]
-)
+# Ограничение частоты запросов по адресу клиента (KV_RATELIMIT=0 отключает
+# ограничения). Лимитируется запись; чтение — только если задан
+# KV_READ_LIMIT (например, "1000 per minute"), иначе маршруты чтения
+# обходятся без лимитера
+limiter = RateLimiter(enabled=os.environ.get('KV_RATELIMIT', '1') == '1')
+READ_LIMIT = os.environ.get('KV_READ_LIMIT') or None
 
-# Файл для хранения данных
+PORT = int(os.environ.get('KV_PORT', 5000))
+
+# Роль узла: leader принимает запись и отдает журнал репликам, follower
+# получает журнал от KV_LEADER_URL и обслуживает только чтение, пока
+# отставание не превышает KV_MAX_STALENESS секунд
+ROLE = os.environ.get('KV_ROLE', 'leader')
+LEADER_URL = os.environ.get('KV_LEADER_URL', 'http://127.0.0.1:5000')
+MAX_STALENESS = float(os.environ.get('KV_MAX_STALENESS', '5'))
+REPLICATION_LOG_SIZE = int(os.environ.get('KV_REPLICATION_LOG_SIZE', '100000'))
+REPLICATION_LOG_BYTES = int(float(os.environ.get('KV_REPLICATION_LOG_MB', '64')) * 1024 * 1024)
+IS_FOLLOWER = ROLE == 'follower'
+
+# Каталог журнального хранилища и параметры записи; реплика по умолчанию
+# хранит копию во временном каталоге и не делает fsync — после перезапуска
+# она все равно синхронизируется с ведущим заново. Временный каталог
+# удаляется при выходе (atexit вызывает обработчики в обратном порядке,
+# поэтому удаление идет после закрытия хранилища)
+if IS_FOLLOWER:
+    DATA_DIR = os.environ.get('KV_DATA_DIR')
+    if not DATA_DIR:
+        DATA_DIR = tempfile.mkdtemp(prefix='kv-replica-')
+        atexit.register(shutil.rmtree, DATA_DIR, ignore_errors=True)
+    FSYNC_MODE = os.environ.get('KV_FSYNC', FSYNC_NEVER)
+else:
+    # По умолчанию — data/ рядом с приложением (в .gitignore), независимо
+    # от текущего каталога
+    DATA_DIR = os.environ.get('KV_DATA_DIR') or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+    FSYNC_MODE = os.environ.get('KV_FSYNC', FSYNC_ALWAYS)
+FSYNC_INTERVAL = float(os.environ.get('KV_FSYNC_INTERVAL_MS', '50')) / 1000
+COMPACT_INTERVAL = float(os.environ.get('KV_COMPACT_INTERVAL', '60'))
+SWEEP_INTERVAL = float(os.environ.get('KV_SWEEP_INTERVAL', '1'))
+# Бюджет памяти (0 — без ограничения) и политика вытеснения: lru, lfu, sampled
+MAX_MEMORY = int(float(os.environ.get('KV_MAX_MEMORY_MB', '0')) * 1024 * 1024)
+EVICTION_POLICY = os.environ.get('KV_EVICTION', 'lru')
+
+# Пакетные операции: не больше MAX_BATCH_KEYS ключей за запрос; лимит
+# считается в ключах (каждый ключ пакета — одна операция)
+MAX_BATCH_KEYS = 1000
+BATCH_WRITE_LIMIT = "1000 per minute"
+DEFAULT_SCAN_LIMIT = 100
+
+# Прежний файл данных: переносится в журнал при первом запуске
 DATA_FILE = 'data.json'
 
-# Загрузка данных из файла при старте
+# Загрузка данных из прежнего файла
 def load_data():
     if os.path.exists(DATA_FILE):
         try:
@@ -27,13 +74,44 @@ def load_data():
             return {}
     return {}
 
-# Функция сохранения данных в файл
-def save_data(data_dict):
-    with open(DATA_FILE, 'w', encoding='utf-8') as f:
-        json.dump(data_dict, f, ensure_ascii=False, indent=4)
+# Инициализация хранилища; пустое хранилище ведущего заполняется из data.json.
+# Реплика не вытесняет ключи сама: вытеснения приходят от ведущего
+def open_store(on_write=None):
+    store = LogStore(DATA_DIR, fsync=FSYNC_MODE, fsync_interval=FSYNC_INTERVAL,
+                     compact_interval=COMPACT_INTERVAL, sweep_interval=SWEEP_INTERVAL,
+                     max_memory=0 if IS_FOLLOWER else MAX_MEMORY, eviction=EVICTION_POLICY,
+                     on_write=on_write)
+    if len(store) == 0 and not IS_FOLLOWER:
+        legacy = load_data()
+        if legacy:
+            store.set_many((str(key), value) for key, value in legacy.items())
+            print(f"Перенесено ключей из {DATA_FILE}: {len(legacy)}")
+    return store
+
+replication_log = None if IS_FOLLOWER else ReplicationLog(REPLICATION_LOG_SIZE, REPLICATION_LOG_BYTES)
+data_store = open_store(None if IS_FOLLOWER else replication_log.append)
+atexit.register(data_store.close)
 
-# Инициализация хранилища
-data_store = load_data()
+follower = None
+if IS_FOLLOWER:
+    follower = Follower(data_store, LeaderClient(LEADER_URL))
+    follower.start()
+    atexit.register(follower.stop)
+
+WRITE_ENDPOINTS = {'set_key', 'delete_key', 'mset_keys', 'mdelete_keys'}
+READ_ENDPOINTS = {'get_key', 'exists_key', 'ttl_key', 'mget_keys', 'scan_keys'}
+
+# Реплика отклоняет запись и не отвечает на чтение, если отстала от
+# ведущего дольше MAX_STALENESS (клиент или балансировщик идут к другой)
+@app.before_request
+def replica_guard():
+    if follower is None:
+        return None
+    if request.endpoint in WRITE_ENDPOINTS:
+        return jsonify({"error": "Read-only replica", "leader": LEADER_URL}), 403
+    if request.endpoint in READ_ENDPOINTS and follower.staleness() > MAX_STALENESS:
+        return jsonify({"error": "Replica is stale", "replication": follower.status()}), 503, {"Retry-After": "1"}
+    return None
 
 # Главная страница - информационная
 @app.route('/')
@@ -44,19 +122,36 @@ def index():
     <head><title>Key-Value Storage API</title></head>
     <body>
         <h1>Key-Value Storage API</h1>
-        <p>Данные загружены из файла: {DATA_FILE}</p>
+        <p>Роль: {ROLE}</p>
+        <p>Каталог журнала: {DATA_DIR} (fsync: {FSYNC_MODE})</p>
         <p>Загружено ключей: {loaded_keys}</p>
         <p>Доступные эндпоинты:</p>
         <ul>
-            <li>POST /set - сохранить ключ-значение</li>
+            <li>POST /set - сохранить ключ-значение (необязательно ttl в секундах)</li>
             <li>GET /get/&lt;key&gt; - получить значение по ключу</li>
             <li>DELETE /delete/&lt;key&gt; - удалить ключ</li>
             <li>GET /exists/&lt;key&gt; - проверить наличие ключа</li>
+            <li>GET /ttl/&lt;key&gt; - оставшееся время жизни ключа</li>
+            <li>GET /stats - память, число ключей, попадания и вытеснения</li>
+            <li>GET /scan?prefix=&amp;start=&amp;limit=&amp;cursor= - ключи по префиксу и диапазону</li>
+            <li>POST /mget - получить значения списка ключей</li>
+            <li>POST /mset - атомарно сохранить список пар ключ-значение</li>
+            <li>DELETE /mdelete - атомарно удалить список ключей</li>
+            <li>GET /health - состояние узла (реплика: 503, если отстала)</li>
+            <li>GET /replication/status - позиция и отставание репликации</li>
         </ul>
     </body>
     </html>
     """
 
+# Проверка необязательного TTL; возвращает (ttl, ошибка)
+def parse_ttl(ttl):
+    if ttl is None:
+        return None, None
+    if isinstance(ttl, bool) or not isinstance(ttl, (int, float)) or ttl <= 0:
+        return None, (jsonify({"error": "'ttl' must be a positive number of seconds"}), 400)
+    return ttl, None
+
 # 1. POST /set - сохранение ключа и значения
 @app.route('/set', methods=['POST'])
 @limiter.limit("10 per minute")
@@ -70,14 +165,25 @@ def set_key():
 
     if key is None or value is None:
         return jsonify({"error": "Both 'key' and 'value' are required"}), 400
+    ttl, error = parse_ttl(content.get('ttl'))
+    if error:
+        return error
 
-    data_store[key] = value
-    save_data(data_store)
+    if not isinstance(key, str):
+        key = str(key)
+    try:
+        data_store.set(key, value, ttl)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 413
 
-    return jsonify({"status": "success", "key": key, "value": value}), 201
+    response = {"status": "success", "key": key, "value": value}
+    if ttl is not None:
+        response["ttl"] = ttl
+    return jsonify(response), 201
 
 # 2. GET /get/<key> - получение значения по ключу
 @app.route('/get/<key>', methods=['GET'])
+@limiter.limit(READ_LIMIT)
 def get_key(key):
     value = data_store.get(key)
     if value is None:
@@ -88,23 +194,204 @@ def get_key(key):
 @app.route('/delete/<key>', methods=['DELETE'])
 @limiter.limit("10 per minute")
 def delete_key(key):
-    if key not in data_store:
+    try:
+        value = data_store.delete(key)
+    except KeyError:
         return jsonify({"error": f"Key '{key}' not found"}), 404
 
-    value = data_store.pop(key)
-    save_data(data_store)
-
     return jsonify({"status": "deleted", "key": key, "value": value}), 200
 
 # 4. GET /exists/<key> - проверка существования ключа
 @app.route('/exists/<key>', methods=['GET'])
+@limiter.limit(READ_LIMIT)
 def exists_key(key):
     exists = key in data_store
     return jsonify({"key": key, "exists": exists}), 200
 
+# Стоимость пакетного запроса для лимитера — число ключей в нем
+def batch_cost():
+    content = request.get_json(silent=True)
+    if not isinstance(content, dict):
+        return 1
+    items = content.get('keys', content.get('items'))
+    if not isinstance(items, list):
+        return 1
+    return max(1, min(len(items), MAX_BATCH_KEYS))
+
+# Проверка списка ключей пакетного запроса; возвращает (ключи, ошибка)
+def parse_keys():
+    if not request.is_json:
+        return None, (jsonify({"error": "Request must be JSON"}), 400)
+    content = request.get_json()
+    keys = content.get('keys') if isinstance(content, dict) else None
+    if not isinstance(keys, list) or not keys:
+        return None, (jsonify({"error": "'keys' must be a non-empty array"}), 400)
+    if len(keys) > MAX_BATCH_KEYS:
+        return None, (jsonify({"error": f"At most {MAX_BATCH_KEYS} keys per request"}), 400)
+    return [key if isinstance(key, str) else str(key) for key in keys], None
+
+# 5. POST /mget - значения нескольких ключей за один запрос
+@app.route('/mget', methods=['POST'])
+@limiter.limit(READ_LIMIT, cost=batch_cost)
+def mget_keys():
+    keys, error = parse_keys()
+    if error:
+        return error
+    values = data_store.get_many(keys)
+    missing = [key for key in keys if key not in values]
+    return jsonify({"values": values, "missing": missing}), 200
+
+# 6. POST /mset - атомарное сохранение нескольких ключей
+@app.route('/mset', methods=['POST'])
+@limiter.limit(BATCH_WRITE_LIMIT, cost=batch_cost)
+def mset_keys():
+    if not request.is_json:
+        return jsonify({"error": "Request must be JSON"}), 400
+
+    content = request.get_json()
+    items = content.get('items') if isinstance(content, dict) else None
+    if not isinstance(items, list) or not items:
+        return jsonify({"error": "'items' must be a non-empty array"}), 400
+    if len(items) > MAX_BATCH_KEYS:
+        return jsonify({"error": f"At most {MAX_BATCH_KEYS} items per request"}), 400
+
+    pairs = []
+    for item in items:
+        if not isinstance(item, dict) or item.get('key') is None or item.get('value') is None:
+            return jsonify({"error": "Each item needs both 'key' and 'value'"}), 400
+        ttl, error = parse_ttl(item.get('ttl'))
+        if error:
+            return error
+        key = item['key']
+        pairs.append((key if isinstance(key, str) else str(key), item['value'], ttl))
+
+    try:
+        data_store.set_many(pairs)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 413
+
+    return jsonify({"status": "success", "count": len(pairs), "keys": [key for key, _, _ in pairs]}), 201
+
+# 7. DELETE /mdelete - атомарное удаление нескольких ключей
+@app.route('/mdelete', methods=['DELETE', 'POST'])
+@limiter.limit(BATCH_WRITE_LIMIT, cost=batch_cost)
+def mdelete_keys():
+    keys, error = parse_keys()
+    if error:
+        return error
+    deleted = data_store.delete_many(keys)
+    missing = [key for key in keys if key not in deleted]
+    return jsonify({"status": "deleted", "deleted": deleted, "missing": missing}), 200
+
+# 8. GET /ttl/<key> - оставшееся время жизни ключа (null — бессрочный)
+@app.route('/ttl/<key>', methods=['GET'])
+@limiter.limit(READ_LIMIT)
+def ttl_key(key):
+    try:
+        ttl = data_store.ttl(key)
+    except KeyError:
+        return jsonify({"error": f"Key '{key}' not found"}), 404
+    return jsonify({"key": key, "ttl": ttl}), 200
+
+# 9. GET /stats - состояние хранилища: память, ключи, попадания, вытеснения
+@app.route('/stats', methods=['GET'])
+def stats():
+    result = data_store.stats()
+    result["replication"] = replication_status()
+    result["rate_limiter"] = limiter.stats()
+    return jsonify(result), 200
+
+# Курсор страницы — последний выданный ключ в base64 (безопасно для URL)
+def encode_cursor(key):
+    return base64.urlsafe_b64encode(key.encode('utf-8')).decode('ascii')
+
+def decode_cursor(cursor):
+    return base64.b64decode(cursor.encode('ascii'), altchars=b'-_', validate=True).decode('utf-8')
+
+# 10. GET /scan - ключи с префиксом в порядке возрастания, постранично
+@app.route('/scan', methods=['GET'])
+@limiter.limit(READ_LIMIT)
+def scan_keys():
+    prefix = request.args.get('prefix', '')
+    start = request.args.get('start')
+    try:
+        limit = int(request.args.get('limit', DEFAULT_SCAN_LIMIT))
+    except ValueError:
+        return jsonify({"error": "'limit' must be an integer"}), 400
+    if not 1 <= limit <= MAX_BATCH_KEYS:
+        return jsonify({"error": f"'limit' must be between 1 and {MAX_BATCH_KEYS}"}), 400
+
+    after = None
+    cursor = request.args.get('cursor')
+    if cursor:
+        try:
+            after = decode_cursor(cursor)
+        except (binascii.Error, UnicodeError, ValueError):
+            return jsonify({"error": "Invalid cursor"}), 400
+
+    items, more = data_store.scan(prefix, start, after, limit)
+    next_cursor = encode_cursor(items[-1][0]) if more else None
+    return jsonify({
+        "items": [{"key": key, "value": value} for key, value in items],
+        "count": len(items),
+        "next_cursor": next_cursor
+    }), 200
+
+def replication_status():
+    return follower.status() if follower else replication_log.status()
+
+# 11. GET /health - проверка состояния для балансировщика
+@app.route('/health', methods=['GET'])
+def health():
+    if follower and follower.staleness() > MAX_STALENESS:
+        return jsonify({"status": "stale", "role": ROLE, "replication": follower.status()}), 503
+    return jsonify({"status": "healthy", "role": ROLE}), 200
+
+# 12. GET /replication/status - позиция журнала и отставание реплики
+@app.route('/replication/status', methods=['GET'])
+def replication_status_view():
+    return jsonify(replication_status()), 200
+
+# 13. GET /replication/snapshot - полный снимок для новой реплики (только ведущий)
+@app.route('/replication/snapshot', methods=['GET'])
+def replication_snapshot():
+    if replication_log is None:
+        return jsonify({"error": "Not a leader"}), 404
+    items, lsn = data_store.snapshot()
+    return jsonify({
+        "epoch": replication_log.epoch,
+        "lsn": lsn,
+        "items": [[key, value.decode('utf-8'), expires_at] for key, value, expires_at in items]
+    }), 200
+
+# 14. GET /replication/log?epoch=&after=&wait=&limit= - записи журнала после
+# after; если новых нет, ответ ждет до wait секунд (длинный опрос).
+# 409 — реплика должна заново загрузить снимок
+@app.route('/replication/log', methods=['GET'])
+def replication_log_view():
+    if replication_log is None:
+        return jsonify({"error": "Not a leader"}), 404
+    try:
+        after = int(request.args.get('after', 0))
+        wait = min(float(request.args.get('wait', 0)), 30.0)
+        limit = int(request.args.get('limit', 1000))
+    except ValueError:
+        return jsonify({"error": "Invalid 'after', 'wait' or 'limit'"}), 400
+    if request.args.get('epoch') != replication_log.epoch:
+        return jsonify({"error": "Epoch changed", "epoch": replication_log.epoch}), 409
+    try:
+        entries, lsn = replication_log.read(after, limit, wait)
+    except SnapshotRequired:
+        return jsonify({"error": "Snapshot required", "epoch": replication_log.epoch}), 409
+    return jsonify({"epoch": replication_log.epoch, "lsn": lsn, "entries": entries}), 200
+
 if __name__ == '__main__':
-    print(f"Файл данных: {DATA_FILE}")
+    print(f"Роль: {ROLE}" + (f" (ведущий: {LEADER_URL})" if IS_FOLLOWER else ""))
+    print(f"Каталог журнала: {DATA_DIR} (fsync: {FSYNC_MODE})")
     print(f"Загружено ключей: {len(data_store)}")
-    print(f"Сервер запущен: http://127.0.0.1:5000")
-    app.run(debug=True, port=5000)
+    if MAX_MEMORY:
+        print(f"Бюджет памяти: {MAX_MEMORY // (1024 * 1024)} МБ, вытеснение: {EVICTION_POLICY}")
+    print(f"Сервер запущен: http://127.0.0.1:{PORT}")
+    # Перезагрузчик запустил бы второй процесс на тот же журнал
+    app.run(debug=os.environ.get('KV_DEBUG', '1') == '1', port=PORT, use_reloader=False, threaded=True)
     
\ No newline at end of file
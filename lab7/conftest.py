@@ -0,0 +1,10 @@
+# Общие вспомогательные объекты тестов lab7
+
+
+# Управляемые часы: время меняется только через now
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
@@ -0,0 +1,156 @@
+import random
+from collections import OrderedDict
+from typing import Collection, Dict, List, Optional
+
+# Политики вытеснения для хранилища с ограниченной памятью. Хранилище
+# сообщает о добавлении (add), чтении (touch) и удалении (remove) ключей и
+# спрашивает жертву (victim), пока не уложится в бюджет. Ключи из exclude
+# (только что записанные) жертвой не становятся. Все операции O(1), пока
+# жертва не попадает в exclude; вызываются под блокировкой хранилища.
+
+
+# Вытесняется ключ, к которому дольше всех не обращались
+class LRUPolicy:
+    name = "lru"
+
+    def __init__(self):
+        self._order: "OrderedDict[str, None]" = OrderedDict()
+
+    def add(self, key: str):
+        self._order[key] = None
+        self._order.move_to_end(key)
+
+    def touch(self, key: str):
+        if key in self._order:
+            self._order.move_to_end(key)
+
+    def remove(self, key: str):
+        self._order.pop(key, None)
+
+    # Записанные ключи только что перенесены в конец порядка, поэтому
+    # до них доходит, лишь когда остальные ключи кончились
+    def victim(self, exclude: Collection[str] = ()) -> Optional[str]:
+        return next((key for key in self._order if key not in exclude), None)
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+
+# Вытесняется самый редко используемый ключ (при равенстве — самый давний).
+# Ключи хранятся в корзинах по частоте, поэтому жертва находится за O(1)
+class LFUPolicy:
+    name = "lfu"
+
+    def __init__(self):
+        self._freq: Dict[str, int] = {}
+        self._buckets: Dict[int, "OrderedDict[str, None]"] = {}
+        self._min_freq = 0
+
+    def _move(self, key: str, freq: Optional[int], new_freq: Optional[int]):
+        if freq is not None:
+            bucket = self._buckets[freq]
+            del bucket[key]
+            if not bucket:
+                del self._buckets[freq]
+        if new_freq is not None:
+            self._buckets.setdefault(new_freq, OrderedDict())[key] = None
+            self._freq[key] = new_freq
+
+    def add(self, key: str):
+        if key in self._freq:
+            self.touch(key)
+            return
+        self._move(key, None, 1)
+        self._min_freq = 1
+
+    def touch(self, key: str):
+        freq = self._freq.get(key)
+        if freq is None:
+            return
+        self._move(key, freq, freq + 1)
+        if self._min_freq == freq and freq not in self._buckets:
+            self._min_freq = freq + 1
+
+    def remove(self, key: str):
+        freq = self._freq.pop(key, None)
+        if freq is not None:
+            self._move(key, freq, None)
+
+    # Новый ключ попадает в корзину с частотой 1 и без exclude вытеснялся бы
+    # первым; если голова минимальной корзины исключена, корзины
+    # просматриваются по возрастанию частоты
+    def victim(self, exclude: Collection[str] = ()) -> Optional[str]:
+        if not self._freq:
+            return None
+        # После удаления ключа минимальная корзина могла исчезнуть
+        if self._min_freq not in self._buckets:
+            self._min_freq = min(self._buckets)
+        key = next(iter(self._buckets[self._min_freq]))
+        if key not in exclude:
+            return key
+        for freq in sorted(self._buckets):
+            for key in self._buckets[freq]:
+                if key not in exclude:
+                    return key
+        return None
+
+    def __len__(self) -> int:
+        return len(self._freq)
+
+
+# Приближенный LRU как в Redis: из samples случайных ключей вытесняется самый
+# давно использованный. Вместо упорядоченного списка — только счетчик
+# последнего обращения; случайный ключ берется из массива за O(1)
+class SampledLRUPolicy:
+    name = "sampled"
+
+    def __init__(self, samples: int = 5, seed: int = None):
+        self.samples = samples
+        self._keys: List[str] = []
+        self._positions: Dict[str, int] = {}
+        self._last_used: Dict[str, int] = {}
+        self._clock = 0
+        self._rng = random.Random(seed)
+
+    def add(self, key: str):
+        if key not in self._positions:
+            self._positions[key] = len(self._keys)
+            self._keys.append(key)
+        self.touch(key)
+
+    def touch(self, key: str):
+        if key in self._positions:
+            self._clock += 1
+            self._last_used[key] = self._clock
+
+    def remove(self, key: str):
+        position = self._positions.pop(key, None)
+        if position is None:
+            return
+        del self._last_used[key]
+        last = self._keys.pop()
+        if last != key:
+            self._keys[position] = last
+            self._positions[last] = position
+
+    # Если вся выборка исключена, берется любой неисключенный ключ
+    def victim(self, exclude: Collection[str] = ()) -> Optional[str]:
+        if not self._keys:
+            return None
+        sample = [key for key in (self._keys[self._rng.randrange(len(self._keys))] for _ in range(self.samples))
+                  if key not in exclude]
+        if not sample:
+            return next((key for key in self._keys if key not in exclude), None)
+        return min(sample, key=self._last_used.__getitem__)
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+
+POLICIES = {policy.name: policy for policy in (LRUPolicy, LFUPolicy, SampledLRUPolicy)}
+
+
+def make_policy(name: str):
+    if name not in POLICIES:
+        raise ValueError(f"Неизвестная политика вытеснения: {name} (доступны: {', '.join(POLICIES)})")
+    return POLICIES[name]()
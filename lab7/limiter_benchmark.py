@@ -0,0 +1,111 @@
+import argparse
+import json
+import threading
+import time
+from datetime import datetime
+
+from flask import Flask, jsonify
+
+from rate_limiter import RateLimiter, TokenBuckets, parse_limit
+
+# Лимит, который не срабатывает за время прогона: измеряется только учет
+UNREACHABLE_LIMIT = "1000000000 per second"
+
+
+# Приложение с одним маршрутом чтения; limiter — None, "buckets" или "flask_limiter"
+def make_app(limiter):
+    app = Flask(__name__)
+
+    def get_key(key):
+        return jsonify({"key": key, "value": 1}), 200
+
+    if limiter == "buckets":
+        get_key = RateLimiter().limit(UNREACHABLE_LIMIT)(get_key)
+    elif limiter == "flask_limiter":
+        from flask_limiter import Limiter
+        from flask_limiter.util import get_remote_address
+        Limiter(app=app, key_func=get_remote_address, default_limits=[UNREACHABLE_LIMIT])
+    app.add_url_rule("/get/<key>", view_func=get_key)
+    return app
+
+
+# Среднее время запроса через тестовый клиент Flask (без сети), мкс;
+# берется лучший из rounds прогонов, чтобы снизить влияние шума
+def measure_requests(limiter, requests_count, rounds):
+    client = make_app(limiter).test_client()
+    for _ in range(min(1000, requests_count)):
+        client.get("/get/warmup")
+    best = float("inf")
+    for _ in range(rounds):
+        started = time.perf_counter()
+        for i in range(requests_count):
+            client.get(f"/get/k{i % 100}")
+        best = min(best, time.perf_counter() - started)
+    return best / requests_count * 1e6
+
+
+# Пропускная способность TokenBuckets.hit из нескольких потоков, проверок/с
+def measure_hits(stripes, threads, hits_per_thread):
+    buckets = TokenBuckets(stripes=stripes)
+    rate, capacity = parse_limit(UNREACHABLE_LIMIT)
+
+    def worker(n):
+        keys = [("get_key", f"10.0.{n}.{i}") for i in range(64)]
+        for i in range(hits_per_thread):
+            buckets.hit(keys[i & 63], rate, capacity)
+
+    workers = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    started = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return threads * hits_per_thread / (time.perf_counter() - started)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Накладные расходы лимитера запросов lab7")
+    parser.add_argument("--requests", type=int, default=20000, help="запросов на вариант")
+    parser.add_argument("--rounds", type=int, default=3)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--hits", type=int, default=100000, help="проверок на поток")
+    parser.add_argument("--output", default="limiter_benchmark_results.json")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    options = parse_args(argv)
+    report = {
+        "started_at": datetime.now().isoformat(),
+        "config": vars(options),
+        "request_us": {},
+        "hits_per_second": {},
+    }
+
+    variants = [None, "buckets"]
+    try:
+        import flask_limiter  # noqa: F401
+        variants.append("flask_limiter")
+    except ImportError:
+        print("flask_limiter не установлен — сравнение с ним пропущено")
+
+    for variant in variants:
+        name = variant or "none"
+        report["request_us"][name] = round(measure_requests(variant, options.requests, options.rounds), 2)
+        print(f"Запрос, лимитер={name}: {report['request_us'][name]} мкс")
+    base = report["request_us"]["none"]
+    report["overhead_us"] = {name: round(value - base, 2)
+                             for name, value in report["request_us"].items() if name != "none"}
+
+    for stripes in (1, 64):
+        rate = measure_hits(stripes, options.threads, options.hits)
+        report["hits_per_second"][f"stripes_{stripes}"] = round(rate)
+        print(f"Проверки, полос={stripes}, потоков={options.threads}: {round(rate)} в секунду")
+
+    with open(options.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"Результаты сохранены в {options.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,827 @@
+import heapq
+import json
+import os
+import struct
+import threading
+import time
+import zlib
+from typing import Any, Collection, Dict, Iterable, List, NamedTuple, Optional, Tuple
+from eviction import make_policy
+from ordered_index import SortedKeys
+
+try:
+    import fcntl
+except ImportError:  # Windows: без блокировки каталога
+    fcntl = None
+
+# Запись журнала: crc32, операция, длина ключа, длина значения; затем ключ
+# и значение (JSON) в UTF-8. crc32 считается по всему, что идет после него,
+# поэтому оборванная при сбое запись в конце файла распознается
+HEADER = struct.Struct("<IBII")
+BODY_HEADER = struct.Struct("<BII")
+OP_SET = 1
+OP_DELETE = 2
+OP_BATCH = 3
+# Запись с истечением: перед значением — момент истечения (unix-время, double)
+OP_SET_TTL = 4
+EXPIRES = struct.Struct("<d")
+
+SEGMENT_SUFFIX = ".log"
+HINT_SUFFIX = ".hint"
+COMPACTED_SUFFIX = ".compacted"
+TMP_SUFFIX = ".tmp"
+LOCK_FILE = "LOCK"
+
+# Режимы fsync: перед ответом на каждую запись (с групповой фиксацией),
+# в фоне раз в fsync_interval секунд или никогда (на усмотрение ОС)
+FSYNC_ALWAYS = "always"
+FSYNC_INTERVAL = "interval"
+FSYNC_NEVER = "never"
+
+MAX_SEGMENT_BYTES = 64 << 20
+COMPACT_INTERVAL = 60.0
+COMPACT_MIN_GARBAGE_RATIO = 0.5
+COMPACT_MIN_GARBAGE_BYTES = 1 << 20
+SWEEP_INTERVAL = 1.0
+SWEEP_BATCH = 1000
+# Приблизительные накладные расходы на ключ сверх длины ключа и значения:
+# строка ключа, запись индекса, слот словаря, упорядоченный индекс и учет
+# политики вытеснения
+ENTRY_OVERHEAD = 200
+
+
+# Положение значения ключа: сегмент, смещение и длина значения, размер всей
+# записи и момент истечения (0 — ключ бессрочный)
+class IndexEntry(NamedTuple):
+    segment: int
+    value_offset: int
+    value_size: int
+    record_size: int
+    expires_at: float = 0.0
+
+
+def encode_record(op: int, key: bytes, value: bytes = b"") -> bytes:
+    body = BODY_HEADER.pack(op, len(key), len(value)) + key + value
+    return struct.pack("<I", zlib.crc32(body)) + body
+
+
+def encode_set(key: bytes, value: bytes, expires_at: float = 0.0) -> bytes:
+    if expires_at:
+        return encode_record(OP_SET_TTL, key, EXPIRES.pack(expires_at) + value)
+    return encode_record(OP_SET, key, value)
+
+
+# Пакет записей (mset/mdelete) — одна запись OP_BATCH, внутри которой лежат
+# обычные записи. Общая crc32 делает пакет атомарным: после сбоя он либо
+# применяется целиком, либо отбрасывается как оборванный хвост
+def encode_batch(payloads: List[bytes]) -> bytes:
+    return encode_record(OP_BATCH, b"", b"".join(payloads))
+
+
+def _scan_records(data: bytes, pos: int, size: int, records: list, nested: bool = False) -> int:
+    while pos + HEADER.size <= size:
+        crc, op, key_size, value_size = HEADER.unpack_from(data, pos)
+        key_start = pos + HEADER.size
+        end = key_start + key_size + value_size
+        valid_ops = (OP_SET, OP_SET_TTL, OP_DELETE) if nested else (OP_SET, OP_SET_TTL, OP_DELETE, OP_BATCH)
+        if end > size or op not in valid_ops or zlib.crc32(data[pos + 4:end]) != crc:
+            break
+        if op == OP_BATCH:
+            records.append((op, "", key_start, value_size, HEADER.size, 0.0))
+            if _scan_records(data, key_start, end, records, nested=True) != end:
+                raise ValueError(f"Поврежден пакет записей (смещение {pos})")
+        else:
+            key = data[key_start:key_start + key_size].decode("utf-8")
+            value_offset = key_start + key_size
+            expires_at = 0.0
+            if op == OP_SET_TTL:
+                expires_at, = EXPIRES.unpack_from(data, value_offset)
+                value_offset += EXPIRES.size
+                value_size -= EXPIRES.size
+            records.append((op, key, value_offset, value_size, end - pos, expires_at))
+        pos = end
+    return pos
+
+
+# Разбор сегмента: список (операция, ключ, смещение значения, длина значения,
+# размер записи, момент истечения) и конец последней целой записи. Пакет дает
+# запись OP_BATCH (размер — только его заголовок) и следом свои записи
+def scan_segment(path: str) -> Tuple[List[Tuple[int, str, int, int, int, float]], int]:
+    with open(path, "rb") as f:
+        data = f.read()
+    records = []
+    end = _scan_records(data, 0, len(data), records)
+    return records, end
+
+
+def _write_all(fd: int, data: bytes):
+    view = memoryview(data)
+    while view:
+        written = os.write(fd, view)
+        view = view[written:]
+
+
+def _fsync_directory(directory: str):
+    if not hasattr(os, "O_DIRECTORY"):
+        return
+    fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+# Журнальное хранилище ключ-значение (в духе Bitcask). Все записи только
+# дописываются в активный сегмент, поэтому запись стоит O(размер значения).
+# В памяти — хеш-индекс ключ -> положение значения на диске; чтение — один
+# pread. Перезаписанные и удаленные значения остаются мусором в старых
+# сегментах, фоновое уплотнение переписывает живые значения в новый сегмент
+# и пишет рядом hint-файл (снимок индекса), чтобы при старте не читать данные.
+# Ключ с TTL хранит момент истечения в своей записи: истекший ключ удаляется
+# при обращении к нему или фоновым проходом по куче моментов истечения, без
+# записи в журнал, и не переносится уплотнением. С бюджетом памяти max_memory
+# хранилище работает как кэш: при превышении ключи вытесняются по выбранной
+# политике (lru, lfu, sampled) с записью удаления в журнал. Рядом с хеш-индексом
+# поддерживается упорядоченный индекс ключей для выборок по префиксу и диапазону.
+# Обработчик on_write получает каждую запись журнала (номер и операции) под
+# блокировкой, в порядке записи — на нем построена репликация.
+class LogStore:
+    def __init__(self, directory: str, fsync: str = FSYNC_ALWAYS, fsync_interval: float = 0.05,
+                 max_segment_bytes: int = MAX_SEGMENT_BYTES, compact_interval: float = COMPACT_INTERVAL,
+                 compact_min_garbage_ratio: float = COMPACT_MIN_GARBAGE_RATIO,
+                 compact_min_garbage_bytes: int = COMPACT_MIN_GARBAGE_BYTES, sweep_interval: float = SWEEP_INTERVAL,
+                 max_memory: int = 0, eviction: str = "lru", on_write=None, background: bool = True,
+                 clock=time.time):
+        if fsync not in (FSYNC_ALWAYS, FSYNC_INTERVAL, FSYNC_NEVER):
+            raise ValueError(f"Неизвестный режим fsync: {fsync}")
+        self.directory = directory
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+        self.max_segment_bytes = max_segment_bytes
+        self.compact_interval = compact_interval
+        self.compact_min_garbage_ratio = compact_min_garbage_ratio
+        self.compact_min_garbage_bytes = compact_min_garbage_bytes
+        self.sweep_interval = sweep_interval
+        self.clock = clock
+        self.max_memory = max_memory
+        self.eviction = eviction
+        self._policy = make_policy(eviction) if max_memory else None
+        self.on_write = on_write
+
+        self._lock = threading.Lock()
+        self._cond = threading.Condition(self._lock)
+        self._compacting = threading.Lock()
+        self._stop = threading.Event()
+        self._index: Dict[str, IndexEntry] = {}
+        self._ordered = SortedKeys()
+        self._readers: Dict[int, int] = {}  # сегмент -> дескриптор для чтения
+        self._sizes: Dict[int, int] = {}  # сегмент -> размер в байтах
+        self._garbage: Dict[int, int] = {}  # сегмент -> байт устаревших записей
+        # Куча (момент истечения, ключ); устаревшие элементы (ключ перезаписан
+        # или удален) пропускаются при извлечении
+        self._expiry_heap: List[Tuple[float, str]] = []
+        self._ttl_keys = 0
+        self._active_id = 0
+        self._active_fd = -1
+        # Групповая фиксация: номер последней записи и последней записи на диске
+        self._seq = 0
+        self._synced_seq = 0
+        self._syncing = False
+        self.writes = 0
+        self.fsyncs = 0
+        self.compactions = 0
+        self.reclaimed_bytes = 0
+        self.expired = 0
+        self.memory_used = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        os.makedirs(directory, exist_ok=True)
+        self._lock_fd = self._lock_directory()
+        self._recover()
+        if self.max_memory and self.memory_used > self.max_memory:
+            # Бюджет уменьшили с прошлого запуска
+            with self._lock:
+                self._evict_locked()
+
+        self._threads = []
+        if background:
+            if fsync == FSYNC_INTERVAL:
+                self._start_thread(self._fsync_loop)
+            if compact_interval:
+                self._start_thread(self._compaction_loop)
+            if sweep_interval:
+                self._start_thread(self._sweep_loop)
+
+    def _path(self, segment: int, suffix: str = SEGMENT_SUFFIX) -> str:
+        return os.path.join(self.directory, f"{segment:06d}{suffix}")
+
+    # Каталог открывает только один процесс: два писателя испортили бы журнал
+    def _lock_directory(self) -> Optional[int]:
+        if fcntl is None:
+            return None
+        fd = os.open(os.path.join(self.directory, LOCK_FILE), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            raise RuntimeError(f"Каталог {self.directory} уже используется другим процессом")
+        return fd
+
+    def _start_thread(self, target):
+        thread = threading.Thread(target=target, daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+    # --- Восстановление при старте ---
+
+    def _recover(self):
+        names = os.listdir(self.directory)
+        for name in names:
+            if name.endswith(TMP_SUFFIX):
+                os.remove(os.path.join(self.directory, name))
+        # Уплотнение прервалось после того, как новый сегмент был полностью
+        # записан: доводим его до конца (старые сегменты больше не нужны)
+        for name in names:
+            if name.endswith(SEGMENT_SUFFIX + COMPACTED_SUFFIX):
+                target = int(name.split(".")[0])
+                for segment in self._segment_ids():
+                    if segment <= target:
+                        self._remove_segment_files(segment)
+                os.replace(os.path.join(self.directory, name), self._path(target))
+
+        segments = self._segment_ids()
+        for position, segment in enumerate(segments):
+            self._load_segment(segment, last=position == len(segments) - 1)
+
+        # Ключи, истекшие пока хранилище было закрыто (в счетчик истечений,
+        # который ведется с момента открытия, они не попадают)
+        while self._sweep_locked(self.clock(), SWEEP_BATCH):
+            pass
+        self.expired = 0
+
+        last = segments[-1] if segments else 0
+        if segments and not os.path.exists(self._path(last, HINT_SUFFIX)) \
+                and self._sizes[last] < self.max_segment_bytes:
+            self._open_active(last)
+        else:
+            self._open_active(last + 1)
+
+    def _segment_ids(self) -> List[int]:
+        return sorted(int(name[:-len(SEGMENT_SUFFIX)]) for name in os.listdir(self.directory)
+                      if name.endswith(SEGMENT_SUFFIX) and name[:-len(SEGMENT_SUFFIX)].isdigit())
+
+    def _load_segment(self, segment: int, last: bool):
+        path = self._path(segment)
+        size = os.path.getsize(path)
+        self._garbage.setdefault(segment, 0)
+        hint = self._read_hint(segment, size)
+        if hint is not None:
+            for key, entry in hint:
+                self._put_entry(key, entry)
+        else:
+            records, end = scan_segment(path)
+            if end < size:
+                if not last:
+                    raise ValueError(f"Поврежден сегмент {path} (смещение {end})")
+                # Оборванная последняя запись — сбой во время записи
+                print(f"Отброшено {size - end} байт неполной записи в конце {path}")
+                with open(path, "r+b") as f:
+                    f.truncate(end)
+                size = end
+            for op, key, value_offset, value_size, record_size, expires_at in records:
+                if op in (OP_SET, OP_SET_TTL):
+                    self._put_entry(key, IndexEntry(segment, value_offset, value_size, record_size, expires_at))
+                else:
+                    if op == OP_DELETE:
+                        self._drop_entry(key)
+                    self._garbage[segment] += record_size
+        self._readers[segment] = os.open(path, os.O_RDONLY)
+        self._sizes[segment] = size
+
+    # Снимок индекса сегмента; None, если его нет или он не от этого файла
+    def _read_hint(self, segment: int, size: int):
+        path = self._path(segment, HINT_SUFFIX)
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            lines = f.read().splitlines()
+        if not lines or json.loads(lines[0]).get("segment_size") != size:
+            return None
+        entries = []
+        for line in lines[1:]:
+            key, *position = json.loads(line)
+            entries.append((key, IndexEntry(segment, *position)))
+        return entries
+
+    def _open_active(self, segment: int):
+        path = self._path(segment)
+        self._active_fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        if segment not in self._readers:
+            self._readers[segment] = os.open(path, os.O_RDONLY)
+            self._sizes[segment] = os.path.getsize(path)
+            self._garbage[segment] = 0
+        self._active_id = segment
+
+    def _remove_segment_files(self, segment: int):
+        for suffix in (SEGMENT_SUFFIX, HINT_SUFFIX):
+            path = self._path(segment, suffix)
+            if os.path.exists(path):
+                os.remove(path)
+
+    # --- Индекс ---
+
+    def _put_entry(self, key: str, entry: IndexEntry):
+        old = self._index.get(key)
+        if old is not None:
+            self._garbage[old.segment] += old.record_size
+            self.memory_used -= old.value_size
+            if old.expires_at:
+                self._ttl_keys -= 1
+        else:
+            self.memory_used += len(key) + ENTRY_OVERHEAD
+            self._ordered.add(key)
+        if entry.expires_at:
+            self._ttl_keys += 1
+            heapq.heappush(self._expiry_heap, (entry.expires_at, key))
+        self.memory_used += entry.value_size
+        if self._policy is not None:
+            self._policy.add(key)
+        self._index[key] = entry
+
+    def _drop_entry(self, key: str) -> Optional[IndexEntry]:
+        old = self._index.pop(key, None)
+        if old is not None:
+            self._garbage[old.segment] += old.record_size
+            self.memory_used -= len(key) + ENTRY_OVERHEAD + old.value_size
+            if old.expires_at:
+                self._ttl_keys -= 1
+            if self._policy is not None:
+                self._policy.remove(key)
+            self._ordered.discard(key)
+        return old
+
+    # Запись индекса живого ключа; истекший ключ удаляется при обращении
+    def _live_entry(self, key: str, now: float) -> Optional[IndexEntry]:
+        entry = self._index.get(key)
+        if entry is not None and entry.expires_at and entry.expires_at <= now:
+            self._drop_entry(key)
+            self.expired += 1
+            return None
+        return entry
+
+    def _read_value(self, entry: IndexEntry) -> bytes:
+        return os.pread(self._readers[entry.segment], entry.value_size, entry.value_offset)
+
+    # --- Чтение ---
+
+    # Учет попадания или промаха чтения (под блокировкой)
+    def _record_access(self, key: str, entry: Optional[IndexEntry]):
+        if entry is None:
+            self.misses += 1
+            return
+        self.hits += 1
+        if self._policy is not None:
+            self._policy.touch(key)
+
+    def get(self, key: str, default: Any = None) -> Any:
+        now = self.clock()
+        with self._lock:
+            entry = self._live_entry(key, now)
+            self._record_access(key, entry)
+            if entry is None:
+                return default
+            data = self._read_value(entry)
+        return json.loads(data)
+
+    # Значения нескольких ключей, прочитанные под одной блокировкой
+    # (согласованный срез); отсутствующих ключей в результате нет
+    def get_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        found = {}
+        now = self.clock()
+        with self._lock:
+            for key in keys:
+                entry = self._live_entry(key, now)
+                self._record_access(key, entry)
+                if entry is not None:
+                    found[key] = self._read_value(entry)
+        return {key: json.loads(data) for key, data in found.items()}
+
+    def __contains__(self, key: str) -> bool:
+        now = self.clock()
+        with self._lock:
+            return self._live_entry(key, now) is not None
+
+    # Число ключей, включая истекшие, которые еще не удалены проходом
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._index)
+
+    def keys(self) -> List[str]:
+        now = self.clock()
+        with self._lock:
+            return [key for key, entry in self._index.items() if not entry.expires_at or entry.expires_at > now]
+
+    # Ключи с префиксом prefix по возрастанию: от start (включительно) или
+    # строго после курсора after — последнего ключа прошлой страницы, поэтому
+    # записи между страницами не сдвигают выдачу. Страница читается под одной
+    # блокировкой (согласованный срез) за O(log n + limit). Возвращает список
+    # (ключ, значение) и признак того, что есть следующая страница
+    def scan(self, prefix: str = "", start: str = None, after: str = None,
+             limit: int = 100) -> Tuple[List[Tuple[str, Any]], bool]:
+        lower = max(prefix, start or "")
+        page = []
+        more = False
+        now = self.clock()
+        with self._lock:
+            for key in self._ordered.iter_from(lower, after):
+                if not key.startswith(prefix):
+                    break
+                entry = self._index[key]
+                if entry.expires_at and entry.expires_at <= now:
+                    continue
+                if len(page) >= limit:
+                    more = True
+                    break
+                page.append((key, self._read_value(entry)))
+        return [(key, json.loads(data)) for key, data in page], more
+
+    # Все живые ключи с исходным JSON значений и моментами истечения вместе с
+    # номером последней записи — согласованный снимок для новой реплики.
+    # Значения читаются под блокировкой, запись на это время приостанавливается
+    def snapshot(self) -> Tuple[List[Tuple[str, bytes, float]], int]:
+        now = self.clock()
+        with self._lock:
+            items = [(key, self._read_value(entry), entry.expires_at) for key, entry in self._index.items()
+                     if not entry.expires_at or entry.expires_at > now]
+            return items, self._seq
+
+    # Оставшееся время жизни ключа в секундах; None — ключ бессрочный,
+    # KeyError — ключа нет
+    def ttl(self, key: str) -> Optional[float]:
+        now = self.clock()
+        with self._lock:
+            entry = self._live_entry(key, now)
+            if entry is None:
+                raise KeyError(key)
+            return entry.expires_at - now if entry.expires_at else None
+
+    # --- Запись ---
+
+    # ttl — время жизни в секундах (None — бессрочно)
+    def set(self, key: str, value: Any, ttl: float = None):
+        self.set_many([(key, value, ttl)])
+
+    # Несколько ключей атомарно: один пакет в журнале и один fsync.
+    # Элементы — пары (ключ, значение) или тройки (ключ, значение, ttl).
+    # Записанные ключи не вытесняются в том же вызове; пакет, который сам
+    # не помещается в бюджет памяти, отклоняется целиком (ValueError)
+    def set_many(self, items: Iterable[Tuple]):
+        records = []
+        sizes: Dict[str, int] = {}
+        now = self.clock()
+        for key, value, *ttl in items:
+            key_bytes = key.encode("utf-8")
+            value_bytes = json.dumps(value, ensure_ascii=False).encode("utf-8")
+            expires_at = now + ttl[0] if ttl and ttl[0] is not None else 0.0
+            sizes[key] = len(key) + len(value_bytes) + ENTRY_OVERHEAD
+            if self.max_memory and sizes[key] > self.max_memory:
+                raise ValueError(f"Значение ключа '{key}' больше бюджета памяти")
+            records.append((OP_SET, key, key_bytes, value_bytes, expires_at))
+        if not records:
+            return
+        if self.max_memory and sum(sizes.values()) > self.max_memory:
+            raise ValueError(f"Пакет из {len(sizes)} ключей больше бюджета памяти")
+        with self._lock:
+            seq = self._append_locked(records)
+            if self.max_memory and self.memory_used > self.max_memory:
+                seq = self._evict_locked(sizes.keys())
+        self._wait_durable(seq)
+
+    # Удаление ключа; возвращает удаленное значение, KeyError — если ключа нет
+    def delete(self, key: str) -> Any:
+        now = self.clock()
+        with self._lock:
+            entry = self._live_entry(key, now)
+            if entry is None:
+                raise KeyError(key)
+            old = self._read_value(entry)
+            seq = self._append_locked([(OP_DELETE, key, key.encode("utf-8"), b"", 0.0)])
+        self._wait_durable(seq)
+        return json.loads(old)
+
+    # Атомарное удаление нескольких ключей одним пакетом; возвращает
+    # удаленные значения, отсутствующие ключи пропускаются
+    def delete_many(self, keys: Iterable[str]) -> Dict[str, Any]:
+        removed = {}
+        now = self.clock()
+        with self._lock:
+            for key in keys:
+                entry = self._live_entry(key, now)
+                if entry is not None and key not in removed:
+                    removed[key] = self._read_value(entry)
+            if not removed:
+                return {}
+            seq = self._append_locked([(OP_DELETE, key, key.encode("utf-8"), b"", 0.0) for key in removed])
+        self._wait_durable(seq)
+        return {key: json.loads(data) for key, data in removed.items()}
+
+    # Применение готовых операций (операция, ключ, JSON значения, момент
+    # истечения) одним пакетом — записи журнала ведущего на реплике.
+    # Удаления отсутствующих ключей пропускаются
+    def apply(self, records: Iterable[Tuple[int, str, bytes, float]]):
+        with self._lock:
+            batch = []
+            present: Dict[str, bool] = {}
+            for op, key, value, expires_at in records:
+                if op == OP_DELETE and not present.get(key, key in self._index):
+                    continue
+                present[key] = op == OP_SET
+                batch.append((op, key, key.encode("utf-8"), value, expires_at))
+            if not batch:
+                return
+            seq = self._append_locked(batch)
+        self._wait_durable(seq)
+
+    # Дозапись в активный сегмент одним write (под блокировкой); несколько
+    # записей оборачиваются в пакет
+    def _append_locked(self, records: List[Tuple[int, str, bytes, bytes, float]]) -> int:
+        segment = self._active_id
+        start = self._sizes[segment]
+        payloads = [encode_set(key_bytes, value, expires_at) if op == OP_SET else encode_record(op, key_bytes, value)
+                    for op, _, key_bytes, value, expires_at in records]
+        if len(payloads) > 1:
+            _write_all(self._active_fd, encode_batch(payloads))
+            self._garbage[segment] += HEADER.size
+            start += HEADER.size
+        else:
+            _write_all(self._active_fd, payloads[0])
+
+        offset = start
+        for (op, key, key_bytes, value, expires_at), payload in zip(records, payloads):
+            if op == OP_SET:
+                value_offset = offset + len(payload) - len(value)
+                self._put_entry(key, IndexEntry(segment, value_offset, len(value), len(payload), expires_at))
+            else:
+                self._drop_entry(key)
+                self._garbage[segment] += len(payload)
+            offset += len(payload)
+
+        self._sizes[segment] = offset
+        self._seq += 1
+        self.writes += len(records)
+        seq = self._seq
+        if self.on_write is not None:
+            self.on_write(seq, [(op, key, value, expires_at) for op, key, _, value, expires_at in records])
+        if offset >= self.max_segment_bytes:
+            self._rotate_locked(segment)
+        return seq
+
+    # Вытеснение ключей до возвращения в бюджет; удаления пишутся в журнал
+    # одним пакетом, чтобы вытесненные ключи не вернулись при перезапуске.
+    # exclude — ключи, только что записанные вызывающим
+    def _evict_locked(self, exclude: Collection[str] = ()) -> int:
+        victims = []
+        while self.memory_used > self.max_memory:
+            key = self._policy.victim(exclude)
+            if key is None:
+                break
+            self._drop_entry(key)
+            victims.append(key)
+        self.evictions += len(victims)
+        if not victims:
+            return self._seq
+        return self._append_locked([(OP_DELETE, key, key.encode("utf-8"), b"", 0.0) for key in victims])
+
+    # Новый активный сегмент вместо segment; прежний сбрасывается на диск и
+    # больше не меняется. Пока идет fsync, блокировка отпущена, и другой
+    # писатель, тоже увидевший полный сегмент, может успеть его сменить —
+    # тогда повторная смена оставила бы пустой сегмент
+    def _rotate_locked(self, segment: int):
+        while self._syncing:
+            self._cond.wait()
+        if self._active_id != segment:
+            return
+        if self.fsync != FSYNC_NEVER:
+            os.fsync(self._active_fd)
+            self.fsyncs += 1
+        os.close(self._active_fd)
+        self._synced_seq = self._seq
+        self._open_active(self._active_id + 1)
+
+    def _wait_durable(self, seq: int):
+        if self.fsync == FSYNC_ALWAYS:
+            self.sync(seq)
+
+    # Групповая фиксация: один поток делает fsync за всех, кто успел записать
+    # до его начала; остальные ждут результата, а не вызывают fsync сами
+    def sync(self, seq: int = None):
+        with self._cond:
+            target = self._seq if seq is None else seq
+            while self._synced_seq < target:
+                if self._syncing:
+                    self._cond.wait()
+                    continue
+                self._syncing = True
+                covered = self._seq
+                fd = self._active_fd
+                self._lock.release()
+                try:
+                    os.fsync(fd)
+                finally:
+                    self._lock.acquire()
+                    self._syncing = False
+                    self._cond.notify_all()
+                self._synced_seq = max(self._synced_seq, covered)
+                self.fsyncs += 1
+
+    def _fsync_loop(self):
+        while not self._stop.wait(self.fsync_interval):
+            self.sync()
+
+    # --- Истечение TTL ---
+
+    # Удаление до limit истекших ключей из вершины кучи; True, если дошли до
+    # limit и истекшие ключи могут остаться. Каждый ключ — O(log n)
+    def _sweep_locked(self, now: float, limit: int) -> bool:
+        heap = self._expiry_heap
+        removed = 0
+        while heap and heap[0][0] <= now:
+            if removed >= limit:
+                return True
+            expires_at, key = heapq.heappop(heap)
+            entry = self._index.get(key)
+            if entry is not None and entry.expires_at == expires_at:
+                self._drop_entry(key)
+                self.expired += 1
+                removed += 1
+        # Устаревших элементов стало слишком много — куча строится заново
+        if len(heap) > 2 * self._ttl_keys + 1024:
+            self._expiry_heap = [(entry.expires_at, key) for key, entry in self._index.items() if entry.expires_at]
+            heapq.heapify(self._expiry_heap)
+        return False
+
+    # Проход по истекшим ключам; блокировка отпускается каждые SWEEP_BATCH
+    # ключей, чтобы не задерживать запросы. Возвращает число удаленных ключей
+    def sweep(self) -> int:
+        before = self.expired
+        more = True
+        while more:
+            now = self.clock()
+            with self._lock:
+                more = self._sweep_locked(now, SWEEP_BATCH)
+        return self.expired - before
+
+    def _sweep_loop(self):
+        while not self._stop.wait(self.sweep_interval):
+            self.sweep()
+
+    # --- Уплотнение ---
+
+    def garbage_ratio(self) -> float:
+        with self._lock:
+            total = sum(self._sizes.values())
+            return sum(self._garbage.values()) / total if total else 0.0
+
+    def should_compact(self) -> bool:
+        with self._lock:
+            total = sum(self._sizes.values())
+            garbage = sum(self._garbage.values())
+        return garbage >= self.compact_min_garbage_bytes and garbage >= total * self.compact_min_garbage_ratio
+
+    def _compaction_loop(self):
+        while not self._stop.wait(self.compact_interval):
+            if self.should_compact():
+                try:
+                    self.compact()
+                except OSError as e:
+                    print(f"Ошибка уплотнения журнала: {e}")
+
+    # Все сегменты, кроме активного, переписываются в один: только живые
+    # значения, без удаленных и истекших ключей. Копирование идет без блокировки — записи
+    # в это время продолжаются в активный сегмент; под блокировкой только
+    # подмена файлов и индекса. Возвращает False, если уплотнять нечего.
+    def compact(self) -> bool:
+        with self._compacting:
+            with self._lock:
+                if self._sizes[self._active_id] > 0:
+                    self._rotate_locked(self._active_id)
+                merged = sorted(segment for segment in self._readers if segment != self._active_id)
+                if not merged:
+                    return False
+                self._sweep_locked(self.clock(), len(self._expiry_heap))
+                snapshot = {key: entry for key, entry in self._index.items() if entry.segment != self._active_id}
+                readers = {segment: self._readers[segment] for segment in merged}
+                before = sum(self._sizes[segment] for segment in merged)
+
+            target = merged[-1]
+            data_tmp = self._path(target, SEGMENT_SUFFIX + COMPACTED_SUFFIX + TMP_SUFFIX)
+            hint_tmp = self._path(target, HINT_SUFFIX + TMP_SUFFIX)
+            compacted: Dict[str, IndexEntry] = {}
+            offset = 0
+            with open(data_tmp, "wb") as out, open(hint_tmp, "w", encoding="utf-8") as hint:
+                buffer = []
+                buffered = 0
+                for key, entry in snapshot.items():
+                    key_bytes = key.encode("utf-8")
+                    value = os.pread(readers[entry.segment], entry.value_size, entry.value_offset)
+                    record = encode_set(key_bytes, value, entry.expires_at)
+                    compacted[key] = IndexEntry(target, offset + len(record) - len(value),
+                                                len(value), len(record), entry.expires_at)
+                    offset += len(record)
+                    buffer.append(record)
+                    buffered += len(record)
+                    if buffered >= 1 << 20:
+                        out.write(b"".join(buffer))
+                        buffer, buffered = [], 0
+                out.write(b"".join(buffer))
+                out.flush()
+                os.fsync(out.fileno())
+
+                hint.write(json.dumps({"segment_size": offset}) + "\n")
+                for key, entry in compacted.items():
+                    hint.write(json.dumps([key, *entry[1:]], ensure_ascii=False) + "\n")
+                hint.flush()
+                os.fsync(hint.fileno())
+
+            with self._lock:
+                # Готовый сегмент помечается как завершенный; с этого момента
+                # после сбоя _recover доведет подмену до конца
+                compacted_path = self._path(target, SEGMENT_SUFFIX + COMPACTED_SUFFIX)
+                os.replace(data_tmp, compacted_path)
+                _fsync_directory(self.directory)
+                for segment in merged:
+                    os.close(self._readers.pop(segment))
+                    del self._sizes[segment]
+                    del self._garbage[segment]
+                    self._remove_segment_files(segment)
+                os.replace(compacted_path, self._path(target))
+                os.replace(hint_tmp, self._path(target, HINT_SUFFIX))
+                _fsync_directory(self.directory)
+
+                self._readers[target] = os.open(self._path(target), os.O_RDONLY)
+                self._sizes[target] = offset
+                self._garbage[target] = 0
+                # Ключи, измененные во время уплотнения, уже указывают на
+                # активный сегмент; их копии в новом сегменте — мусор
+                for key, entry in compacted.items():
+                    if self._index.get(key) == snapshot[key]:
+                        self._index[key] = entry  # момент истечения тот же, куча не меняется
+                    else:
+                        self._garbage[target] += entry.record_size
+                self.compactions += 1
+                self.reclaimed_bytes += before - offset
+            return True
+
+    # --- Состояние и завершение ---
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = sum(self._sizes.values())
+            garbage = sum(self._garbage.values())
+            return {
+                "keys": len(self._index),
+                "segments": len(self._sizes),
+                "active_segment": self._active_id,
+                "log_bytes": total,
+                "garbage_bytes": garbage,
+                "garbage_ratio": garbage / total if total else 0.0,
+                "writes": self.writes,
+                "fsync_mode": self.fsync,
+                "fsyncs": self.fsyncs,
+                "compactions": self.compactions,
+                "reclaimed_bytes": self.reclaimed_bytes,
+                "ttl_keys": self._ttl_keys,
+                "expired": self.expired,
+                "memory_used": self.memory_used,
+                "max_memory": self.max_memory,
+                "eviction_policy": self.eviction if self.max_memory else None,
+                "evictions": self.evictions,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / (self.hits + self.misses) if self.hits + self.misses else 0.0,
+            }
+
+    def close(self):
+        if self._active_fd < 0:
+            return
+        self._stop.set()
+        for thread in self._threads:
+            thread.join()
+        if self.fsync != FSYNC_NEVER:
+            self.sync()
+        with self._lock:
+            os.close(self._active_fd)
+            self._active_fd = -1
+            for fd in self._readers.values():
+                os.close(fd)
+            self._readers.clear()
+            if self._lock_fd is not None:
+                os.close(self._lock_fd)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
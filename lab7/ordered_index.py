@@ -0,0 +1,83 @@
+from bisect import bisect_left, bisect_right
+from typing import Iterator, List, Optional
+
+CHUNK_SIZE = 512
+
+
+# Упорядоченное множество строк-ключей: список отсортированных блоков до
+# 2·CHUNK_SIZE элементов и список максимумов блоков. Вставка и удаление —
+# бинарный поиск блока плюс сдвиг внутри блока (O(log n + CHUNK_SIZE)
+# вместо O(n) у одного большого списка); обход диапазона — O(log n + k).
+class SortedKeys:
+    def __init__(self, chunk_size: int = CHUNK_SIZE):
+        self.chunk_size = chunk_size
+        self._chunks: List[List[str]] = []
+        self._maxes: List[str] = []
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __contains__(self, key: str) -> bool:
+        i = bisect_left(self._maxes, key)
+        if i == len(self._maxes):
+            return False
+        chunk = self._chunks[i]
+        j = bisect_left(chunk, key)
+        return j < len(chunk) and chunk[j] == key
+
+    def add(self, key: str):
+        if not self._chunks:
+            self._chunks.append([key])
+            self._maxes.append(key)
+            self._size = 1
+            return
+        i = min(bisect_left(self._maxes, key), len(self._maxes) - 1)
+        chunk = self._chunks[i]
+        j = bisect_left(chunk, key)
+        if j < len(chunk) and chunk[j] == key:
+            return
+        chunk.insert(j, key)
+        self._maxes[i] = chunk[-1]
+        self._size += 1
+        if len(chunk) > 2 * self.chunk_size:
+            self._chunks.insert(i + 1, chunk[self.chunk_size:])
+            del chunk[self.chunk_size:]
+            self._maxes.insert(i, chunk[-1])
+
+    def discard(self, key: str):
+        i = bisect_left(self._maxes, key)
+        if i == len(self._maxes):
+            return
+        chunk = self._chunks[i]
+        j = bisect_left(chunk, key)
+        if j == len(chunk) or chunk[j] != key:
+            return
+        del chunk[j]
+        self._size -= 1
+        if chunk:
+            self._maxes[i] = chunk[-1]
+        else:
+            del self._chunks[i]
+            del self._maxes[i]
+
+    # Ключи по возрастанию начиная с lower (включительно) или строго после after
+    def iter_from(self, lower: str = "", after: Optional[str] = None) -> Iterator[str]:
+        if after is not None and after >= lower:
+            i = bisect_right(self._maxes, after)
+            find = bisect_right
+            bound = after
+        else:
+            i = bisect_left(self._maxes, lower)
+            find = bisect_left
+            bound = lower
+        if i == len(self._chunks):
+            return
+        chunk = self._chunks[i]
+        yield from chunk[find(chunk, bound):]
+        for position in range(i + 1, len(self._chunks)):
+            yield from self._chunks[position]
+
+    def __iter__(self) -> Iterator[str]:
+        for chunk in self._chunks:
+            yield from chunk
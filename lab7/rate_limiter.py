@@ -0,0 +1,156 @@
+import functools
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple, Union
+
+from flask import jsonify, request
+
+STRIPES = 64
+# Число корзин в полосе, после которого из нее удаляются простаивающие;
+# проход по полосе — не чаще раза в PRUNE_INTERVAL секунд
+PRUNE_THRESHOLD = 4096
+PRUNE_INTERVAL = 1.0
+# Жесткий предел корзин в полосе: сверх него вытесняется самая старая
+MAX_BUCKETS = 8192
+
+PERIODS = {"second": 1, "minute": 60, "hour": 3600, "day": 86400}
+LIMIT_PATTERN = re.compile(r"^\s*(\d+)\s*(?:per|/)\s*(second|minute|hour|day)s?\s*$")
+
+
+# Разбор лимита вида "10 per minute" в (скорость пополнения в секунду, емкость)
+def parse_limit(spec: str) -> Tuple[float, float]:
+    match = LIMIT_PATTERN.match(spec.lower())
+    if not match or int(match.group(1)) <= 0:
+        raise ValueError(f"Invalid rate limit: {spec!r}")
+    amount = int(match.group(1))
+    return amount / PERIODS[match.group(2)], float(amount)
+
+
+class _Stripe:
+    __slots__ = ("lock", "buckets", "allowed", "rejected", "evicted", "next_prune")
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # ключ -> (токены, время обновления, момент, когда корзина снова будет полной)
+        self.buckets: Dict[Any, Tuple[float, float, float]] = {}
+        self.allowed = 0
+        self.rejected = 0
+        self.evicted = 0
+        self.next_prune = float("-inf")
+
+
+# Корзины токенов для множества ключей. Ключи распределены по полосам
+# (stripes) со своей блокировкой, поэтому параллельные запросы разных
+# клиентов почти не ждут друг друга; проверка — один поиск в словаре и
+# немного арифметики. Полная корзина эквивалентна отсутствующей, поэтому
+# простаивающие корзины удаляются, когда полоса разрастается. Если много
+# клиентов одновременно тратят токены, удалять нечего: тогда полоса
+# ограничена max_buckets, и вытесняется самая давно созданная корзина
+# (ее клиент получает полную корзину заново).
+class TokenBuckets:
+    def __init__(self, stripes: int = STRIPES, prune_threshold: int = PRUNE_THRESHOLD,
+                 max_buckets: int = MAX_BUCKETS, prune_interval: float = PRUNE_INTERVAL, clock=time.monotonic):
+        self._stripes = [_Stripe() for _ in range(stripes)]
+        self.prune_threshold = prune_threshold
+        self.max_buckets = max_buckets
+        self.prune_interval = prune_interval
+        self.clock = clock
+
+    # Списание cost токенов; возвращает (разрешено, секунд до возможного повтора)
+    def hit(self, key, rate: float, capacity: float, cost: float = 1) -> Tuple[bool, float]:
+        stripe = self._stripes[hash(key) % len(self._stripes)]
+        now = self.clock()
+        with stripe.lock:
+            bucket = stripe.buckets.get(key)
+            if bucket is None:
+                tokens = capacity
+                if len(stripe.buckets) >= self.prune_threshold and now >= stripe.next_prune:
+                    self._prune(stripe, now)
+                    stripe.next_prune = now + self.prune_interval
+                if len(stripe.buckets) >= self.max_buckets:
+                    del stripe.buckets[next(iter(stripe.buckets))]
+                    stripe.evicted += 1
+            else:
+                tokens = min(capacity, bucket[0] + (now - bucket[1]) * rate)
+            if tokens >= cost:
+                tokens -= cost
+                stripe.buckets[key] = (tokens, now, now + (capacity - tokens) / rate)
+                stripe.allowed += 1
+                return True, 0.0
+            stripe.buckets[key] = (tokens, now, now + (capacity - tokens) / rate)
+            stripe.rejected += 1
+        if cost > capacity:
+            return False, capacity / rate
+        return False, (cost - tokens) / rate
+
+    # Удаление корзин, которые к текущему моменту уже заполнились бы целиком.
+    # Запускается при добавлении нового ключа в большую полосу и не чаще раза
+    # в prune_interval, поэтому полоса из заполняющихся корзин не
+    # просматривается на каждом новом ключе
+    @staticmethod
+    def _prune(stripe: _Stripe, now: float):
+        stale = [key for key, (_, _, full_at) in stripe.buckets.items() if full_at <= now]
+        for key in stale:
+            del stripe.buckets[key]
+
+    def reset(self):
+        for stripe in self._stripes:
+            with stripe.lock:
+                stripe.buckets.clear()
+                stripe.next_prune = float("-inf")
+
+    def stats(self) -> Dict[str, Any]:
+        allowed = rejected = evicted = buckets = 0
+        for stripe in self._stripes:
+            with stripe.lock:
+                allowed += stripe.allowed
+                rejected += stripe.rejected
+                evicted += stripe.evicted
+                buckets += len(stripe.buckets)
+        return {
+            "stripes": len(self._stripes),
+            "buckets": buckets,
+            "allowed": allowed,
+            "rejected": rejected,
+            "evicted": evicted,
+        }
+
+
+# Ограничение частоты запросов к эндпоинтам Flask на корзинах токенов.
+# Лимит разбирается один раз при объявлении маршрута; маршрут без лимита
+# (или при отключенном лимитере) остается без обертки и ничего не платит.
+class RateLimiter:
+    def __init__(self, key_func: Optional[Callable[[], str]] = None, enabled: bool = True,
+                 stripes: int = STRIPES, clock=time.monotonic):
+        self.key_func = key_func or (lambda: request.remote_addr or "127.0.0.1")
+        self.enabled = enabled
+        self.buckets = TokenBuckets(stripes=stripes, clock=clock)
+
+    # Декоратор маршрута: spec — "N per second|minute|hour|day" или None (без
+    # ограничения); cost — число токенов за запрос или функция, вычисляющая его
+    def limit(self, spec: Optional[str], cost: Union[float, Callable[[], float]] = 1):
+        if not self.enabled or not spec:
+            return lambda view: view
+        rate, capacity = parse_limit(spec)
+
+        def decorator(view):
+            scope = view.__name__
+
+            @functools.wraps(view)
+            def wrapper(*args, **kwargs):
+                amount = cost() if callable(cost) else cost
+                allowed, retry_after = self.buckets.hit((scope, self.key_func()), rate, capacity, amount)
+                if not allowed:
+                    response = jsonify({"error": f"Rate limit exceeded: {spec}"})
+                    response.headers["Retry-After"] = str(max(1, int(retry_after + 0.999)))
+                    return response, 429
+                return view(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def reset(self):
+        self.buckets.reset()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"enabled": self.enabled, **self.buckets.stats()}
@@ -0,0 +1,204 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+import requests
+
+LAB_DIR = os.path.dirname(os.path.abspath(__file__))
+LAB6_DIR = os.path.join(os.path.dirname(LAB_DIR), "lab6")
+
+# Генератор нагрузки и управление процессами — из нагрузочного теста lab6
+sys.path.insert(0, LAB6_DIR)
+from benchmark import run_load, stop_processes, wait_ready  # noqa: E402
+
+
+def start_process(args, env, cwd):
+    return subprocess.Popen(
+        args, cwd=cwd, env={**os.environ, **env},
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+
+
+def kv_env(port, **extra):
+    env = {"KV_PORT": str(port), "KV_DEBUG": "0", "KV_RATELIMIT": "0", "KV_FSYNC": "never"}
+    env.update({name: str(value) for name, value in extra.items()})
+    return env
+
+
+# Ведущий с заранее записанными ключами bench:00000...
+def start_leader(options, data_dir):
+    url = f"http://localhost:{options.base_port}"
+    process = start_process([sys.executable, "app.py"], kv_env(options.base_port, KV_DATA_DIR=data_dir), LAB_DIR)
+    if not wait_ready(url):
+        stop_processes([process])
+        raise RuntimeError("Ведущий не запустился")
+    session = requests.Session()
+    for start in range(0, options.keys, 1000):
+        items = [{"key": f"bench:{i:05d}", "value": {"n": i, "payload": "x" * options.value_size}}
+                 for i in range(start, min(start + 1000, options.keys))]
+        session.post(f"{url}/mset", json={"items": items}, timeout=30).raise_for_status()
+    return url, process
+
+
+# Ожидание, пока реплика догонит ведущего
+def wait_caught_up(url, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            status = requests.get(f"{url}/replication/status", timeout=1).json()
+            if status.get("epoch") and status["lag_operations"] == 0:
+                return status
+        except (requests.exceptions.RequestException, ValueError):
+            pass
+        time.sleep(0.1)
+    raise RuntimeError(f"Реплика {url} не догнала ведущего")
+
+
+def start_followers(options, leader_url):
+    urls = [f"http://localhost:{options.base_port + 1 + i}" for i in range(options.replicas)]
+    processes = [
+        start_process([sys.executable, "app.py"],
+                      kv_env(options.base_port + 1 + i, KV_ROLE="follower", KV_LEADER_URL=leader_url), LAB_DIR)
+        for i in range(options.replicas)
+    ]
+    try:
+        for url in urls:
+            if not wait_ready(url):
+                raise RuntimeError(f"Реплика {url} не запустилась")
+            wait_caught_up(url)
+    except RuntimeError:
+        stop_processes(processes)
+        raise
+    return urls, processes
+
+
+# Фоновая запись в ведущего с частотой rps на время прогона
+class Writer:
+    def __init__(self, leader_url, rps):
+        self.leader_url = leader_url
+        self.rps = rps
+        self.writes = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        session = requests.Session()
+        while not self._stop.wait(1 / self.rps):
+            try:
+                session.post(f"{self.leader_url}/set", json={"key": "bench:hot", "value": self.writes}, timeout=5)
+                self.writes += 1
+            except requests.exceptions.RequestException:
+                pass
+
+    def __enter__(self):
+        if self.rps > 0:
+            self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        if self._thread.is_alive():
+            self._thread.join()
+
+
+# Прогон чтения через балансировщик lab6 поверх первых count реплик
+def run_case(options, leader_url, follower_urls, count):
+    env = {
+        "LB_PORT": str(options.lb_port),
+        "LB_SERVERS": ",".join(follower_urls[:count]),
+        "LB_POOL_FILE": "",
+        "LB_CACHE_MAX_BYTES": "0",
+        "LB_DEBUG": "0",
+        "LB_LOG_LEVEL": "WARNING",
+    }
+    for item in options.lb_env:
+        name, _, value = item.partition("=")
+        env[name] = value
+    lb_url = f"http://localhost:{options.lb_port}"
+    balancer = start_process([sys.executable, "load_balancer.py"], env, LAB6_DIR)
+    try:
+        if not wait_ready(lb_url):
+            raise RuntimeError("Балансировщик не запустился")
+        target = f"{lb_url}/get/bench:{options.keys // 2:05d}"
+        if options.warmup > 0:
+            run_load(target, options.concurrency, options.warmup)
+        with Writer(leader_url, options.write_rps) as writer:
+            result = run_load(target, options.concurrency, options.duration)
+            replication = [requests.get(f"{url}/replication/status", timeout=2).json()
+                           for url in follower_urls[:count]]
+    finally:
+        stop_processes([balancer])
+
+    result.update({
+        "replicas": count,
+        "writes": writer.writes,
+        "max_lag_operations": max(status["lag_operations"] for status in replication),
+        "max_staleness_s": max(status["staleness_s"] or 0 for status in replication),
+    })
+    return result
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Масштабирование чтения lab7 на репликах за балансировщиком lab6")
+    parser.add_argument("--replicas", type=int, default=3)
+    parser.add_argument("--base-port", type=int, default=5200, help="порт ведущего, реплики — следующие")
+    parser.add_argument("--lb-port", type=int, default=5199)
+    parser.add_argument("--keys", type=int, default=10000)
+    parser.add_argument("--value-size", type=int, default=100)
+    parser.add_argument("--write-rps", type=float, default=50, help="запись в ведущего во время чтения")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--warmup", type=float, default=1)
+    parser.add_argument("--lb-env", action="append", default=[], metavar="NAME=VALUE",
+                        help="дополнительные переменные окружения балансировщика")
+    parser.add_argument("--output", default="replica_benchmark_results.json")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    options = parse_args(argv)
+    report = {
+        "started_at": datetime.now().isoformat(),
+        "config": vars(options),
+        "results": [],
+    }
+
+    processes = []
+    with tempfile.TemporaryDirectory(prefix="kv-leader-") as data_dir:
+        try:
+            leader_url, leader = start_leader(options, data_dir)
+            processes.append(leader)
+            follower_urls, followers = start_followers(options, leader_url)
+            processes.extend(followers)
+
+            counts = sorted({1, options.replicas})
+            for count in counts:
+                print(f"Прогон: реплик={count}")
+                result = run_case(options, leader_url, follower_urls, count)
+                report["results"].append(result)
+                print(f"  {result['throughput_rps']} запросов/с, "
+                      f"p50={result['latency_ms']['p50']} мс, "
+                      f"p99={result['latency_ms']['p99']} мс, "
+                      f"ошибки={result['error_rate']:.2%}, "
+                      f"отставание={result['max_lag_operations']} оп./{result['max_staleness_s']} с")
+        finally:
+            stop_processes(processes)
+
+    if len(report["results"]) > 1:
+        base = report["results"][0]["throughput_rps"]
+        report["speedup"] = round(report["results"][-1]["throughput_rps"] / base, 2) if base else None
+        print(f"Ускорение чтения: x{report['speedup']}")
+
+    with open(options.output, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"Результаты сохранены в {options.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+import itertools
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
+
+import requests
+
+from log_store import OP_DELETE, OP_SET
+
+REPLICATION_LOG_SIZE = 100000
+REPLICATION_LOG_BYTES = 64 * 1024 * 1024
+RECORD_OVERHEAD = 64  # примерная цена записи в буфере сверх ключа и значения
+POLL_WAIT = 1.0
+POLL_LIMIT = 1000
+RETRY_DELAY = 1.0
+
+
+# Отставание реплики больше буфера журнала или ведущий перезапущен —
+# нужна полная синхронизация по снимку
+class SnapshotRequired(Exception):
+    pass
+
+
+# Журнал репликации ведущего: последние записи хранилища под номерами LSN
+# (номер записи LogStore, идут подряд). Хранится не больше capacity операций
+# и не больше max_bytes байт ключей и значений, чтобы крупные значения не
+# раздували буфер; отставшая сильнее реплика получает снимок. epoch меняется
+# при каждом запуске ведущего, так как номера записей начинаются заново.
+class ReplicationLog:
+    def __init__(self, capacity: int = REPLICATION_LOG_SIZE, max_bytes: int = REPLICATION_LOG_BYTES):
+        self.capacity = capacity
+        self.max_bytes = max_bytes
+        self.epoch = uuid.uuid4().hex
+        self.lsn = 0
+        self._entries: deque = deque()  # (lsn, [[операция, ключ, значение JSON, истечение]], байт)
+        self._size = 0
+        self._bytes = 0
+        self._cond = threading.Condition()
+
+    # Обработчик on_write хранилища: вызывается под его блокировкой, в порядке записи
+    def append(self, lsn: int, records: List[Tuple[int, str, bytes, float]]):
+        encoded = [[op, key, value.decode("utf-8") if op == OP_SET else None, expires_at]
+                   for op, key, value, expires_at in records]
+        size = sum(len(key) + len(value) + RECORD_OVERHEAD for _, key, value, _ in records)
+        with self._cond:
+            self._entries.append((lsn, encoded, size))
+            self._size += len(encoded)
+            self._bytes += size
+            self.lsn = lsn
+            while (self._size > self.capacity or self._bytes > self.max_bytes) and len(self._entries) > 1:
+                _, dropped, dropped_size = self._entries.popleft()
+                self._size -= len(dropped)
+                self._bytes -= dropped_size
+            self._cond.notify_all()
+
+    # Записи после after (не больше limit) и LSN, взятый под той же
+    # блокировкой: ответ с полным списком записей до этого LSN означает, что
+    # реплика догнала ведущего. Если новых записей нет, ждет до wait секунд
+    def read(self, after: int, limit: int = POLL_LIMIT, wait: float = 0.0) -> Tuple[List[Tuple[int, list]], int]:
+        with self._cond:
+            if wait and self.lsn <= after:
+                self._cond.wait_for(lambda: self.lsn > after, timeout=wait)
+            if after > self.lsn:
+                raise SnapshotRequired()
+            first = self._entries[0][0] if self._entries else self.lsn + 1
+            if after < first - 1:
+                raise SnapshotRequired()
+            # Новые записи — в конце очереди: обход справа стоит O(отставание)
+            behind = [(lsn, encoded) for lsn, encoded, _ in itertools.islice(reversed(self._entries),
+                                                                               self.lsn - after)]
+            lsn = self.lsn
+        behind.reverse()
+        return behind[:limit], lsn
+
+    def status(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "role": "leader",
+                "epoch": self.epoch,
+                "lsn": self.lsn,
+                "buffered_lsn_from": self._entries[0][0] if self._entries else None,
+                "buffered_operations": self._size,
+                "buffered_bytes": self._bytes,
+            }
+
+
+# HTTP-клиент эндпоинтов репликации ведущего
+class LeaderClient:
+    def __init__(self, url: str, timeout: float = 5.0):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+        self.session = requests.Session()
+
+    def snapshot(self) -> Dict[str, Any]:
+        response = self.session.get(f"{self.url}/replication/snapshot", timeout=self.timeout)
+        response.raise_for_status()
+        return response.json()
+
+    def log(self, epoch: str, after: int, wait: float, limit: int) -> Dict[str, Any]:
+        response = self.session.get(
+            f"{self.url}/replication/log",
+            params={"epoch": epoch, "after": after, "wait": wait, "limit": limit},
+            timeout=self.timeout + wait
+        )
+        if response.status_code == 409:
+            raise SnapshotRequired()
+        response.raise_for_status()
+        return response.json()
+
+
+# Реплика: забирает журнал ведущего длинными опросами и применяет его к
+# локальному хранилищу. Свежесть — время с последнего ответа ведущего, в
+# котором реплика уже догнала его; по ней приложение отказывает в чтении
+# слишком устаревшей реплики.
+class Follower:
+    def __init__(self, store, client: LeaderClient, poll_wait: float = POLL_WAIT,
+                 poll_limit: int = POLL_LIMIT, retry_delay: float = RETRY_DELAY, clock=time.monotonic):
+        self.store = store
+        self.client = client
+        self.poll_wait = poll_wait
+        self.poll_limit = poll_limit
+        self.retry_delay = retry_delay
+        self.clock = clock
+        self.epoch: Optional[str] = None
+        self.applied_lsn = 0
+        self.leader_lsn = 0
+        self.caught_up_at: Optional[float] = None
+        self.last_contact: Optional[float] = None
+        self.snapshots = 0
+        self.errors = 0
+        self.last_error: Optional[str] = None
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # leader_lsn — LSN, взятый ведущим вместе с отданными записями; если
+    # реплика применила все записи до него, она догнала ведущего
+    def _contact(self, leader_lsn: int):
+        now = self.clock()
+        self.leader_lsn = leader_lsn
+        self.last_contact = now
+        if self.applied_lsn >= leader_lsn:
+            self.caught_up_at = now
+
+    # Полная синхронизация: содержимое хранилища заменяется снимком ведущего
+    def sync_snapshot(self):
+        data = self.client.snapshot()
+        keep = {key for key, _, _ in data["items"]}
+        records = [(OP_DELETE, key, b"", 0.0) for key in self.store.keys() if key not in keep]
+        records += [(OP_SET, key, value.encode("utf-8"), expires_at) for key, value, expires_at in data["items"]]
+        self.store.apply(records)
+        self.epoch = data["epoch"]
+        self.applied_lsn = data["lsn"]
+        self.snapshots += 1
+        self._contact(data["lsn"])
+
+    # Один опрос ведущего; все полученные записи применяются одним пакетом
+    def poll_once(self):
+        if self.epoch is None:
+            self.sync_snapshot()
+            return
+        try:
+            data = self.client.log(self.epoch, self.applied_lsn, self.poll_wait, self.poll_limit)
+        except SnapshotRequired:
+            self.epoch = None
+            return
+        records = []
+        for lsn, entry in data["entries"]:
+            for op, key, value, expires_at in entry:
+                records.append((op, key, value.encode("utf-8") if op == OP_SET else b"", expires_at))
+        if records:
+            self.store.apply(records)
+        if data["entries"]:
+            self.applied_lsn = data["entries"][-1][0]
+        self._contact(data["lsn"])
+
+    def run(self):
+        while not self._stop.is_set():
+            try:
+                self.poll_once()
+            except (requests.exceptions.RequestException, ValueError, KeyError) as e:
+                self.errors += 1
+                self.last_error = str(e)
+                self._stop.wait(self.retry_delay)
+
+    def start(self):
+        self._thread = threading.Thread(target=self.run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    # Секунды с момента, когда реплика в последний раз совпадала с ведущим
+    def staleness(self) -> float:
+        if self.caught_up_at is None:
+            return float("inf")
+        return self.clock() - self.caught_up_at
+
+    def status(self) -> Dict[str, Any]:
+        now = self.clock()
+        staleness = self.staleness()
+        return {
+            "role": "follower",
+            "leader": self.client.url,
+            "epoch": self.epoch,
+            "applied_lsn": self.applied_lsn,
+            "leader_lsn": self.leader_lsn,
+            "lag_operations": max(0, self.leader_lsn - self.applied_lsn),
+            "staleness_s": round(staleness, 3) if staleness != float("inf") else None,
+            "last_contact_s": round(now - self.last_contact, 3) if self.last_contact is not None else None,
+            "snapshots": self.snapshots,
+            "errors": self.errors,
+            "last_error": self.last_error,
+        }
@@ -0,0 +1,61 @@
+import unittest
+from eviction import LFUPolicy, LRUPolicy, SampledLRUPolicy, make_policy
+
+
+class TestEvictionPolicies(unittest.TestCase):
+    def test_lru_evicts_least_recent(self):
+        policy = LRUPolicy()
+        for key in "abc":
+            policy.add(key)
+        policy.touch("a")
+        self.assertEqual(policy.victim(), "b")
+        policy.remove("b")
+        self.assertEqual(policy.victim(), "c")
+
+    def test_lfu_evicts_least_frequent(self):
+        policy = LFUPolicy()
+        for key in "abc":
+            policy.add(key)
+        policy.touch("a")
+        policy.touch("a")
+        policy.touch("b")
+        self.assertEqual(policy.victim(), "c")
+        policy.remove("c")
+        self.assertEqual(policy.victim(), "b")
+        policy.add("d")  # новый ключ — самая низкая частота
+        self.assertEqual(policy.victim(), "d")
+
+    def test_sampled_prefers_old_keys(self):
+        policy = SampledLRUPolicy(samples=5, seed=1)
+        for i in range(1000):
+            policy.add(f"k{i}")
+        for i in range(100, 1000):
+            policy.touch(f"k{i}")
+        victims = []
+        for _ in range(50):
+            key = policy.victim()
+            victims.append(int(key[1:]))
+            policy.remove(key)
+        self.assertEqual(len(policy), 950)
+        # Старые ключи — 10% от всех, но попадают в выборку из 5 в ~41% случаев
+        self.assertGreater(sum(1 for v in victims if v < 100), 12)
+
+    def test_excluded_keys_are_skipped(self):
+        for policy in (LRUPolicy(), LFUPolicy(), SampledLRUPolicy(seed=1)):
+            for key in "abc":
+                policy.add(key)
+            policy.touch("a")
+            policy.touch("b")
+            self.assertEqual(policy.victim(), "c")
+            self.assertIn(policy.victim(exclude={"c"}), ("a", "b"))
+            if policy.name != "sampled":
+                self.assertEqual(policy.victim(exclude={"c"}), "a")
+            self.assertIsNone(policy.victim(exclude={"a", "b", "c"}))
+
+    def test_unknown_policy(self):
+        with self.assertRaises(ValueError):
+            make_policy("fifo")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,198 @@
+import importlib
+import importlib.util
+import os
+import tempfile
+import unittest
+
+
+class TestBatchEndpoints(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        os.environ["KV_DATA_DIR"] = cls.directory.name
+        os.environ["KV_COMPACT_INTERVAL"] = "0"
+        cls.app = importlib.import_module("app")
+        cls.client = cls.app.app.test_client()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.app.data_store.close()
+        cls.directory.cleanup()
+
+    def setUp(self):
+        self.app.limiter.reset()
+
+    def test_mset_mget_mdelete(self):
+        items = [{"key": f"k{i}", "value": {"n": i}} for i in range(20)]
+        response = self.client.post("/mset", json={"items": items})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json["count"], 20)
+
+        response = self.client.post("/mget", json={"keys": ["k1", "k19", "нет"]})
+        self.assertEqual(response.json["values"], {"k1": {"n": 1}, "k19": {"n": 19}})
+        self.assertEqual(response.json["missing"], ["нет"])
+
+        response = self.client.delete("/mdelete", json={"keys": ["k1", "k2", "нет"]})
+        self.assertEqual(response.json["deleted"], {"k1": {"n": 1}, "k2": {"n": 2}})
+        self.assertEqual(self.client.get("/exists/k1").json["exists"], False)
+
+    def test_invalid_batch_is_not_applied(self):
+        items = [{"key": "good", "value": 1}, {"key": "bad"}]
+        self.assertEqual(self.client.post("/mset", json={"items": items}).status_code, 400)
+        self.assertNotIn("good", self.app.data_store)
+
+    def test_set_with_ttl(self):
+        response = self.client.post("/set", json={"key": "t", "value": 1, "ttl": 30})
+        self.assertEqual(response.status_code, 201)
+        self.assertLessEqual(self.client.get("/ttl/t").json["ttl"], 30)
+        self.assertEqual(self.client.post("/set", json={"key": "t", "value": 1, "ttl": -1}).status_code, 400)
+        self.assertEqual(self.client.get("/ttl/нет").status_code, 404)
+
+    def test_scan_pagination(self):
+        items = [{"key": f"scan:{i:02d}", "value": i} for i in range(7)]
+        self.client.post("/mset", json={"items": items})
+        keys, cursor = [], None
+        while True:
+            query = {"prefix": "scan:", "limit": 3}
+            if cursor:
+                query["cursor"] = cursor
+            response = self.client.get("/scan", query_string=query).json
+            keys.extend(item["key"] for item in response["items"])
+            cursor = response["next_cursor"]
+            if cursor is None:
+                break
+        self.assertEqual(keys, [item["key"] for item in items])
+        self.assertEqual(self.client.get("/scan?cursor=!!!").status_code, 400)
+        self.assertEqual(self.client.get("/scan?limit=0").status_code, 400)
+
+    # Пакет, не помещающийся в бюджет памяти, отклоняется; записанный пакет
+    # остается целиком, вытесняются прежние ключи
+    def test_mset_with_memory_budget(self):
+        directory = tempfile.TemporaryDirectory()
+        store, self.app.data_store = self.app.data_store, self.app.LogStore(
+            directory.name, max_memory=20 * 260, eviction="lfu", background=False)
+        try:
+            self.client.post("/mset", json={"items": [{"key": f"old{i}", "value": "x" * 50} for i in range(20)]})
+            items = [{"key": f"m{i}", "value": "x" * 50} for i in range(15)]
+            response = self.client.post("/mset", json={"items": items})
+            self.assertEqual(response.status_code, 201)
+            self.assertTrue(all(item["key"] in self.app.data_store for item in items))
+            items = [{"key": f"big{i}", "value": "x" * 50} for i in range(21)]
+            self.assertEqual(self.client.post("/mset", json={"items": items}).status_code, 413)
+            self.assertNotIn("big0", self.app.data_store)
+        finally:
+            self.app.data_store.close()
+            self.app.data_store = store
+            directory.cleanup()
+
+    def test_limit_counts_keys(self):
+        items = [{"key": f"w{i}", "value": i} for i in range(600)]
+        self.assertEqual(self.client.post("/mset", json={"items": items}).status_code, 201)
+        self.assertEqual(self.client.post("/mset", json={"items": items}).status_code, 429)
+
+    def test_log_and_snapshot(self):
+        self.client.post("/set", json={"key": "r", "value": 1})
+        snapshot = self.client.get("/replication/snapshot").json
+        self.assertIn(["r", "1", 0.0], snapshot["items"])
+        epoch = snapshot["epoch"]
+        self.client.post("/set", json={"key": "r", "value": 2})
+        response = self.client.get("/replication/log", query_string={"epoch": epoch, "after": snapshot["lsn"]})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json["entries"][-1][1], [[1, "r", "2", 0.0]])
+        self.assertEqual(self.client.get("/health").json, {"status": "healthy", "role": "leader"})
+
+    # LSN ответа берется вместе с записями: запись, попавшая в журнал после
+    # чтения, не сдвигает его вперед последней отданной записи
+    def test_log_lsn_matches_entries_under_writes(self):
+        log = self.app.replication_log
+        after = log.lsn
+        self.client.post("/set", json={"key": "lsn", "value": 1})
+        read = log.read
+
+        def read_then_write(*args):
+            result = read(*args)
+            self.app.data_store.set("lsn", 2)  # параллельная запись сразу после чтения
+            return result
+        log.read = read_then_write
+        try:
+            response = self.client.get("/replication/log", query_string={"epoch": log.epoch, "after": after}).json
+        finally:
+            del log.read
+        self.assertEqual(response["lsn"], response["entries"][-1][0])
+        self.assertEqual(response["lsn"], log.lsn - 1)
+
+    def test_epoch_mismatch_and_bad_params(self):
+        response = self.client.get("/replication/log", query_string={"epoch": "old", "after": 0})
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json["epoch"], self.app.replication_log.epoch)
+        epoch = self.app.replication_log.epoch
+        for query in ({"after": "x"}, {"wait": "soon"}, {"limit": "1.5"}):
+            response = self.client.get("/replication/log", query_string=dict(query, epoch=epoch))
+            self.assertEqual(response.status_code, 400, query)
+        response = self.client.get("/replication/log", query_string={"epoch": epoch, "after": 10 ** 9})
+        self.assertEqual(response.status_code, 409)
+
+
+# Приложение в роли реплики загружается отдельным модулем: настройки
+# читаются из окружения при импорте. Ведущий недоступен, опрос остановлен,
+# так что свежесть реплики задается тестом
+class TestFollowerGuard(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.directory = tempfile.TemporaryDirectory()
+        environ = {"KV_ROLE": "follower", "KV_LEADER_URL": "http://127.0.0.1:9",
+                   "KV_DATA_DIR": cls.directory.name, "KV_COMPACT_INTERVAL": "0"}
+        saved = {name: os.environ.get(name) for name in environ}
+        os.environ.update(environ)
+        try:
+            spec = importlib.util.spec_from_file_location(
+                "follower_app", os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py"))
+            cls.app = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(cls.app)
+        finally:
+            for name, value in saved.items():
+                if value is None:
+                    os.environ.pop(name, None)
+                else:
+                    os.environ[name] = value
+        cls.app.follower.stop()
+        cls.client = cls.app.app.test_client()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.app.data_store.close()
+        cls.directory.cleanup()
+
+    def setUp(self):
+        self.app.follower.caught_up_at = None
+
+    def test_writes_are_rejected(self):
+        self.app.follower.caught_up_at = self.app.follower.clock()
+        requests = [("post", "/set", {"key": "k", "value": 1}),
+                    ("post", "/mset", {"items": [{"key": "k", "value": 1}]}),
+                    ("delete", "/delete/k", None),
+                    ("delete", "/mdelete", {"keys": ["k"]})]
+        for method, path, body in requests:
+            response = getattr(self.client, method)(path, json=body)
+            self.assertEqual(response.status_code, 403, path)
+            self.assertEqual(response.json["leader"], "http://127.0.0.1:9")
+
+    def test_stale_replica_refuses_reads(self):
+        response = self.client.get("/get/k")
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.headers["Retry-After"], "1")
+        self.assertEqual(self.client.post("/mget", json={"keys": ["k"]}).status_code, 503)
+        self.assertEqual(self.client.get("/health").status_code, 503)
+        # Свежая реплика отвечает на чтение сама
+        self.app.follower.caught_up_at = self.app.follower.clock()
+        self.assertEqual(self.client.get("/get/k").status_code, 404)
+        self.assertEqual(self.client.get("/health").json["status"], "healthy")
+
+    def test_leader_endpoints_are_absent(self):
+        self.assertEqual(self.client.get("/replication/log").status_code, 404)
+        self.assertEqual(self.client.get("/replication/snapshot").status_code, 404)
+        self.assertEqual(self.client.get("/replication/status").json["role"], "follower")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,226 @@
+import os
+import tempfile
+import threading
+import unittest
+from conftest import FakeClock
+from log_store import FSYNC_NEVER, SEGMENT_SUFFIX, LogStore
+
+
+class TestLogStore(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = self.directory.name
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def open(self, **options):
+        options.setdefault("background", False)
+        return LogStore(self.path, **options)
+
+    def test_replay_after_reopen(self):
+        with self.open() as store:
+            store.set("a", {"x": 1})
+            store.set("b", "значение")
+            store.set("a", [1, 2])
+            self.assertEqual(store.delete("b"), "значение")
+            with self.assertRaises(KeyError):
+                store.delete("b")
+        with self.open() as store:
+            self.assertEqual(store.get("a"), [1, 2])
+            self.assertNotIn("b", store)
+            self.assertEqual(len(store), 1)
+
+    def test_torn_tail_is_truncated(self):
+        with self.open() as store:
+            store.set("a", 1)
+            store.set("b", 2)
+            segment = os.path.join(self.path, f"{store.stats()['active_segment']:06d}.log")
+        with open(segment, "ab") as f:
+            f.write(b"\x01\x02\x03")
+        with self.open() as store:
+            self.assertEqual((store.get("a"), store.get("b")), (1, 2))
+            store.set("c", 3)
+        with self.open() as store:
+            self.assertEqual(store.get("c"), 3)
+
+    def test_compaction_reclaims_garbage(self):
+        with self.open(max_segment_bytes=4096, fsync=FSYNC_NEVER) as store:
+            for i in range(2000):
+                store.set(f"k{i % 50}", i)
+            store.delete("k0")
+            before = store.stats()
+            self.assertGreater(before["segments"], 2)
+            self.assertTrue(store.compact())
+            after = store.stats()
+            self.assertEqual(after["segments"], 2)
+            self.assertLess(after["log_bytes"], before["log_bytes"] // 5)
+            self.assertEqual(after["garbage_bytes"], 0)
+            store.set("k1", "после")
+        with self.open() as store:
+            self.assertEqual(store.get("k1"), "после")
+            self.assertEqual(store.get("k49"), 1999)
+            self.assertNotIn("k0", store)
+            self.assertEqual(len(store), 49)
+
+    def test_batch_is_atomic(self):
+        with self.open() as store:
+            store.set_many([("a", 1), ("b", 2), ("c", 3)])
+            self.assertEqual(store.delete_many(["a", "x"]), {"a": 1})
+            self.assertEqual(store.get_many(["a", "b", "c"]), {"b": 2, "c": 3})
+            store.set_many([("d", 4), ("e", 5)])
+            segment = os.path.join(self.path, f"{store.stats()['active_segment']:06d}.log")
+        # Оборванный последний пакет отбрасывается целиком
+        with open(segment, "r+b") as f:
+            f.truncate(os.path.getsize(segment) - 3)
+        with self.open() as store:
+            self.assertEqual(store.get_many(["a", "b", "c", "d", "e"]), {"b": 2, "c": 3})
+
+    def test_ttl_lazy_and_swept_expiry(self):
+        clock = FakeClock()
+        with self.open(clock=clock) as store:
+            store.set("short", 1, ttl=5)
+            store.set("long", 2, ttl=50)
+            store.set("forever", 3)
+            store.set_many([(f"batch{i}", i, 10) for i in range(100)])
+            self.assertAlmostEqual(store.ttl("short"), 5)
+            self.assertIsNone(store.ttl("forever"))
+
+            clock.now += 6
+            self.assertIsNone(store.get("short"))  # ленивое истечение
+            self.assertEqual(store.stats()["expired"], 1)
+            clock.now += 5
+            self.assertEqual(store.sweep(), 100)
+            self.assertEqual(sorted(store.keys()), ["forever", "long"])
+            self.assertEqual(store.stats()["ttl_keys"], 1)
+
+            store.set("long", 4)  # перезапись снимает TTL
+            clock.now += 100
+            self.assertEqual(store.sweep(), 0)
+            store.set("gone", 5, ttl=1)
+        clock.now += 2
+        # Истекшие за время простоя ключи не загружаются и не переносятся уплотнением
+        with self.open(clock=clock) as store:
+            self.assertEqual(sorted(store.keys()), ["forever", "long"])
+            self.assertEqual(len(store), 2)
+            store.set("later", 6, ttl=1000)
+            self.assertTrue(store.compact())
+        with self.open(clock=clock) as store:
+            self.assertAlmostEqual(store.ttl("later"), 1000)
+            self.assertEqual(len(store), 3)
+
+    def test_memory_budget_evicts_and_persists(self):
+        budget = 20 * 260
+        with self.open(max_memory=budget, eviction="lru") as store:
+            for i in range(20):
+                store.set(f"k{i}", "x" * 50)
+            store.get("k0")
+            store.set("new", "x" * 50)
+            stats = store.stats()
+            self.assertLessEqual(stats["memory_used"], budget)
+            self.assertEqual(stats["evictions"], 1)
+            self.assertIn("k0", store)
+            self.assertNotIn("k1", store)
+            self.assertIsNone(store.get("k1"))
+            self.assertEqual((stats["hits"], store.stats()["misses"]), (1, 1))
+            with self.assertRaises(ValueError):
+                store.set("big", "x" * budget)
+        # Вытесненные ключи не возвращаются после перезапуска
+        with self.open(max_memory=budget) as store:
+            self.assertNotIn("k1", store)
+            self.assertEqual(len(store), 20)
+        # Уменьшенный бюджет применяется при открытии
+        with self.open(max_memory=budget // 2, eviction="lfu") as store:
+            self.assertLessEqual(store.stats()["memory_used"], budget // 2)
+
+    # Только что записанный ключ не становится жертвой ни при одной политике:
+    # у LFU новый ключ имеет самую низкую частоту
+    def test_written_keys_are_not_evicted(self):
+        budget = 20 * 260
+        for eviction in ("lru", "lfu", "sampled"):
+            for name in os.listdir(self.path):
+                os.remove(os.path.join(self.path, name))
+            with self.subTest(eviction=eviction), self.open(max_memory=budget, eviction=eviction) as store:
+                for i in range(20):
+                    store.set(f"k{i}", "x" * 50)
+                    store.get(f"k{i}")
+                store.set("new", "x" * 50)
+                self.assertIn("new", store)
+                batch = [(f"b{i}", "x" * 50) for i in range(15)]
+                store.set_many(batch)
+                self.assertTrue(all(key in store for key, _ in batch))
+                stats = store.stats()
+                self.assertLessEqual(stats["memory_used"], budget)
+                self.assertEqual(stats["evictions"], 16)
+                with self.assertRaises(ValueError):
+                    store.set_many([(f"c{i}", "x" * 50) for i in range(21)])
+                self.assertNotIn("c0", store)
+
+    def test_scan_pages_by_cursor(self):
+        clock = FakeClock()
+        with self.open(clock=clock) as store:
+            store.set_many([(f"user:{i:03d}", i) for i in range(25)] + [("other", 0), ("user", -1)])
+            store.set("user:005", 5, ttl=1)
+            clock.now += 2
+            page, more = store.scan("user:", limit=10)
+            self.assertTrue(more)
+            self.assertEqual(page[0], ("user:000", 0))
+            self.assertEqual(len(page), 10)
+            self.assertNotIn("user:005", [key for key, _ in page])
+
+            # Изменения между страницами не приводят к повторам и пропускам
+            store.delete("user:003")
+            store.set("user:0105", "новый")
+            seen = [key for key, _ in page]
+            while more:
+                page, more = store.scan("user:", after=seen[-1], limit=10)
+                seen.extend(key for key, _ in page)
+            expected = sorted([f"user:{i:03d}" for i in range(25) if i not in (3, 5)] + ["user:0105"])
+            self.assertEqual(sorted(set(seen) - {"user:003"}), expected)
+            self.assertEqual(len(seen), len(set(seen)))
+
+            page, more = store.scan("user:", start="user:020", limit=100)
+            self.assertEqual([key for key, _ in page], [f"user:{i:03d}" for i in range(20, 25)])
+            self.assertFalse(more)
+
+    def test_concurrent_writers_share_fsync(self):
+        with self.open() as store:
+            def write(worker):
+                for i in range(50):
+                    store.set(f"{worker}-{i}", i)
+
+            threads = [threading.Thread(target=write, args=(w,)) for w in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            stats = store.stats()
+            self.assertEqual(stats["keys"], 400)
+            self.assertLessEqual(stats["fsyncs"], stats["writes"])
+
+    # Писатели, одновременно заполнившие сегмент, сменяют его один раз:
+    # пустых сегментов, кроме активного, не остается
+    def test_concurrent_rotation_leaves_no_empty_segments(self):
+        with self.open(max_segment_bytes=256) as store:
+            def write(worker):
+                for i in range(50):
+                    store.set(f"{worker}-{i}", "x" * 40)
+
+            threads = [threading.Thread(target=write, args=(w,)) for w in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            segments = sorted(name for name in os.listdir(self.path) if name.endswith(SEGMENT_SUFFIX))
+            self.assertEqual([name for name in segments[:-1] if os.path.getsize(os.path.join(self.path, name)) == 0],
+                             [])
+            self.assertEqual(len(store), 400)
+
+    def test_directory_is_locked(self):
+        with self.open():
+            with self.assertRaises(RuntimeError):
+                self.open()
+
+
+if __name__ == "__main__":
+    unittest.main()
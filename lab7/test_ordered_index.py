@@ -0,0 +1,36 @@
+import random
+import unittest
+from ordered_index import SortedKeys
+
+
+class TestSortedKeys(unittest.TestCase):
+    def test_matches_sorted_set(self):
+        rng = random.Random(5)
+        keys = SortedKeys(chunk_size=4)
+        reference = set()
+        for _ in range(3000):
+            key = f"k{rng.randrange(500):03d}"
+            if rng.random() < 0.6:
+                keys.add(key)
+                reference.add(key)
+            else:
+                keys.discard(key)
+                reference.discard(key)
+        self.assertEqual(list(keys), sorted(reference))
+        self.assertEqual(len(keys), len(reference))
+        self.assertEqual("k250" in keys, "k250" in reference)
+
+        ordered = sorted(reference)
+        for bound in ("", "k100", "k2505", "k499", "z"):
+            self.assertEqual(list(keys.iter_from(bound)), [k for k in ordered if k >= bound])
+            self.assertEqual(list(keys.iter_from("", after=bound)), [k for k in ordered if k > bound])
+
+    def test_after_below_lower_bound_is_ignored(self):
+        keys = SortedKeys()
+        for key in ("a", "b", "c"):
+            keys.add(key)
+        self.assertEqual(list(keys.iter_from("b", after="a")), ["b", "c"])
+
+
+if __name__ == "__main__":
+    unittest.main()
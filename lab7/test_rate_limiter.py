@@ -0,0 +1,112 @@
+import unittest
+from flask import Flask
+from conftest import FakeClock
+from rate_limiter import RateLimiter, TokenBuckets, parse_limit
+
+
+class TestTokenBuckets(unittest.TestCase):
+    def setUp(self):
+        self.clock = FakeClock()
+        self.buckets = TokenBuckets(stripes=4, prune_threshold=8, clock=self.clock)
+        self.rate, self.capacity = parse_limit("10 per minute")
+
+    def hit(self, key="a", cost=1):
+        return self.buckets.hit(key, self.rate, self.capacity, cost)
+
+    def test_parse_limit(self):
+        self.assertEqual(parse_limit("10 per minute"), (10 / 60, 10.0))
+        self.assertEqual(parse_limit("5/second"), (5.0, 5.0))
+        with self.assertRaises(ValueError):
+            parse_limit("often")
+
+    def test_burst_then_refill(self):
+        for _ in range(10):
+            self.assertTrue(self.hit()[0])
+        allowed, retry_after = self.hit()
+        self.assertFalse(allowed)
+        self.assertAlmostEqual(retry_after, 6.0)
+        self.assertTrue(self.hit("b")[0])  # у другого ключа своя корзина
+        self.clock.now += 6
+        self.assertTrue(self.hit()[0])
+        self.assertFalse(self.hit()[0])
+
+    def test_cost(self):
+        self.assertTrue(self.hit(cost=7)[0])
+        self.assertFalse(self.hit(cost=4)[0])
+        self.assertTrue(self.hit(cost=3)[0])
+
+    def test_idle_buckets_are_pruned(self):
+        for i in range(100):
+            self.hit(f"k{i}")
+        self.clock.now += 60
+        for i in range(100, 110):
+            self.hit(f"k{i}")
+        self.assertLess(self.buckets.stats()["buckets"], 100)
+
+    # Полоса из заполняющихся корзин просматривается не чаще раза в
+    # prune_interval, а не на каждом новом ключе
+    def test_prune_runs_once_per_interval(self):
+        buckets = TokenBuckets(stripes=1, prune_threshold=8, max_buckets=100, prune_interval=1, clock=self.clock)
+        rate, capacity = parse_limit("10 per second")  # корзина заполняется за 0.1 с
+
+        def add(*keys):
+            for key in keys:
+                buckets.hit(key, rate, capacity)
+            return buckets.stats()["buckets"]
+
+        add(*(f"k{i}" for i in range(8)))
+        self.clock.now += 0.5
+        self.assertEqual(add("a"), 1)
+        add(*(f"n{i}" for i in range(7)))
+        self.clock.now += 0.4
+        self.assertEqual(add("b"), 9)  # заполнились, но интервал не прошел
+        self.clock.now += 0.6
+        self.assertEqual(add("c"), 1)
+
+    def test_hard_cap_evicts_oldest(self):
+        buckets = TokenBuckets(stripes=1, prune_threshold=8, max_buckets=16, clock=self.clock)
+        for i in range(20):
+            buckets.hit(f"k{i}", self.rate, self.capacity)
+        stats = buckets.stats()
+        self.assertEqual((stats["buckets"], stats["evicted"]), (16, 4))
+        # Вытесненный клиент начинает с полной корзиной, остальные — нет
+        self.assertTrue(buckets.hit("k0", self.rate, self.capacity, cost=10)[0])
+        self.assertFalse(buckets.hit("k19", self.rate, self.capacity, cost=10)[0])
+
+
+class TestRateLimiter(unittest.TestCase):
+    def make_app(self, enabled=True, read_limit=None):
+        app = Flask(__name__)
+        limiter = RateLimiter(enabled=enabled)
+
+        @app.route("/write")
+        @limiter.limit("2 per minute")
+        def write():
+            return "ok"
+
+        @limiter.limit(read_limit)
+        def read():
+            return "ok"
+        app.add_url_rule("/read", view_func=read)
+        return app.test_client(), limiter, read
+
+    def test_limit_and_retry_after(self):
+        client, limiter, _ = self.make_app()
+        self.assertEqual([client.get("/write").status_code for _ in range(3)], [200, 200, 429])
+        self.assertEqual(client.get("/write").headers["Retry-After"], "30")
+        self.assertEqual(limiter.stats()["rejected"], 2)
+        limiter.reset()
+        self.assertEqual(client.get("/write").status_code, 200)
+
+    def test_unlimited_routes_are_not_wrapped(self):
+        client, limiter, read = self.make_app()
+        self.assertFalse(hasattr(read, "__wrapped__"))
+        self.assertTrue(all(client.get("/read").status_code == 200 for _ in range(10)))
+        self.assertEqual(limiter.stats()["allowed"], 0)
+
+        client, _, _ = self.make_app(enabled=False)
+        self.assertTrue(all(client.get("/write").status_code == 200 for _ in range(5)))
+
+
+if __name__ == "__main__":
+    unittest.main()
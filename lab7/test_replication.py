@@ -0,0 +1,126 @@
+import tempfile
+import threading
+import unittest
+from log_store import OP_SET, LogStore
+from replication import Follower, ReplicationLog, SnapshotRequired
+
+
+# Клиент ведущего без HTTP: те же ответы, что у эндпоинтов /replication/*
+class LocalLeaderClient:
+    url = "local"
+
+    def __init__(self, store, log):
+        self.store = store
+        self.log_ = log
+
+    def snapshot(self):
+        items, lsn = self.store.snapshot()
+        return {"epoch": self.log_.epoch, "lsn": lsn,
+                "items": [[key, value.decode("utf-8"), expires_at] for key, value, expires_at in items]}
+
+    def log(self, epoch, after, wait, limit):
+        if epoch != self.log_.epoch:
+            raise SnapshotRequired()
+        entries, lsn = self.log_.read(after, limit, wait)
+        return {"epoch": self.log_.epoch, "lsn": lsn, "entries": entries}
+
+
+class TestReplication(unittest.TestCase):
+    def setUp(self):
+        self.directories = [tempfile.TemporaryDirectory() for _ in range(2)]
+        self.log = ReplicationLog(capacity=50)
+        self.leader = LogStore(self.directories[0].name, background=False, on_write=self.log.append)
+        self.replica = LogStore(self.directories[1].name, background=False)
+        self.follower = Follower(self.replica, LocalLeaderClient(self.leader, self.log), poll_wait=0)
+
+    def tearDown(self):
+        self.leader.close()
+        self.replica.close()
+        for directory in self.directories:
+            directory.cleanup()
+
+    def assert_in_sync(self):
+        self.assertEqual(sorted(self.replica.snapshot()[0]), sorted(self.leader.snapshot()[0]))
+
+    def test_follower_applies_log(self):
+        self.leader.set("a", 1)
+        self.follower.poll_once()  # первый опрос — снимок
+        self.assertEqual(self.follower.snapshots, 1)
+        self.leader.set_many([("b", [2]), ("c", {"x": 3})])
+        self.leader.set("t", "ttl", ttl=100)
+        self.leader.delete("a")
+        self.follower.poll_once()
+        self.assert_in_sync()
+        self.assertIsNotNone(self.replica.ttl("t"))
+        status = self.follower.status()
+        self.assertEqual((status["lag_operations"], status["applied_lsn"]), (0, self.log.lsn))
+        self.assertLess(self.follower.staleness(), 1)
+
+    # Ведущий пишет без пауз: реплика, забирающая все записи до LSN ответа,
+    # после каждого опроса считается догнавшей, и свежесть не растет
+    def test_follower_keeps_up_with_concurrent_writer(self):
+        self.log.capacity = 10 ** 6
+        self.follower.poll_limit = 10 ** 6
+        self.follower.poll_once()
+        stop = threading.Event()
+
+        def writer():
+            i = 0
+            while not stop.is_set():
+                self.leader.set(f"w{i % 100}", i)
+                i += 1
+        thread = threading.Thread(target=writer)
+        thread.start()
+        try:
+            for _ in range(200):
+                self.follower.poll_once()
+                self.assertEqual(self.follower.caught_up_at, self.follower.last_contact)
+                self.assertEqual(self.follower.applied_lsn, self.follower.leader_lsn)
+        finally:
+            stop.set()
+            thread.join()
+        self.assertEqual(self.follower.snapshots, 1)
+
+    def test_lagging_follower_resyncs_from_snapshot(self):
+        self.follower.poll_once()
+        for i in range(200):
+            self.leader.set(f"k{i % 30}", i)
+        with self.assertRaises(SnapshotRequired):
+            self.log.read(self.follower.applied_lsn)
+        self.follower.poll_once()
+        self.follower.poll_once()
+        self.assertEqual(self.follower.snapshots, 2)
+        self.assert_in_sync()
+
+    def test_leader_restart_changes_epoch(self):
+        self.replica.set("stale", 1)
+        self.follower.poll_once()
+        self.assertNotIn("stale", self.replica)  # снимок заменяет содержимое реплики
+        self.log.epoch = "restarted"
+        self.leader.set("new", 1)
+        self.follower.poll_once()
+        self.follower.poll_once()
+        self.assertEqual(self.follower.epoch, "restarted")
+        self.assert_in_sync()
+
+
+class TestReplicationLog(unittest.TestCase):
+    # Буфер ограничен и по байтам: крупные значения вытесняют старые записи
+    # раньше, чем наберется capacity операций
+    def test_buffer_is_bounded_in_bytes(self):
+        log = ReplicationLog(capacity=1000, max_bytes=10000)
+        for lsn in range(1, 101):
+            log.append(lsn, [(OP_SET, f"k{lsn}", b"x" * 1000, 0.0)])
+        status = log.status()
+        self.assertLessEqual(status["buffered_bytes"], 10000)
+        self.assertLess(status["buffered_operations"], 10)
+        self.assertEqual(log.read(99), ([(100, [[OP_SET, "k100", "x" * 1000, 0.0]])], 100))
+        with self.assertRaises(SnapshotRequired):
+            log.read(1)
+        # Одна запись больше бюджета все равно остается последней
+        log.append(101, [(OP_SET, "huge", b"x" * 20000, 0.0)])
+        self.assertEqual([lsn for lsn, _ in log.read(100)[0]], [101])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from json_stream import read_json_records
+
+CATEGORIES = ["food", "transport", "entertainment", "utilities", "shopping",
+              "health", "education", "housing", "travel", "other"]
+
+
+# Тестовый файл в том же формате, что пишет generate_transactions.py
+def write_sample(filename: str, count: int, jsonl: bool):
+    start = datetime.now()
+    with open(filename, 'w', encoding='utf-8') as f:
+        if not jsonl:
+            f.write("[\n")
+        for i in range(count):
+            record = {
+                "timestamp": (start + timedelta(milliseconds=i)).isoformat(),
+                "category": random.choice(CATEGORIES),
+                "amount": round(random.uniform(10, 1000), 2)
+            }
+            if jsonl:
+                f.write(json.dumps(record) + "\n")
+            else:
+                f.write(("  " if i == 0 else ",\n  ") + json.dumps(record))
+        if not jsonl:
+            f.write("\n]\n")
+
+
+async def count_streaming(filename: str) -> int:
+    count = 0
+    async for _ in read_json_records(filename):
+        count += 1
+    return count
+
+
+def count_json_load(filename: str) -> int:
+    with open(filename, 'r', encoding='utf-8') as f:
+        return len(json.load(f))
+
+
+def measure(name: str, func, expected: int):
+    started = time.perf_counter()
+    count = func()
+    elapsed = time.perf_counter() - started
+    assert count == expected, f"{name}: прочитано {count} из {expected}"
+    print(f"{name:28} | {elapsed:8.3f} с | {count / elapsed:12,.0f} записей/с")
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+
+    with tempfile.TemporaryDirectory() as directory:
+        array_file = os.path.join(directory, "transactions.json")
+        lines_file = os.path.join(directory, "transactions.jsonl")
+        write_sample(array_file, count, jsonl=False)
+        write_sample(lines_file, count, jsonl=True)
+
+        print(f"Записей: {count}")
+        print("-" * 60)
+        measure("json.load (весь файл)", lambda: count_json_load(array_file), count)
+        measure("потоковый, JSON-массив", lambda: asyncio.run(count_streaming(array_file)), count)
+        measure("потоковый, JSONL", lambda: asyncio.run(count_streaming(lines_file)), count)
+
+
+if __name__ == "__main__":
+    main()
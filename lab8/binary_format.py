@@ -0,0 +1,182 @@
+import mmap
+import os
+import struct
+from typing import Any, Dict, Iterator, List, Sequence, Tuple
+
+from columnar import from_cents, from_timestamp_us, to_cents, to_timestamp_us
+
+try:
+    import numpy as np
+except ImportError:  # без NumPy записи читаются через struct
+    np = None
+
+# Формат файла:
+#   заголовок  — магическое число, версия, число категорий, размер заголовка;
+#   словарь    — названия категорий (длина uint8 + UTF-8), код = номер в словаре;
+#   записи     — по 17 байт: timestamp int64 (мкс), category uint8, amount int64 (копейки).
+# Число записей в заголовок не пишется, а вычисляется по размеру файла,
+# поэтому в файл можно дописывать без перезаписи заголовка.
+MAGIC = b"TXNB"
+VERSION = 1
+HEADER = struct.Struct("<4sHHI")
+RECORD = struct.Struct("<qBq")
+RECORD_SIZE = RECORD.size
+
+if np is not None:
+    RECORD_DTYPE = np.dtype([("timestamp", "<i8"), ("category", "u1"), ("amount", "<i8")])
+    assert RECORD_DTYPE.itemsize == RECORD_SIZE
+
+
+# Является ли файл двоичным файлом транзакций (по магическому числу)
+def is_binary_file(filename: str) -> bool:
+    try:
+        with open(filename, "rb") as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+def _encode_header(categories: Sequence[str]) -> bytes:
+    if len(categories) > 256:
+        raise ValueError(f"Двоичный формат вмещает не больше 256 категорий, получено {len(categories)}")
+    dictionary = b""
+    for category in categories:
+        encoded = category.encode("utf-8")
+        if len(encoded) > 255:
+            raise ValueError(f"Слишком длинное название категории: {category}")
+        dictionary += bytes([len(encoded)]) + encoded
+    return HEADER.pack(MAGIC, VERSION, len(categories), HEADER.size + len(dictionary)) + dictionary
+
+
+def _decode_header(data) -> Tuple[List[str], int]:
+    if len(data) < HEADER.size:
+        raise ValueError("Файл слишком короткий для заголовка")
+    magic, version, count, header_size = HEADER.unpack_from(data, 0)
+    if magic != MAGIC:
+        raise ValueError("Неверный формат файла")
+    if version != VERSION:
+        raise ValueError(f"Неподдерживаемая версия формата: {version}")
+    categories = []
+    pos = HEADER.size
+    for _ in range(count):
+        length = data[pos]
+        categories.append(bytes(data[pos + 1:pos + 1 + length]).decode("utf-8"))
+        pos += 1 + length
+    return categories, header_size
+
+
+# Запись транзакций в двоичный файл. При append=True записи дописываются
+# в существующий файл (словарь категорий должен совпадать)
+class BinaryTransactionWriter:
+    def __init__(self, filename: str, categories: Sequence[str], append: bool = False):
+        self.categories = list(categories)
+        self._codes = {category: code for code, category in enumerate(self.categories)}
+        exists = append and os.path.exists(filename) and os.path.getsize(filename) > 0
+        if exists:
+            with open(filename, "rb") as f:
+                head = f.read(HEADER.size)
+                if len(head) < HEADER.size:
+                    raise ValueError("Файл слишком короткий для заголовка")
+                head += f.read(HEADER.unpack(head)[3] - HEADER.size)
+            existing, header_size = _decode_header(head)
+            if existing != self.categories:
+                raise ValueError("Словарь категорий файла не совпадает с записываемым")
+            self._file = open(filename, "r+b")
+            # Отбрасываем оборванную последнюю запись, если она есть
+            size = os.path.getsize(filename)
+            self._file.truncate(size - (size - header_size) % RECORD_SIZE)
+            self._file.seek(0, os.SEEK_END)
+        else:
+            header = _encode_header(self.categories)
+            self._file = open(filename, "wb")
+            self._file.write(header)
+
+    def write_transactions(self, transactions: List[Dict[str, Any]]):
+        self._file.write(b"".join(
+            RECORD.pack(to_timestamp_us(t["timestamp"]), self._codes[t["category"]], to_cents(t["amount"]))
+            for t in transactions
+        ))
+
+    # Запись кортежей (timestamp_us, код категории, копейки)
+    def write_rows(self, rows):
+        self._file.write(b"".join(RECORD.pack(*row) for row in rows))
+
+    # Запись готовых столбцов (массивы NumPy одинаковой длины)
+    def write_columns(self, timestamps, category_codes, amounts):
+        records = np.empty(len(amounts), dtype=RECORD_DTYPE)
+        records["timestamp"] = timestamps
+        records["category"] = category_codes
+        records["amount"] = amounts
+        self._file.write(records.tobytes())
+
+    def flush(self):
+        self._file.flush()
+
+    def fileno(self) -> int:
+        return self._file.fileno()
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# Чтение двоичного файла через mmap. Столбцы NumPy — это представления
+# поверх отображенной памяти, данные не копируются
+class BinaryTransactionFile:
+    def __init__(self, filename: str):
+        self.filename = filename
+        self._file = open(filename, "rb")
+        self._mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.categories, self.header_size = _decode_header(self._mmap)
+        self.count = (len(self._mmap) - self.header_size) // RECORD_SIZE
+        self._records = None
+
+    def __len__(self) -> int:
+        return self.count
+
+    # Структурированный массив записей (без копирования)
+    @property
+    def records(self):
+        if self._records is None:
+            self._records = np.frombuffer(self._mmap, dtype=RECORD_DTYPE,
+                                          count=self.count, offset=self.header_size)
+        return self._records
+
+    # Столбцы timestamp, category, amount
+    def columns(self):
+        records = self.records
+        return records["timestamp"], records["category"], records["amount"]
+
+    # Записи [start, end) как кортежи (timestamp_us, код категории, копейки)
+    def iter_raw(self, start: int = 0, end: int = None) -> Iterator[tuple]:
+        end = self.count if end is None else min(end, self.count)
+        begin = self.header_size + start * RECORD_SIZE
+        yield from RECORD.iter_unpack(memoryview(self._mmap)[begin:self.header_size + end * RECORD_SIZE])
+
+    # Записи в исходном словарном виде
+    def iter_transactions(self) -> Iterator[Dict[str, Any]]:
+        categories = self.categories
+        for timestamp_us, code, cents in self.iter_raw():
+            yield {
+                "timestamp": from_timestamp_us(timestamp_us),
+                "category": categories[code],
+                "amount": from_cents(cents)
+            }
+
+    # Перед закрытием все полученные столбцы должны быть освобождены,
+    # иначе mmap не даст себя закрыть (BufferError)
+    def close(self):
+        self._records = None
+        self._mmap.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,135 @@
+import json
+import os
+import random
+from array import array
+from datetime import datetime
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+from binary_format import BinaryTransactionWriter
+from columnar import from_cents, from_timestamp_us, to_timestamp_us
+
+try:
+    import numpy as np
+except ImportError:  # без NumPy столбцы заполняются через array и random.Random
+    np = None
+
+CHUNK = 1 << 20  # транзакций в одном пакете генерации (~17 МБ столбцов)
+MIN_CENTS = 1000  # 10.00, как random.uniform(10, 1000) в TransactionGenerator
+MAX_CENTS = 100000
+RATE = 1000  # средняя частота транзакций в секунду для меток времени
+
+
+# Массовая генерация столбцами: коды категорий, суммы в копейках и
+# неубывающие метки времени (мкс) создаются целыми пакетами за одну векторную
+# операцию, без словаря и await на каждую транзакцию. При одинаковых seed и
+# start результат повторяется байт в байт; у каждого столбца свой поток
+# случайных чисел, поэтому меньший набор — начало большего при любом chunk.
+# С NumPy и без него потоки разные: совпадение гарантируется только в
+# пределах одной реализации.
+class BulkGenerator:
+    def __init__(self, categories: Sequence[str], seed: Optional[int] = None,
+                 start_us: Optional[int] = None, rate: float = RATE):
+        self.categories = list(categories)
+        self.gap_us = max(1, int(2_000_000 / rate))  # промежутки равномерны в [0, 2/rate)
+        self.next_timestamp = to_timestamp_us(datetime.now().isoformat()) if start_us is None else start_us
+        if np is not None:
+            streams = np.random.SeedSequence(seed).spawn(3)
+            self._codes_rng, self._amounts_rng, self._gaps_rng = map(np.random.default_rng, streams)
+        else:
+            root = random.Random(seed)
+            self._codes_rng, self._amounts_rng, self._gaps_rng = (
+                random.Random(root.getrandbits(64)) for _ in range(3))
+
+    # Один пакет из count транзакций: (timestamps, codes, amounts)
+    def columns(self, count: int) -> Tuple:
+        if np is not None:
+            # uint8 генерируется с внутренней буферизацией, которая зависит от
+            # размера пакета, поэтому коды берутся как int64 и сужаются
+            codes = self._codes_rng.integers(0, len(self.categories), size=count,
+                                             dtype=np.int64).astype(np.uint8)
+            amounts = self._amounts_rng.integers(MIN_CENTS, MAX_CENTS, size=count,
+                                                 endpoint=True, dtype=np.int64)
+            gaps = self._gaps_rng.integers(0, self.gap_us, size=count, dtype=np.int64)
+            timestamps = np.cumsum(gaps)
+            timestamps += self.next_timestamp
+            if count:
+                self.next_timestamp = int(timestamps[-1])
+            return timestamps, codes, amounts
+
+        # Каждое значение — отдельное обращение к своему генератору, поэтому
+        # последовательность не зависит от размера пакета
+        codes = array('B', self._codes_rng.choices(range(len(self.categories)), k=count))
+        amounts = array('q', (self._amounts_rng.randint(MIN_CENTS, MAX_CENTS) for _ in range(count)))
+        timestamps = array('q')
+        current = self.next_timestamp
+        gaps_rng = self._gaps_rng
+        for _ in range(count):
+            current += gaps_rng.randrange(self.gap_us)
+            timestamps.append(current)
+        self.next_timestamp = current
+        return timestamps, codes, amounts
+
+    # Пакеты по chunk транзакций, всего total
+    def chunks(self, total: int, chunk: int = CHUNK) -> Iterator[Tuple]:
+        remaining = total
+        while remaining > 0:
+            count = min(chunk, remaining)
+            remaining -= count
+            yield self.columns(count)
+
+
+# Строки JSONL для пакета. Метки времени форматируются векторно
+# (datetime_as_string) в местном времени, как from_timestamp_us. Поправка
+# на местное время считается для каждой минуты пакета: пакет может
+# пересекать переход на летнее время
+def format_jsonl(columns: Tuple, categories: List[str]) -> str:
+    timestamps, codes, amounts = columns
+    if len(amounts) == 0:
+        return ""
+    names = [json.dumps(category, ensure_ascii=False) for category in categories]
+    if np is not None:
+        minutes, inverse = np.unique(timestamps // 60_000_000, return_inverse=True)
+        offsets = np.array([datetime.fromtimestamp(int(minute) * 60).astimezone().utcoffset().total_seconds()
+                            for minute in minutes], dtype=np.int64) * 1_000_000
+        local = (timestamps + offsets[inverse]).astype("datetime64[us]")
+        stamps = np.datetime_as_string(local, unit="us").tolist()
+        codes = codes.tolist()
+        amounts = amounts.tolist()
+    else:
+        stamps = [from_timestamp_us(t) for t in timestamps]
+    return "".join(
+        f'{{"timestamp": "{stamp}", "category": {names[code]}, "amount": {from_cents(cents)!r}}}\n'
+        for stamp, code, cents in zip(stamps, codes, amounts)
+    )
+
+
+# Генерация total транзакций сразу в файл: "binary" (столбцы пишутся
+# одним блоком на пакет) или "jsonl". Без append файл заменяется атомарно
+# (временный файл + os.replace); с append транзакции дописываются в конец
+# существующего файла, как в основной журнал генератора
+def generate_to_file(filename: str, total: int, categories: Sequence[str],
+                     file_format: str = "binary", seed: Optional[int] = None,
+                     start_us: Optional[int] = None, rate: float = RATE,
+                     chunk: int = CHUNK, append: bool = False) -> int:
+    if file_format not in ("binary", "jsonl"):
+        raise ValueError(f"Неизвестный формат: {file_format}")
+    generator = BulkGenerator(categories, seed=seed, start_us=start_us, rate=rate)
+    target = filename if append else filename + ".tmp"
+    if file_format == "binary":
+        with BinaryTransactionWriter(target, generator.categories, append=append) as writer:
+            for columns in generator.chunks(total, chunk):
+                if np is not None:
+                    writer.write_columns(*columns)
+                else:
+                    writer.write_rows(zip(*columns))
+            writer.flush()
+            os.fsync(writer.fileno())
+    else:
+        with open(target, "a" if append else "w", encoding="utf-8") as f:
+            for columns in generator.chunks(total, chunk):
+                f.write(format_jsonl(columns, generator.categories))
+            f.flush()
+            os.fsync(f.fileno())
+    if not append:
+        os.replace(target, filename)
+    return total
@@ -0,0 +1,55 @@
+import hashlib
+import json
+import os
+import tempfile
+from typing import Any, Dict, Optional
+
+FINGERPRINT_BYTES = 4096  # по началу файла проверяется, что вход не подменили
+
+
+# Путь контрольной точки по умолчанию — рядом с входным файлом
+def default_checkpoint_path(input_filename: str) -> str:
+    return input_filename + ".checkpoint"
+
+
+# Отпечаток первых size байт входного файла. Берется не больше уже
+# прочитанного, чтобы дозапись в журнал не меняла отпечаток
+def fingerprint(filename: str, size: int = FINGERPRINT_BYTES) -> str:
+    with open(filename, "rb") as f:
+        return hashlib.sha1(f.read(min(size, FINGERPRINT_BYTES))).hexdigest()
+
+
+# Атомарная запись: временный файл в том же каталоге, fsync, os.replace.
+# После сбоя на диске остается либо старая, либо новая точка целиком
+def save_checkpoint(path: str, state: Dict[str, Any]):
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".checkpoint-", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            json.dump(state, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+# Загрузка точки для входного файла; None, если точки нет. Если файл
+# стал короче сохраненного смещения или его начало изменилось — ValueError
+def load_checkpoint(path: str, input_filename: str) -> Optional[Dict[str, Any]]:
+    if not os.path.exists(path):
+        return None
+    with open(path, "r", encoding="utf-8") as f:
+        state = json.load(f)
+    if os.path.getsize(input_filename) < state["offset"]:
+        raise ValueError("Входной файл короче, чем при сохранении контрольной точки")
+    if fingerprint(input_filename, state["offset"]) != state["fingerprint"]:
+        raise ValueError("Входной файл изменился с момента сохранения контрольной точки")
+    return state
+
+
+def remove_checkpoint(path: str):
+    if os.path.exists(path):
+        os.remove(path)
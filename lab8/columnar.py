@@ -0,0 +1,201 @@
+import time
+from array import array
+from datetime import datetime
+from typing import Any, Dict, List, Union
+
+try:
+    import numpy as np
+except ImportError:  # без NumPy агрегация выполняется обычным циклом
+    np = None
+
+# Тип кода категории расширяется по мере роста словаря: пока категорий не
+# больше 256, код занимает один байт
+CODE_TYPECODES = (('B', 1 << 8), ('H', 1 << 16), ('I', 1 << 32))
+
+
+# Перевод суммы в целые копейки и обратно
+def to_cents(amount: float) -> int:
+    return int(round(amount * 100))
+
+
+def from_cents(cents: int) -> float:
+    return cents / 100
+
+
+# Метка времени в микросекундах с начала эпохи (из ISO-строки или числа).
+# Секунды и микросекунды считаются отдельно, чтобы не терять точность float
+def to_timestamp_us(value: Union[str, int, float]) -> int:
+    if isinstance(value, str):
+        moment = datetime.fromisoformat(value)
+        return int(moment.replace(microsecond=0).timestamp()) * 1_000_000 + moment.microsecond
+    return int(value)
+
+
+# Метка времени транзакции; запись без timestamp получает время приема
+def transaction_timestamp_us(transaction: Dict[str, Any]) -> int:
+    value = transaction.get("timestamp")
+    if value is None:
+        return time.time_ns() // 1000
+    return to_timestamp_us(value)
+
+
+# Обратное преобразование в ISO-строку (локальное время, как в генераторе)
+def from_timestamp_us(timestamp_us: int) -> str:
+    seconds, micros = divmod(int(timestamp_us), 1_000_000)
+    return datetime.fromtimestamp(seconds).replace(microsecond=micros).isoformat()
+
+
+# Колоночное хранилище транзакций: суммы в копейках (int64), коды категорий
+# (uint8, при большем словаре — uint16 или uint32) и метки времени (int64,
+# микросекунды) лежат в компактных массивах, по 17 байт на транзакцию.
+# Названия категорий хранятся один раз в словаре.
+class ColumnarStore:
+    def __init__(self):
+        self.categories: List[str] = []
+        self._codes: Dict[str, int] = {}
+        self.amounts = array('q')
+        self.category_codes = array('B')
+        self.timestamps = array('q')
+        # Внешние сегменты (например, отображенные в память двоичные файлы):
+        # агрегируются на месте, без копирования в массивы хранилища
+        self.segments = []
+
+    def __len__(self) -> int:
+        return len(self.amounts) + sum(len(segment) for segment in self.segments)
+
+    # Подключение сегмента — объекта с атрибутом categories и методами
+    # columns() (NumPy) и iter_raw() (кортежи timestamp, код, копейки)
+    def add_segment(self, segment):
+        self.segments.append(segment)
+
+    # Код категории; новая категория добавляется в словарь. Если код не
+    # помещается в текущий тип столбца, столбец один раз копируется в более
+    # широкий тип
+    def category_code(self, category: str) -> int:
+        code = self._codes.get(category)
+        if code is None:
+            code = len(self.categories)
+            if code >= dict(CODE_TYPECODES)[self.category_codes.typecode]:
+                typecode = next(t for t, limit in CODE_TYPECODES if code < limit)
+                self.category_codes = array(typecode, self.category_codes)
+            self.categories.append(category)
+            self._codes[category] = code
+        return code
+
+    def append(self, timestamp_us: int, category: str, amount_cents: int) -> int:
+        code = self.category_code(category)
+        self.timestamps.append(timestamp_us)
+        self.category_codes.append(code)
+        self.amounts.append(amount_cents)
+        return code
+
+    def append_transaction(self, transaction: Dict[str, Any]) -> int:
+        return self.append(
+            transaction_timestamp_us(transaction),
+            transaction["category"],
+            to_cents(transaction["amount"])
+        )
+
+    # Размер данных в байтах (без накладных расходов объектов Python)
+    def nbytes(self) -> int:
+        return sum(column.itemsize * len(column)
+                   for column in (self.amounts, self.category_codes, self.timestamps))
+
+    # Группировка по категориям: сумма, количество, минимум и максимум (в копейках)
+    def group_by_category(self) -> Dict[str, Dict[str, int]]:
+        result = self.group_rows()
+        for segment in self.segments:
+            result = merge_group_stats(result, group_segment(segment))
+        return result
+
+    # Группировка собственных строк хранилища, начиная со строки start
+    # (без сегментов) — для пересчета только новых данных
+    def group_rows(self, start: int = 0) -> Dict[str, Dict[str, int]]:
+        if np is not None and len(self.amounts) > start:
+            return self._group_by_numpy(start)
+        return group_by_rows(zip(self.category_codes[start:], self.amounts[start:]), self.categories)
+
+    # Коды категорий как массив NumPy (без копирования)
+    def codes_array(self):
+        return np.frombuffer(self.category_codes, dtype=self.category_codes.typecode)
+
+    def _group_by_numpy(self, start: int = 0) -> Dict[str, Dict[str, int]]:
+        # frombuffer не копирует данные массивов
+        codes = self.codes_array()[start:]
+        amounts = np.frombuffer(self.amounts, dtype=np.int64)[start:]
+        return group_by_arrays(codes, amounts, self.categories)
+
+
+# Группировка внешнего сегмента (с NumPy — по столбцам без копирования)
+def group_segment(segment) -> Dict[str, Dict[str, int]]:
+    if np is not None:
+        _, codes, amounts = segment.columns()
+        return group_by_arrays(codes, amounts, segment.categories)
+    return group_by_rows(((code, cents) for _, code, cents in segment.iter_raw()), segment.categories)
+
+
+# Объединение агрегатов двух частей данных
+def merge_group_stats(left: Dict[str, Dict[str, int]], right: Dict[str, Dict[str, int]]) -> Dict[str, Dict[str, int]]:
+    result = {category: dict(stats) for category, stats in left.items()}
+    for category, stats in right.items():
+        current = result.get(category)
+        if current is None:
+            result[category] = dict(stats)
+        else:
+            current["sum"] += stats["sum"]
+            current["count"] += stats["count"]
+            current["min"] = min(current["min"], stats["min"])
+            current["max"] = max(current["max"], stats["max"])
+    return result
+
+
+# Группировка обычным циклом по парам (код категории, копейки)
+def group_by_rows(rows, categories: List[str]) -> Dict[str, Dict[str, int]]:
+    result = {}
+    for code, amount in rows:
+        stats = result.get(code)
+        if stats is None:
+            result[code] = [amount, 1, amount, amount]
+        else:
+            stats[0] += amount
+            stats[1] += 1
+            if amount < stats[2]:
+                stats[2] = amount
+            if amount > stats[3]:
+                stats[3] = amount
+    return {
+        categories[code]: {"sum": s, "count": c, "min": lo, "max": hi}
+        for code, (s, c, lo, hi) in result.items()
+    }
+
+
+# Векторная группировка по массивам кодов и сумм (используется и для
+# данных, прочитанных из двоичного файла без копирования)
+def group_by_arrays(codes, amounts, categories: List[str]) -> Dict[str, Dict[str, int]]:
+    size = len(categories)
+    codes = np.asarray(codes)
+    amounts = np.asarray(amounts, dtype=np.int64)
+    counts = np.bincount(codes, minlength=size)
+    present = np.flatnonzero(counts)
+    if len(present) == 0:
+        return {}
+
+    # Сортировка по коду (для uint8 NumPy использует поразрядную сортировку
+    # за O(n)) и свертка reduceat по границам групп; суммы считаются в int64
+    # точно, без потерь float
+    order = np.argsort(codes, kind="stable")
+    sorted_amounts = amounts[order]
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))[present]
+    sums = np.add.reduceat(sorted_amounts, starts)
+    mins = np.minimum.reduceat(sorted_amounts, starts)
+    maxs = np.maximum.reduceat(sorted_amounts, starts)
+
+    return {
+        categories[code]: {
+            "sum": int(total),
+            "count": int(counts[code]),
+            "min": int(lo),
+            "max": int(hi),
+        }
+        for code, total, lo, hi in zip(present, sums, mins, maxs)
+    }
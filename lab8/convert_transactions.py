@@ -0,0 +1,80 @@
+import asyncio
+import json
+import os
+import sys
+
+from binary_format import BinaryTransactionFile, BinaryTransactionWriter, is_binary_file
+from columnar import ColumnarStore
+from json_stream import read_json_records
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+# JSON-массив или JSONL -> двоичный формат.
+# Записи сначала собираются в колоночное хранилище (17 байт на запись),
+# чтобы до записи заголовка знать полный словарь категорий
+def json_to_binary(src: str, dst: str) -> int:
+    store = ColumnarStore()
+
+    async def load():
+        async for transaction in read_json_records(src):
+            store.append_transaction(transaction)
+
+    asyncio.run(load())
+
+    with BinaryTransactionWriter(dst, store.categories) as writer:
+        if np is not None:
+            writer.write_columns(
+                np.frombuffer(store.timestamps, dtype=np.int64),
+                store.codes_array(),
+                np.frombuffer(store.amounts, dtype=np.int64)
+            )
+        else:
+            writer.write_rows(zip(store.timestamps, store.category_codes, store.amounts))
+    return len(store)
+
+
+# Двоичный формат -> JSON-массив (или JSONL, если jsonl=True)
+def binary_to_json(src: str, dst: str, jsonl: bool = False) -> int:
+    count = 0
+    tmp = dst + ".tmp"
+    with BinaryTransactionFile(src) as data, open(tmp, "w", encoding="utf-8") as f:
+        if not jsonl:
+            f.write("[")
+        for transaction in data.iter_transactions():
+            line = json.dumps(transaction, ensure_ascii=False)
+            if jsonl:
+                f.write(line + "\n")
+            else:
+                f.write(("\n  " if count == 0 else ",\n  ") + line)
+            count += 1
+        if not jsonl:
+            f.write("\n]\n")
+    os.replace(tmp, dst)
+    return count
+
+
+def main():
+    if len(sys.argv) != 3:
+        print("Использование: python convert_transactions.py <входной_файл> <выходной_файл>")
+        print("Пример: python convert_transactions.py all_transactions.jsonl all_transactions.bin")
+        print("        python convert_transactions.py all_transactions.bin all_transactions.json")
+        return
+
+    src, dst = sys.argv[1], sys.argv[2]
+    if not os.path.exists(src):
+        print(f"Файл не найден: {src}")
+        return
+
+    if is_binary_file(src):
+        count = binary_to_json(src, dst, jsonl=dst.endswith(".jsonl"))
+    else:
+        count = json_to_binary(src, dst)
+    print(f"Преобразовано {count} транзакций: {src} -> {dst}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,13 +1,88 @@
+import argparse
 import asyncio
 import json
+import os
 import random
+import tempfile
+import time
 from datetime import datetime
 from typing import List, Dict, Any
-import sys
+
+from binary_format import BinaryTransactionWriter
+from bulk_generator import generate_to_file
+from columnar import to_timestamp_us
+from convert_transactions import binary_to_json
+
+
+# Управление отдается циклу событий раз в N транзакций
+YIELD_EVERY = 1000
+
+# Основной журнал всех транзакций (JSON Lines, только дозапись)
+MAIN_LOG = "all_transactions.jsonl"
+MAIN_JSON = "all_transactions.json"
+# Основной журнал в двоичном формате (см. binary_format.py)
+MAIN_BIN = "all_transactions.bin"
+
+
+# Сборка JSON-массива из журнала для программ, которые ждут один JSON-файл.
+# Журнал читается построчно, поэтому память не зависит от его размера.
+# Пропускается только оборванная последняя строка без перевода строки
+# (запись прервана аварийной остановкой); некорректная строка в середине
+# журнала — повреждение, ValueError с ее номером. Результат записывается
+# атомарно: временный файл, fsync, os.replace
+def compact_main_log(log_filename: str = MAIN_LOG, output_filename: str = MAIN_JSON) -> int:
+    directory = os.path.dirname(os.path.abspath(output_filename))
+    fd, tmp_filename = tempfile.mkstemp(dir=directory, prefix=".compact-", suffix=".tmp")
+    count = 0
+    try:
+        with open(log_filename, 'r', encoding='utf-8') as src, os.fdopen(fd, 'w', encoding='utf-8') as dst:
+            dst.write("[")
+            for number, line in enumerate(src, 1):
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    if not line.endswith("\n"):
+                        break
+                    raise ValueError(f"Поврежденная строка {number} в журнале {log_filename}")
+                dst.write(("\n  " if count == 0 else ",\n  ") + json.dumps(record, ensure_ascii=False))
+                count += 1
+            dst.write("\n]\n")
+            dst.flush()
+            os.fsync(dst.fileno())
+        os.replace(tmp_filename, output_filename)
+    except BaseException:
+        if os.path.exists(tmp_filename):
+            os.remove(tmp_filename)
+        raise
+    return count
+
+
+# Отрезание оборванной последней строки журнала перед дозаписью, иначе
+# следующая запись склеится с ней в одну некорректную строку
+def truncate_torn_tail(log_filename: str):
+    try:
+        f = open(log_filename, 'rb+')
+    except FileNotFoundError:
+        return
+    with f:
+        size = f.seek(0, os.SEEK_END)
+        end = size
+        while end > 0:
+            start = max(0, end - 4096)
+            f.seek(start)
+            newline = f.read(end - start).rfind(b"\n")
+            if newline >= 0:
+                end = start + newline + 1
+                break
+            end = start
+        if end < size:
+            f.truncate(end)
 
 
 class TransactionGenerator:
-    def __init__(self):
+    def __init__(self, main_log: str = None, fsync_every: int = 10, file_format: str = "json"):
         self.categories = [
             "food", "transport", "entertainment", 
             "utilities", "shopping", "health", 
@@ -15,11 +90,14 @@ class TransactionGenerator:
         ]
         self.transaction_count = 0
         self.file_counter = 1
+        self.file_format = file_format  # "json" или "binary"
+        self.main_log = main_log or (MAIN_BIN if file_format == "binary" else MAIN_LOG)
+        self.fsync_every = fsync_every  # fsync раз в N пакетов
+        self._main_file = None
+        self._unsynced_batches = 0
         
     # Генерация одной транзакции
     async def generate_transaction(self) -> Dict[str, Any]:
-        await asyncio.sleep(0.01)  # Имитация асинхронной работы
-        
         return {
             "timestamp": datetime.now().isoformat(),
             "category": random.choice(self.categories),
@@ -32,6 +110,8 @@ class TransactionGenerator:
             transaction = await self.generate_transaction()
             self.transaction_count += 1
             yield transaction
+            if self.transaction_count % YIELD_EVERY == 0:
+                await asyncio.sleep(0)
     
     # Обработка потока пакетами
     async def batch_processor(self, transactions_stream, batch_size: int = 10):
@@ -47,13 +127,19 @@ class TransactionGenerator:
         # Оставшиеся транзакции
         if batch:
             await self.save_batch(batch)
+        
+        await self.close()
     
     # Сохранение пакета транзакций
     async def save_batch(self, batch: List[Dict[str, Any]]):
-        filename = f"transactions_batch_{self.file_counter}.json"
-        
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(batch, f, indent=2, ensure_ascii=False)
+        if self.file_format == "binary":
+            filename = f"transactions_batch_{self.file_counter}.bin"
+            with BinaryTransactionWriter(filename, self.categories) as writer:
+                writer.write_transactions(batch)
+        else:
+            filename = f"transactions_batch_{self.file_counter}.json"
+            with open(filename, 'w', encoding='utf-8') as f:
+                json.dump(batch, f, indent=2, ensure_ascii=False)
         
         print(f"[{datetime.now().strftime('%H:%M:%S')}] "
               f"Сохранен пакет {self.file_counter}: "
@@ -64,30 +150,93 @@ class TransactionGenerator:
         
         self.file_counter += 1
     
-    # Обновление файла со всеми транзакциями
+    # Дозапись пакета в основной журнал: стоимость пропорциональна размеру
+    # пакета, а не всего журнала
     async def update_main_file(self, batch: List[Dict[str, Any]]):
-        main_filename = "all_transactions.json"
+        if self._main_file is None:
+            if self.file_format == "binary":
+                self._main_file = BinaryTransactionWriter(self.main_log, self.categories, append=True)
+            else:
+                truncate_torn_tail(self.main_log)
+                self._main_file = open(self.main_log, 'a', encoding='utf-8')
         
-        try:
-            with open(main_filename, 'r', encoding='utf-8') as f:
-                all_data = json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError):
-            all_data = []
+        if self.file_format == "binary":
+            self._main_file.write_transactions(batch)
+        else:
+            self._main_file.write("".join(json.dumps(t, ensure_ascii=False) + "\n" for t in batch))
+        self._unsynced_batches += 1
         
-        all_data.extend(batch)
-        
-        with open(main_filename, 'w', encoding='utf-8') as f:
-            json.dump(all_data, f, indent=2, ensure_ascii=False)
+        if self._unsynced_batches >= self.fsync_every:
+            await self.sync_main_file()
+    
+    # Сброс журнала на диск (fsync выполняется в отдельном потоке)
+    async def sync_main_file(self):
+        if self._main_file is None or self._unsynced_batches == 0:
+            return
+        self._main_file.flush()
+        await asyncio.to_thread(os.fsync, self._main_file.fileno())
+        self._unsynced_batches = 0
+    
+    async def close(self):
+        if self._main_file is not None:
+            await self.sync_main_file()
+            self._main_file.close()
+            self._main_file = None
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Генерация транзакций",
+        epilog="Пример: python generate_transactions.py 100"
+    )
+    parser.add_argument("count", help="количество транзакций")
+    parser.add_argument("--fsync-every", type=int, default=10,
+                        help="fsync основного журнала раз в N пакетов")
+    parser.add_argument("--format", choices=["json", "binary"], default="json",
+                        help="формат файлов пакетов и основного журнала")
+    parser.add_argument("--compact", action="store_true",
+                        help=f"собрать {MAIN_JSON} (JSON-массив) из основного журнала")
+    parser.add_argument("--bulk", action="store_true",
+                        help="массовая векторная генерация сразу в основной журнал, без файлов пакетов")
+    parser.add_argument("--overwrite", action="store_true",
+                        help="с --bulk: заменить основной журнал вместо дозаписи в него")
+    parser.add_argument("--seed", type=int, help="зерно генератора случайных чисел (для --bulk)")
+    parser.add_argument("--start", help="метка времени первой транзакции, ISO (для --bulk)")
+    return parser.parse_args()
+
+
+# Массовая генерация: транзакции создаются столбцами и дописываются в основной
+# журнал (all_transactions.bin или all_transactions.jsonl) пакетами по 1М.
+# С --overwrite журнал заменяется целиком
+async def bulk_main(args, num_transactions: int):
+    generator = TransactionGenerator(file_format=args.format)
+    file_format = "binary" if args.format == "binary" else "jsonl"
+    start_us = to_timestamp_us(args.start) if args.start else None
+    append = not args.overwrite
+    if append and file_format == "jsonl":
+        truncate_torn_tail(generator.main_log)
+    
+    action = "дозапись в" if append else "замена"
+    print(f"Массовая генерация {num_transactions} транзакций ({action} {generator.main_log})...")
+    started = time.perf_counter()
+    await asyncio.to_thread(generate_to_file, generator.main_log, num_transactions,
+                            generator.categories, file_format, args.seed, start_us, append=append)
+    elapsed = time.perf_counter() - started
+    print(f"Готово за {elapsed:.2f} с ({num_transactions / elapsed:,.0f} транзакций/с)")
+    
+    if args.compact:
+        if args.format == "binary":
+            count = binary_to_json(generator.main_log, MAIN_JSON)
+        else:
+            count = compact_main_log()
+        print(f"Журнал собран в {MAIN_JSON}: {count} транзакций")
 
 
 async def main():
-    if len(sys.argv) != 2:
-        print("Использование: python generate_transactions.py <количество_транзакций>")
-        print("Пример: python generate_transactions.py 100")
-        return
+    args = parse_args()
     
     try:
-        num_transactions = int(sys.argv[1])
+        num_transactions = int(args.count)
         if num_transactions <= 0:
             print("Количество транзакций должно быть положительным числом")
             return
@@ -95,10 +244,14 @@ async def main():
         print("Пожалуйста, введите целое число")
         return
     
+    if args.bulk:
+        await bulk_main(args, num_transactions)
+        return
+    
     print(f"Начало генерации {num_transactions} транзакций...")
     print("-" * 50)
     
-    generator = TransactionGenerator()
+    generator = TransactionGenerator(fsync_every=args.fsync_every, file_format=args.format)
     
     # Создание потока транзакций
     stream = generator.transaction_stream(num_transactions)
@@ -109,7 +262,14 @@ async def main():
     print("-" * 50)
     print(f"Генерация завершена!")
     print(f"Создано файлов: {generator.file_counter - 1}")
-    print(f"Все транзакции сохранены в all_transactions.json")
+    print(f"Все транзакции сохранены в {generator.main_log}")
+    
+    if args.compact:
+        if args.format == "binary":
+            count = binary_to_json(generator.main_log, MAIN_JSON)
+        else:
+            count = compact_main_log()
+        print(f"Журнал собран в {MAIN_JSON}: {count} транзакций")
 
 
 if __name__ == "__main__":
@@ -0,0 +1,146 @@
+import asyncio
+import codecs
+import json
+from typing import Any, AsyncIterator, Dict, List, Tuple
+
+CHUNK_SIZE = 1 << 20  # файл читается блоками по 1 МБ
+YIELD_EVERY = 1000  # управление отдается циклу событий раз в N записей
+
+
+# Инкрементальный разбор JSON: принимает текст кусками и возвращает
+# записи по мере того, как они полностью пришли. Поддерживаются JSON-массив
+# верхнего уровня ([{...}, {...}]) и JSON Lines (по одному объекту в строке).
+class JSONStreamParser:
+    # mode и finished задаются при продолжении разбора с середины файла
+    # (см. state() и read_json_batches)
+    def __init__(self, mode: str = None, finished: bool = False):
+        self._decoder = json.JSONDecoder()
+        self._buffer = ""
+        self._mode = mode  # "array" или "lines"
+        self._finished = finished
+
+    def feed(self, text: str, final: bool = False) -> List[Any]:
+        self._buffer += text
+        records = []
+        buffer = self._buffer
+        pos = 0
+        size = len(buffer)
+
+        while True:
+            while pos < size and buffer[pos] in " \t\r\n":
+                pos += 1
+            if pos >= size:
+                break
+
+            if self._finished:
+                raise ValueError(f"Лишние данные после конца массива: {buffer[pos:pos + 20]!r}")
+
+            if self._mode is None:
+                if buffer[pos] == "[":
+                    self._mode = "array"
+                    pos += 1
+                    continue
+                self._mode = "lines"
+
+            if self._mode == "array":
+                if buffer[pos] == ",":
+                    pos += 1
+                    continue
+                if buffer[pos] == "]":
+                    self._finished = True
+                    pos += 1
+                    continue
+
+            try:
+                record, end = self._decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if final:
+                    raise ValueError(f"Некорректный JSON в позиции {pos}")
+                break  # запись пришла не целиком — ждем следующий кусок
+            if end == size and not final and not isinstance(record, (dict, list)):
+                break  # число или литерал мог оборваться на границе куска
+            records.append(record)
+            pos = end
+
+        self._buffer = buffer[pos:]
+        return records
+
+    # Состояние разбора на границе записей
+    def state(self) -> Dict[str, Any]:
+        return {"mode": self._mode, "finished": self._finished}
+
+    # Размер в байтах еще не разобранного хвоста (начало неполной записи)
+    def pending_bytes(self) -> int:
+        return len(self._buffer.encode("utf-8"))
+
+    # Проверка, что поток закончился корректно
+    def close(self):
+        if self._buffer.strip():
+            raise ValueError("Неполная запись в конце потока")
+        if self._mode == "array" and not self._finished:
+            raise ValueError("JSON-массив не закрыт")
+
+
+# Разбор асинхронного потока байтов (файл, сокет, HTTP-ответ)
+async def parse_byte_stream(chunks: AsyncIterator[bytes],
+                            yield_every: int = YIELD_EVERY) -> AsyncIterator[Any]:
+    parser = JSONStreamParser()
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    count = 0
+    async for chunk in chunks:
+        for record in parser.feed(decoder.decode(chunk)):
+            yield record
+            count += 1
+            if count % yield_every == 0:
+                await asyncio.sleep(0)
+    for record in parser.feed(decoder.decode(b"", final=True), final=True):
+        yield record
+    parser.close()
+
+
+# Чтение файла большими блоками в отдельном потоке; следующий блок
+# читается, пока разбирается текущий
+async def read_file_chunks(filename: str, chunk_size: int = CHUNK_SIZE,
+                           start: int = 0) -> AsyncIterator[bytes]:
+    with open(filename, "rb") as f:
+        f.seek(start)
+        pending = asyncio.ensure_future(asyncio.to_thread(f.read, chunk_size))
+        try:
+            while True:
+                chunk = await pending
+                if not chunk:
+                    break
+                pending = asyncio.ensure_future(asyncio.to_thread(f.read, chunk_size))
+                yield chunk
+        finally:
+            # Файл нельзя закрывать, пока поток еще читает из него
+            if not pending.done():
+                await asyncio.wait([pending])
+
+
+# Потоковое чтение записей из JSON-массива или JSONL-файла
+async def read_json_records(filename: str, chunk_size: int = CHUNK_SIZE,
+                            yield_every: int = YIELD_EVERY) -> AsyncIterator[Any]:
+    async for record in parse_byte_stream(read_file_chunks(filename, chunk_size), yield_every):
+        yield record
+
+
+# Чтение записей пакетами — по одному на прочитанный блок. Вместе с пакетом
+# выдается смещение в байтах, с которого продолжается чтение после его
+# записей, и состояние разбора; по ним можно возобновить чтение с середины
+# файла (start, mode, finished)
+async def read_json_batches(filename: str, start: int = 0, mode: str = None,
+                            finished: bool = False, chunk_size: int = CHUNK_SIZE
+                            ) -> AsyncIterator[Tuple[List[Any], int, Dict[str, Any]]]:
+    parser = JSONStreamParser(mode, finished)
+    decoder = codecs.getincrementaldecoder("utf-8")()
+    offset = start
+    async for chunk in read_file_chunks(filename, chunk_size, start):
+        offset += len(chunk)
+        records = parser.feed(decoder.decode(chunk))
+        if records:
+            pending = len(decoder.getstate()[0]) + parser.pending_bytes()
+            yield records, offset - pending, parser.state()
+    records = parser.feed(decoder.decode(b"", final=True), final=True)
+    parser.close()
+    yield records, offset, parser.state()
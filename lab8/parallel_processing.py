@@ -0,0 +1,206 @@
+import argparse
+import asyncio
+import glob
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import reduce
+from typing import Dict, Iterator, List, Tuple
+
+from binary_format import BinaryTransactionFile, is_binary_file
+from columnar import ColumnarStore, group_by_arrays, group_by_rows, merge_group_stats
+from json_stream import CHUNK_SIZE, JSONStreamParser
+from process_transactions import TransactionProcessor
+from sketches import CategorySketches
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Части на один процесс: мелкие части выравнивают нагрузку, если
+# процессы работают с разной скоростью
+SHARDS_PER_WORKER = 4
+MIN_SHARD_BYTES = 1 << 20  # файл меньше 1 МБ на часть не делится
+
+# Часть работы: (формат, файл, начало, конец). Для JSONL начало и конец —
+# смещения в байтах, для двоичного файла — номера записей,
+# JSON-массив обрабатывается целиком
+Shard = Tuple[str, str, int, int]
+
+
+# Формат файла: "binary", "array" (JSON-массив) или "lines" (JSONL)
+def detect_format(filename: str) -> str:
+    if is_binary_file(filename):
+        return "binary"
+    with open(filename, "rb") as f:
+        head = f.read(4096).lstrip()
+    return "array" if head.startswith(b"[") else "lines"
+
+
+# Границы частей: size делится на parts примерно равных диапазонов
+def split_range(size: int, parts: int) -> List[Tuple[int, int]]:
+    parts = max(1, min(parts, size))
+    bounds = [size * i // parts for i in range(parts + 1)]
+    return [(bounds[i], bounds[i + 1]) for i in range(parts)]
+
+
+# Разбиение входных файлов на части. Много небольших файлов — по части на
+# файл; большой JSONL или двоичный файл режется на диапазоны
+def plan_shards(filenames: List[str], workers: int) -> List[Shard]:
+    target = workers * SHARDS_PER_WORKER
+    per_file = max(1, target // len(filenames)) if filenames else 1
+    shards = []
+    for filename in filenames:
+        kind = detect_format(filename)
+        size = os.path.getsize(filename)
+        if kind == "array" or size < MIN_SHARD_BYTES or per_file == 1:
+            if kind == "binary":
+                with BinaryTransactionFile(filename) as data:
+                    shards.append((kind, filename, 0, len(data)))
+            else:
+                shards.append((kind, filename, 0, size))
+        elif kind == "binary":
+            with BinaryTransactionFile(filename) as data:
+                count = len(data)
+            shards.extend((kind, filename, start, end) for start, end in split_range(count, per_file))
+        else:
+            shards.extend((kind, filename, start, end) for start, end in split_range(size, per_file))
+    return shards
+
+
+# Строки JSONL, которые начинаются в диапазоне [start, end). Строка,
+# пересекающая границу, достается той части, в которой она началась
+def iter_lines(filename: str, start: int, end: int) -> Iterator[bytes]:
+    with open(filename, "rb") as f:
+        if start > 0:
+            # Если перед start стоит перевод строки, readline прочитает только его
+            f.seek(start - 1)
+            f.readline()
+        while f.tell() < end:
+            line = f.readline()
+            if not line:
+                break
+            yield line
+
+
+# Записи JSON-массива (файл читается блоками, целиком в память не грузится)
+def iter_array(filename: str) -> Iterator[dict]:
+    parser = JSONStreamParser()
+    with open(filename, "r", encoding="utf-8") as f:
+        while True:
+            text = f.read(CHUNK_SIZE)
+            yield from parser.feed(text, final=not text)
+            if not text:
+                break
+    parser.close()
+
+
+# Агрегаты одной части (выполняется в процессе пула): сумма, количество,
+# минимум и максимум в копейках по категориям — как у ColumnarStore, —
+# и скетчи сумм, которые объединяются так же, как агрегаты
+def aggregate_shard(shard: Shard) -> Tuple[Dict[str, Dict[str, int]], int, CategorySketches]:
+    kind, filename, start, end = shard
+    sketches = CategorySketches()
+
+    if kind == "binary":
+        with BinaryTransactionFile(filename) as data:
+            if np is not None:
+                records = data.records[start:end]
+                stats = group_by_arrays(records["category"], records["amount"], data.categories)
+                sketches.update_arrays(records["category"], records["amount"], data.categories)
+                del records
+            else:
+                rows = [(code, cents) for _, code, cents in data.iter_raw(start, end)]
+                stats = group_by_rows(rows, data.categories)
+                for code, cents in rows:
+                    sketches.update(data.categories[code], cents)
+        return stats, end - start, sketches
+
+    store = ColumnarStore()
+    if kind == "array":
+        for transaction in iter_array(filename):
+            store.append_transaction(transaction)
+    else:
+        for line in iter_lines(filename, start, end):
+            if line.strip():
+                store.append_transaction(json.loads(line))
+    sketches.update_arrays(store.category_codes, store.amounts, store.categories)
+    return store.group_by_category(), len(store), sketches
+
+
+# Параллельная обработка: части раздаются пулу процессов, частичные
+# агрегаты и скетчи объединяются
+def process_parallel(filenames: List[str], workers: int = None
+                     ) -> Tuple[Dict[str, Dict[str, int]], int, CategorySketches]:
+    workers = workers or os.cpu_count() or 1
+    shards = plan_shards(filenames, workers)
+    sketches = CategorySketches()
+    if not shards:
+        return {}, 0, sketches
+
+    if workers == 1:
+        partials = list(map(aggregate_shard, shards))
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            partials = list(executor.map(aggregate_shard, shards))
+
+    stats = reduce(merge_group_stats, (p[0] for p in partials), {})
+    for partial in partials:
+        sketches.merge(partial[2])
+    return stats, sum(p[1] for p in partials), sketches
+
+
+# Список входных файлов: аргументы могут быть шаблонами (transactions_batch_*.json)
+def expand_inputs(patterns: List[str]) -> List[str]:
+    filenames = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern))
+        filenames.extend(matches if matches else [pattern])
+    return filenames
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Параллельная обработка файлов транзакций")
+    parser.add_argument("files", nargs="+",
+                        help="файлы или шаблоны, например 'transactions_batch_*.json'")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="количество процессов")
+    parser.add_argument("--threshold", type=float, default=3000,
+                        help="порог предупреждения по категории")
+    parser.add_argument("--output", default="processing_results.json")
+    return parser.parse_args()
+
+
+async def main():
+    args = parse_args()
+    filenames = expand_inputs(args.files)
+    missing = [name for name in filenames if not os.path.exists(name)]
+    if missing:
+        print(f"Файлы не найдены: {', '.join(missing)}")
+        return
+
+    print(f"Файлов: {len(filenames)}, процессов: {args.workers}")
+    print("-" * 50)
+
+    started = time.perf_counter()
+    stats, total_processed, sketches = process_parallel(filenames, args.workers)
+    elapsed = time.perf_counter() - started
+
+    # Результат сохраняется в той же схеме, что и у process_transactions.py
+    processor = TransactionProcessor(warning_threshold=args.threshold)
+    await processor.add_partial_stats(stats, sketches)
+
+    summary = processor.get_summary()
+    print("-" * 50)
+    print(f"Всего обработано транзакций: {total_processed} "
+          f"за {elapsed:.2f} с ({total_processed / elapsed if elapsed else 0:,.0f} записей/с)")
+    print(f"Найдено категорий: {summary['total_categories']}")
+    print(f"Общая сумма: {summary['total_amount']:.2f}")
+
+    await processor.save_results(args.output)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,223 @@
+import argparse
+import asyncio
+import time
+from typing import Any, Dict, List, Tuple
+
+from generate_transactions import TransactionGenerator
+from process_transactions import TransactionProcessor
+from sketches import KLLSketch
+
+QUEUE_SIZE = 64  # пакетов в очереди; при заполнении генератор ждет
+BATCH_SIZE = 100
+LINGER_MS = 5.0  # неполный пакет отправляется не позже чем через столько мс
+
+# Пакет в очереди: список (время создания по perf_counter, транзакция)
+Batch = List[Tuple[float, Dict[str, Any]]]
+
+
+# Задержки от создания транзакции до ее учета в агрегатах. Квантили
+# оцениваются скетчем KLL по микросекундам (см. sketches.py), поэтому память
+# не растет с числом транзакций; среднее и максимум точные
+class LatencyStats:
+    def __init__(self):
+        self.sketch = KLLSketch()
+        self.total = 0.0
+
+    def add(self, seconds: float):
+        self.sketch.update(int(seconds * 1_000_000))
+        self.total += seconds
+
+    def summary(self) -> Dict[str, float]:
+        count = self.sketch.count
+        if not count:
+            return {"count": 0, "avg_ms": 0.0, "p50_ms": 0.0, "p95_ms": 0.0, "p99_ms": 0.0, "max_ms": 0.0}
+        p50, p95, p99 = self.sketch.quantiles([0.50, 0.95, 0.99])
+        return {
+            "count": count,
+            "avg_ms": self.total / count * 1000,
+            "p50_ms": p50 / 1000,
+            "p95_ms": p95 / 1000,
+            "p99_ms": p99 / 1000,
+            "max_ms": self.sketch.max / 1000,
+        }
+
+
+# Конвейер генератор -> очередь -> обработчики в одном процессе, без файлов.
+# Очередь ограничена: если обработчики не успевают, put() приостанавливает
+# генератор (обратное давление), и память не растет. Транзакции передаются
+# пакетами, чтобы накладные расходы очереди делились на весь пакет
+class TransactionPipeline:
+    def __init__(self, generator: TransactionGenerator, processor: TransactionProcessor,
+                 consumers: int = 1, queue_size: int = QUEUE_SIZE,
+                 batch_size: int = BATCH_SIZE, linger_ms: float = LINGER_MS):
+        self.generator = generator
+        self.processor = processor
+        self.consumers = consumers
+        self.batch_size = batch_size
+        self.linger = linger_ms / 1000
+        self.queue: asyncio.Queue = None
+        self.queue_size = queue_size
+        self.latency = LatencyStats()
+        self.produced = 0
+        self.consumed = 0
+        self.batches = 0
+        self.max_queue_depth = 0
+        self.producer_wait = 0.0  # сколько генератор простоял на полной очереди
+        self._batch: Batch = []
+        self._flushing = None  # задача, отправляющая пакет по таймеру linger
+
+    async def _put(self, batch: Batch):
+        started = time.perf_counter()
+        await self.queue.put(batch)
+        self.producer_wait += time.perf_counter() - started
+        self.batches += 1
+        self.max_queue_depth = max(self.max_queue_depth, self.queue.qsize())
+
+    # Производитель: собирает пакеты из потока генератора. Пакет уходит,
+    # когда набран batch_size или с первой транзакции прошло linger. Если
+    # генератор медленный и следующая транзакция задерживается, неполный
+    # пакет отправляет таймер, а не следующая транзакция
+    async def produce(self, num_transactions: int):
+        loop = asyncio.get_running_loop()
+        self._batch = []
+        self._flushing = None
+        first = 0.0
+        timer = None
+        try:
+            async for transaction in self.generator.transaction_stream(num_transactions):
+                now = time.perf_counter()
+                if not self._batch:
+                    first = now
+                    timer = loop.call_later(self.linger, self._linger_expired)
+                self._batch.append((now, transaction))
+                self.produced += 1
+                if len(self._batch) >= self.batch_size or now - first >= self.linger:
+                    timer.cancel()
+                    await self._flush()
+            await self._flush()
+        finally:
+            if timer is not None:
+                timer.cancel()
+            if self._flushing is not None:
+                self._flushing.cancel()
+
+    # Отправка накопленного пакета после пакетов, уже отправленных таймером
+    # (порядок пакетов в очереди сохраняется)
+    async def _flush(self):
+        batch, self._batch = self._batch, []
+        if self._flushing is not None:
+            await self._flushing
+            self._flushing = None
+        if batch:
+            await self._put(batch)
+
+    # Срабатывание таймера linger: пакет ставится в очередь отдельной задачей,
+    # пока производитель ждет генератор
+    def _linger_expired(self):
+        batch, self._batch = self._batch, []
+        if batch:
+            self._flushing = asyncio.ensure_future(self._put_after(self._flushing, batch))
+
+    async def _put_after(self, previous, batch: Batch):
+        if previous is not None:
+            await previous
+        await self._put(batch)
+
+    # Потребитель: обрабатывает пакеты до получения None
+    async def consume(self):
+        processor = self.processor
+        latency = self.latency
+        while True:
+            batch = await self.queue.get()
+            try:
+                if batch is None:
+                    return
+                for created, transaction in batch:
+                    await processor.process_transaction(transaction)
+                    latency.add(time.perf_counter() - created)
+                self.consumed += len(batch)
+            finally:
+                self.queue.task_done()
+
+    async def run(self, num_transactions: int) -> Dict[str, Any]:
+        self.queue = asyncio.Queue(maxsize=self.queue_size)
+        started = time.perf_counter()
+        workers = [asyncio.create_task(self.consume()) for _ in range(self.consumers)]
+        try:
+            await self.produce(num_transactions)
+            for _ in workers:
+                await self.queue.put(None)
+            await asyncio.gather(*workers)
+        except BaseException:
+            for worker in workers:
+                worker.cancel()
+            raise
+        elapsed = time.perf_counter() - started
+        return self.stats(elapsed)
+
+    def stats(self, elapsed: float) -> Dict[str, Any]:
+        return {
+            "produced": self.produced,
+            "consumed": self.consumed,
+            "batches": self.batches,
+            "elapsed_s": elapsed,
+            "throughput": self.consumed / elapsed if elapsed else 0.0,
+            "max_queue_depth": self.max_queue_depth,
+            "producer_wait_s": self.producer_wait,
+            "latency": self.latency.summary(),
+        }
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Генерация и обработка транзакций в одном процессе через очередь",
+        epilog="Пример: python pipeline.py 100000 --consumers 4 --batch-size 200"
+    )
+    parser.add_argument("count", type=int, help="количество транзакций")
+    parser.add_argument("--consumers", type=int, default=1, help="количество обработчиков")
+    parser.add_argument("--queue-size", type=int, default=QUEUE_SIZE, help="емкость очереди в пакетах")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE, help="транзакций в пакете")
+    parser.add_argument("--linger-ms", type=float, default=LINGER_MS,
+                        help="максимальное ожидание неполного пакета, мс")
+    parser.add_argument("--threshold", type=float, default=3000,
+                        help="порог предупреждения по категории")
+    parser.add_argument("--window", type=float, help="длина окна в секундах")
+    parser.add_argument("--slide", type=float, help="шаг скользящего окна в секундах")
+    return parser.parse_args()
+
+
+async def main():
+    args = parse_args()
+    if args.count <= 0:
+        print("Количество транзакций должно быть положительным числом")
+        return
+
+    processor = TransactionProcessor(warning_threshold=args.threshold,
+                                     window=args.window, slide=args.slide)
+    pipeline = TransactionPipeline(TransactionGenerator(), processor, consumers=args.consumers,
+                                   queue_size=args.queue_size, batch_size=args.batch_size,
+                                   linger_ms=args.linger_ms)
+
+    print(f"Конвейер: {args.count} транзакций, обработчиков: {args.consumers}, "
+          f"очередь: {args.queue_size} x {args.batch_size}")
+    print("-" * 50)
+    stats = await pipeline.run(args.count)
+
+    latency = stats["latency"]
+    print("-" * 50)
+    print(f"Обработано {stats['consumed']} транзакций за {stats['elapsed_s']:.2f} с "
+          f"({stats['throughput']:,.0f} в секунду)")
+    print(f"Пакетов: {stats['batches']}, максимум в очереди: {stats['max_queue_depth']}, "
+          f"ожидание генератора: {stats['producer_wait_s']:.2f} с")
+    print(f"Задержка создание -> учет: средняя {latency['avg_ms']:.2f} мс, "
+          f"p50 {latency['p50_ms']:.2f}, p95 {latency['p95_ms']:.2f}, "
+          f"p99 {latency['p99_ms']:.2f}, максимум {latency['max_ms']:.2f} мс")
+
+    summary = processor.get_summary()
+    print(f"Найдено категорий: {summary['total_categories']}, "
+          f"общая сумма: {summary['total_amount']:.2f}")
+    await processor.save_results()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,79 +1,245 @@
+import argparse
 import asyncio
 import json
-from collections import defaultdict
+import os
+import time
 from datetime import datetime
 from typing import Dict, List, Any
-import sys
+
+from binary_format import BinaryTransactionFile, is_binary_file
+from checkpoint import default_checkpoint_path, fingerprint, load_checkpoint, remove_checkpoint, save_checkpoint
+from columnar import ColumnarStore, from_cents, group_segment, merge_group_stats, to_cents, transaction_timestamp_us
+from json_stream import CHUNK_SIZE, YIELD_EVERY, read_json_batches, read_json_records
+from sketches import CategorySketches
+from windowing import AlertSink, JSONLinesSink, WindowedMonitor, print_alert
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+CHECKPOINT_INTERVAL = 5.0  # секунд между контрольными точками
+PROGRESS_INTERVAL = 1.0  # секунд между сообщениями о прогрессе
+
+
+# Сообщения о прогрессе не чаще одного раза в interval секунд
+class ProgressReporter:
+    def __init__(self, total_bytes: int, interval: float = PROGRESS_INTERVAL):
+        self.total_bytes = total_bytes
+        self.interval = interval
+        self.started = time.monotonic()
+        self._last = self.started
+
+    def update(self, count: int, offset: int, force: bool = False):
+        now = time.monotonic()
+        if not force and now - self._last < self.interval:
+            return
+        self._last = now
+        elapsed = now - self.started
+        percent = offset / self.total_bytes * 100 if self.total_bytes else 100.0
+        rate = f", {count / elapsed:,.0f} в секунду" if elapsed > 0 else ""
+        print(f"Обработано {count} транзакций ({percent:.1f}%{rate})")
 
 
 class TransactionProcessor:
-    def __init__(self, warning_threshold: float = 5000):
+    # window и slide — длина окна и шаг в секундах (см. WindowedMonitor);
+    # без window порог проверяется по накопительной сумме
+    def __init__(self, warning_threshold: float = 5000, window: float = None,
+                 slide: float = None, alert_sink: AlertSink = print_alert,
+                 checkpoint_interval: float = CHECKPOINT_INTERVAL,
+                 progress_interval: float = PROGRESS_INTERVAL):
         self.warning_threshold = warning_threshold
-        self.category_totals = defaultdict(float)  # Суммы по категориям
-        self.category_transactions = defaultdict(list)  # Транзакции по категориям
-    
-    # Асинхронное чтение файла
-    async def read_transactions_stream(self, filename: str):
-        print(f"Чтение транзакций из файла: {filename}")
-        
-        try:
-            with open(filename, 'r', encoding='utf-8') as f:
-                transactions = json.load(f)
-        except (FileNotFoundError, json.JSONDecodeError) as e:
-            print(f"Ошибка при чтении файла: {e}")
-            return
-        
-        # Имитация асинхронного чтения
-        for transaction in transactions:
-            await asyncio.sleep(0.001)
-            yield transaction
+        self.window = window
+        self.slide = slide
+        self.store = ColumnarStore()  # Колоночное хранилище транзакций
+        self.monitor = WindowedMonitor(warning_threshold, window, slide, alert_sink)
+        self.partial_stats = {}  # Готовые агрегаты, посчитанные вне процесса (parallel_processing.py)
+        self.sketches = CategorySketches()  # Квантили и число различных сумм по категориям
+        self.checkpoint_interval = checkpoint_interval
+        self.chunk_size = CHUNK_SIZE  # блок чтения; контрольные точки ставятся на его границах
+        self.progress_interval = progress_interval
+        # Агрегаты строк хранилища, уже учтенных в контрольной точке:
+        # при следующей точке группируются только новые строки
+        self._checkpoint_rows = 0
+        self._checkpoint_stats = {}
     
     # Обработка одной транзакции
     async def process_transaction(self, transaction: Dict[str, Any]):
         category = transaction["category"]
         amount = transaction["amount"]
+        amount_cents = to_cents(amount)
+        timestamp_us = transaction_timestamp_us(transaction)
         
-        self.category_transactions[category].append(transaction)
-        self.category_totals[category] += amount
+        self.store.append(timestamp_us, category, amount_cents)
+        self.sketches.update(category, amount_cents)
         
-        # Проверка превышения порога
-        await self.check_threshold(category, self.category_totals[category])
+        # Проверка порога: предупреждение только при пересечении
+        self.monitor.observe(category, timestamp_us, amount_cents)
         
         return category, amount
     
-    # Проверка порога расходов
-    async def check_threshold(self, category: str, total: float):
-        if total > self.warning_threshold:
-            print(f"  ВНИМАНИЕ: Расходы в категории '{category}' "
-                  f"превысили {self.warning_threshold:.2f}. "
-                  f"Текущая сумма: {total:.2f}")
+    # Обработка двоичного файла: файл отображается в память и подключается
+    # к хранилищу как сегмент, агрегаты считаются прямо по его столбцам
+    async def process_binary_file(self, filename: str):
+        print(f"Чтение двоичного файла: {filename}")
+        
+        segment = BinaryTransactionFile(filename)
+        self.store.add_segment(segment)
+        
+        if np is not None:
+            _, codes, amounts = segment.columns()
+            self.sketches.update_arrays(codes, amounts, segment.categories)
+            del codes, amounts
+        else:
+            for _, code, cents in segment.iter_raw():
+                self.sketches.update(segment.categories[code], cents)
+        
+        if self.monitor.size is None:
+            # Для накопительного порога хватает итогов по категориям
+            await self.add_threshold_totals(group_segment(segment))
+        else:
+            categories = segment.categories
+            for timestamp_us, code, cents in segment.iter_raw():
+                self.monitor.observe(categories[code], timestamp_us, cents)
+        
+        return len(segment)
+    
+    # Подключение частичных агрегатов {категория: {sum, count, min, max}}
+    # и их скетчей (без меток времени, поэтому порог проверяется только
+    # в накопительном режиме)
+    async def add_partial_stats(self, stats: Dict[str, Dict[str, int]],
+                                sketches: CategorySketches = None):
+        self.partial_stats = merge_group_stats(self.partial_stats, stats)
+        if sketches is not None:
+            self.sketches.merge(sketches)
+        
+        if self.monitor.size is None:
+            await self.add_threshold_totals(stats)
+    
+    async def add_threshold_totals(self, stats: Dict[str, Dict[str, int]]):
+        for category, category_stats in stats.items():
+            self.monitor.observe(category, 0, category_stats["sum"], category_stats["count"])
+    
+    # Асинхронное потоковое чтение файла (JSON-массив или JSONL):
+    # записи выдаются по мере разбора, без загрузки всего файла в память
+    async def read_transactions_stream(self, filename: str):
+        print(f"Чтение транзакций из файла: {filename}")
+        try:
+            async for transaction in read_json_records(filename):
+                yield transaction
+        except (FileNotFoundError, ValueError) as e:
+            print(f"Ошибка при чтении файла: {e}")
     
-    # Обработка всего потока
-    async def process_stream(self, filename: str):
+    # Обработка всего потока. Файл (JSON-массив или JSONL) читается
+    # потоково, пакетами по блоку файла. Если задан checkpoint_path, не реже
+    # раза в checkpoint_interval секунд на границе пакета сохраняется
+    # контрольная точка; resume=True продолжает обработку с нее
+    async def process_stream(self, filename: str, checkpoint_path: str = None, resume: bool = False):
         print(f"Начало обработки транзакций")
         print("-" * 50)
         
+        if is_binary_file(filename):
+            return await self.process_binary_file(filename)
+        
+        print(f"Чтение транзакций из файла: {filename}")
         transaction_count = 0
-        stream = self.read_transactions_stream(filename)
+        offset = 0
+        parser_state = {"mode": None, "finished": False}
         
-        async for transaction in stream:
-            category, amount = await self.process_transaction(transaction)
-            transaction_count += 1
+        try:
+            if checkpoint_path and resume:
+                # Точка от другого файла или с другими настройками окна —
+                # отдельная ошибка, а не ошибка чтения входного файла
+                try:
+                    state = load_checkpoint(checkpoint_path, filename)
+                    if state is not None:
+                        self.restore_checkpoint(state)
+                except ValueError as e:
+                    print(f"Контрольная точка {checkpoint_path} не подходит: {e}")
+                    return transaction_count
+                if state is not None:
+                    transaction_count, offset, parser_state = state["records"], state["offset"], state["parser"]
+                    print(f"Продолжение с контрольной точки: {transaction_count} транзакций, "
+                          f"смещение {offset} байт")
+            
+            progress = ProgressReporter(os.path.getsize(filename), self.progress_interval)
+            last_checkpoint = time.monotonic()
+            batches = read_json_batches(filename, offset, parser_state["mode"], parser_state["finished"],
+                                        self.chunk_size)
             
-            # Вывод прогресса
-            if transaction_count % 50 == 0:
-                print(f"Обработано {transaction_count} транзакций")
+            async for records, offset, parser_state in batches:
+                for transaction in records:
+                    await self.process_transaction(transaction)
+                    transaction_count += 1
+                    if transaction_count % YIELD_EVERY == 0:
+                        await asyncio.sleep(0)
+                
+                progress.update(transaction_count, offset)
+                if checkpoint_path and time.monotonic() - last_checkpoint >= self.checkpoint_interval:
+                    await self.save_checkpoint(checkpoint_path, filename, transaction_count,
+                                               offset, parser_state)
+                    last_checkpoint = time.monotonic()
+        except (FileNotFoundError, ValueError) as e:
+            print(f"Ошибка при чтении файла: {e}")
+            return transaction_count
         
+        progress.update(transaction_count, offset, force=True)
+        # Файл обработан целиком — точка больше не нужна
+        if checkpoint_path:
+            remove_checkpoint(checkpoint_path)
         return transaction_count
     
+    # Состояние обработки после offset байт входного файла. Агрегаты хранилища
+    # досчитываются только по строкам, добавленным с прошлой точки
+    def checkpoint_state(self, filename: str, count: int, offset: int,
+                         parser_state: Dict[str, Any]) -> Dict[str, Any]:
+        self._checkpoint_stats = merge_group_stats(self._checkpoint_stats,
+                                                   self.store.group_rows(self._checkpoint_rows))
+        self._checkpoint_rows = len(self.store.amounts)
+        return {
+            "saved_at": datetime.now().isoformat(),
+            "input": os.path.abspath(filename),
+            "offset": offset,
+            "fingerprint": fingerprint(filename, offset),
+            "records": count,
+            "parser": parser_state,
+            "stats": merge_group_stats(self._checkpoint_stats, self.partial_stats),
+            "sketches": self.sketches.to_dict(),
+            "monitor": self.monitor.state()
+        }
+    
+    # Состояние собирается синхронно (целостный снимок), запись с fsync — в потоке
+    async def save_checkpoint(self, path: str, filename: str, count: int, offset: int,
+                              parser_state: Dict[str, Any]):
+        state = self.checkpoint_state(filename, count, offset, parser_state)
+        await asyncio.to_thread(save_checkpoint, path, state)
+    
+    # Восстановление из точки: агрегаты обработанной части становятся
+    # частичными агрегатами, хранилище заполняется уже новыми записями
+    def restore_checkpoint(self, state: Dict[str, Any]):
+        self.monitor.restore(state["monitor"])
+        self.partial_stats = merge_group_stats(self.partial_stats, state["stats"])
+        self.sketches = CategorySketches.from_dict(state["sketches"])
+    
+    # Агрегаты по категориям (векторная группировка по колоночному хранилищу)
+    def category_stats(self) -> Dict[str, Dict[str, int]]:
+        return merge_group_stats(self.store.group_by_category(), self.partial_stats)
+
+    # Суммы по категориям
+    @property
+    def category_totals(self) -> Dict[str, float]:
+        return {category: from_cents(stats["sum"]) for category, stats in self.category_stats().items()}
+
     # Формирование сводки
     def get_summary(self) -> Dict[str, Any]:
-        max_category = max(self.category_totals.items(), key=lambda x: x[1]) if self.category_totals else ("Нет данных", 0)
-        min_category = min(self.category_totals.items(), key=lambda x: x[1]) if self.category_totals else ("Нет данных", 0)
+        stats = self.category_stats()
+        category_totals = {category: from_cents(s["sum"]) for category, s in stats.items()}
+        max_category = max(category_totals.items(), key=lambda x: x[1]) if category_totals else ("Нет данных", 0)
+        min_category = min(category_totals.items(), key=lambda x: x[1]) if category_totals else ("Нет данных", 0)
         
         return {
-            "total_categories": len(self.category_totals),
-            "total_amount": sum(self.category_totals.values()),
+            "total_categories": len(category_totals),
+            "total_amount": from_cents(sum(s["sum"] for s in stats.values())),
             "max_category": {
                 "name": max_category[0],
                 "amount": max_category[1]
@@ -86,19 +252,38 @@ class TransactionProcessor:
                 {
                     "category": category,
                     "total": total,
-                    "transaction_count": len(self.category_transactions[category])
+                    "transaction_count": stats[category]["count"],
+                    "min_amount": from_cents(stats[category]["min"]),
+                    "max_amount": from_cents(stats[category]["max"]),
+                    **self.sketch_summary(category)
                 }
-                for category, total in sorted(self.category_totals.items(), key=lambda x: x[1], reverse=True)
+                for category, total in sorted(category_totals.items(), key=lambda x: x[1], reverse=True)
             ]
         }
     
+    # Приближенные квантили сумм и число различных сумм по скетчам категории
+    def sketch_summary(self, category: str) -> Dict[str, Any]:
+        if category not in self.sketches:
+            return {}
+        summary = self.sketches.summary(category)
+        return {
+            "amount_quantiles": {name: from_cents(value) for name, value in summary["quantiles"].items()},
+            "distinct_amounts": summary["distinct_amounts"]
+        }
+    
     # Сохранение результатов
     async def save_results(self, output_filename: str = "processing_results.json"):
+        summary = self.get_summary()
         results = {
             "processed_at": datetime.now().isoformat(),
             "warning_threshold": self.warning_threshold,
-            "summary": self.get_summary(),
-            "category_totals": dict(self.category_totals)
+            "window": {"size": self.window, "slide": self.slide or self.window} if self.window else None,
+            "alerts": self.monitor.stats(),
+            "summary": summary,
+            "category_totals": {d["category"]: d["total"] for d in summary["category_details"]},
+            # Состояние скетчей: их можно загрузить и объединить с другими
+            # запусками через CategorySketches.from_dict
+            "sketches": self.sketches.to_dict()
         }
         
         with open(output_filename, 'w', encoding='utf-8') as f:
@@ -107,34 +292,65 @@ class TransactionProcessor:
         print(f"Результаты сохранены в {output_filename}")
 
 
+def parse_args():
+    parser = argparse.ArgumentParser(
+        description="Обработка транзакций",
+        epilog="Пример: python process_transactions.py all_transactions.jsonl --window 60 --slide 10"
+    )
+    parser.add_argument("input", help="файл с транзакциями (JSON, JSONL или двоичный)")
+    parser.add_argument("--threshold", type=float, default=3000,
+                        help="порог предупреждения по категории")
+    parser.add_argument("--window", type=float,
+                        help="длина окна в секундах (по умолчанию — накопительная сумма)")
+    parser.add_argument("--slide", type=float,
+                        help="шаг скользящего окна в секундах (по умолчанию окна не пересекаются)")
+    parser.add_argument("--alerts-file",
+                        help="писать предупреждения в JSONL-файл вместо вывода на экран")
+    parser.add_argument("--resume", action="store_true",
+                        help="продолжить с последней контрольной точки")
+    parser.add_argument("--checkpoint",
+                        help="файл контрольной точки (по умолчанию <входной_файл>.checkpoint)")
+    parser.add_argument("--checkpoint-interval", type=float, default=CHECKPOINT_INTERVAL,
+                        help="секунд между контрольными точками")
+    parser.add_argument("--no-checkpoint", action="store_true",
+                        help="не сохранять контрольные точки")
+    return parser.parse_args()
+
+
 async def main():
-    if len(sys.argv) != 2:
-        print("Использование: python process_transactions.py <файл_с_транзакциями>")
-        print("Пример: python process_transactions.py all_transactions.json")
-        return
+    args = parse_args()
+    input_filename = args.input
     
-    input_filename = sys.argv[1]
-    
-    processor = TransactionProcessor(warning_threshold=3000)
+    sink = JSONLinesSink(args.alerts_file) if args.alerts_file else print_alert
+    processor = TransactionProcessor(warning_threshold=args.threshold, window=args.window,
+                                     slide=args.slide, alert_sink=sink,
+                                     checkpoint_interval=args.checkpoint_interval)
+    checkpoint_path = None if args.no_checkpoint else (
+        args.checkpoint or default_checkpoint_path(input_filename))
     
     # Обработка транзакций
-    total_processed = await processor.process_stream(input_filename)
+    total_processed = await processor.process_stream(input_filename, checkpoint_path, args.resume)
     
     print("-" * 50)
     print(f"Обработка завершена")
     print(f"Всего обработано транзакций: {total_processed}")
-    print(f"Найдено категорий: {len(processor.category_totals)}")
+    summary = processor.get_summary()
+    print(f"Найдено категорий: {summary['total_categories']}")
     print()
     
     # Вывод результатов
     print("Расходы по категориям:")
     print("-" * 30)
-    for category, total in sorted(processor.category_totals.items(), key=lambda x: x[1], reverse=True):
-        count = len(processor.category_transactions[category])
-        print(f"{category:15} | {total:10.2f} | {count:4} транзакций")
+    for details in summary["category_details"]:
+        print(f"{details['category']:15} | {details['total']:10.2f} | {details['transaction_count']:4} транзакций")
     
     print("-" * 30)
-    print(f"Общая сумма: {sum(processor.category_totals.values()):.2f}")
+    print(f"Общая сумма: {summary['total_amount']:.2f}")
+    
+    alerts = processor.monitor.stats()
+    print(f"Предупреждений: {alerts['alerts_sent']}, опоздавших событий: {alerts['late_events']}")
+    if args.alerts_file:
+        sink.close()
     
     # Сохранение результатов
     await processor.save_results()
@@ -0,0 +1,291 @@
+import base64
+import math
+import random
+from typing import Any, Dict, List, Sequence
+
+try:
+    import numpy as np
+except ImportError:  # без NumPy пакеты значений добавляются по одному
+    np = None
+
+MASK64 = (1 << 64) - 1
+
+
+# Перемешивание 64-битного целого (splitmix64) — хеш для HyperLogLog
+def mix64(value: int) -> int:
+    z = (value + 0x9E3779B97F4A7C15) & MASK64
+    z = ((z ^ (z >> 30)) * 0xBF58476D1CE4E5B9) & MASK64
+    z = ((z ^ (z >> 27)) * 0x94D049BB133111EB) & MASK64
+    return z ^ (z >> 31)
+
+
+def _mix64_array(values):
+    with np.errstate(over="ignore"):
+        z = values.astype(np.uint64) + np.uint64(0x9E3779B97F4A7C15)
+        z = (z ^ (z >> np.uint64(30))) * np.uint64(0xBF58476D1CE4E5B9)
+        z = (z ^ (z >> np.uint64(27))) * np.uint64(0x94D049BB133111EB)
+        return z ^ (z >> np.uint64(31))
+
+
+# Квантильный скетч KLL: уровни-компакторы, элемент уровня h весит 2**h.
+# Переполненный уровень сортируется, и каждый второй элемент (со случайным
+# сдвигом) уходит на уровень выше. Память O(k·log(n/k)), ошибка ранга ~1/k;
+# скетчи объединяются сложением уровней.
+class KLLSketch:
+    def __init__(self, k: int = 200, c: float = 2 / 3, seed: int = None):
+        self.k = k
+        self.c = c
+        self.count = 0
+        self.min = None
+        self.max = None
+        self.compactors: List[List[int]] = []
+        self._rng = random.Random(seed)
+        self._size = 0
+        self._max_size = 0
+        self._grow()
+
+    def _grow(self):
+        self.compactors.append([])
+        self._max_size = sum(self._capacity(h) for h in range(len(self.compactors)))
+
+    def _capacity(self, h: int) -> int:
+        depth = len(self.compactors) - h - 1
+        return int(math.ceil(self.k * self.c ** depth)) + 1
+
+    def update(self, value: int):
+        self.compactors[0].append(value)
+        self._size += 1
+        self.count += 1
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+        if self._size >= self._max_size:
+            self._compress()
+
+    # Добавление пакета значений (список или массив NumPy)
+    def update_many(self, values: Sequence[int]):
+        if len(values) == 0:
+            return
+        if np is not None and isinstance(values, np.ndarray):
+            low, high = int(values.min()), int(values.max())
+            values = values.tolist()
+        else:
+            low, high = min(values), max(values)
+        self.min = low if self.min is None else min(self.min, low)
+        self.max = high if self.max is None else max(self.max, high)
+        self.count += len(values)
+        step = self.k
+        for i in range(0, len(values), step):
+            part = values[i:i + step]
+            self.compactors[0].extend(part)
+            self._size += len(part)
+            if self._size >= self._max_size:
+                self._compress()
+
+    def _compress(self):
+        for h in range(len(self.compactors)):
+            if len(self.compactors[h]) < self._capacity(h):
+                continue
+            if h + 1 >= len(self.compactors):
+                self._grow()
+            items = sorted(self.compactors[h])
+            # При нечетной длине один элемент остается на уровне
+            self.compactors[h] = [items.pop()] if len(items) % 2 else []
+            self.compactors[h + 1].extend(items[self._rng.getrandbits(1)::2])
+            self._size = sum(len(level) for level in self.compactors)
+            if self._size < self._max_size:
+                break
+
+    def merge(self, other: "KLLSketch"):
+        while len(self.compactors) < len(other.compactors):
+            self._grow()
+        for h, level in enumerate(other.compactors):
+            self.compactors[h].extend(level)
+        self.count += other.count
+        if other.min is not None:
+            self.min = other.min if self.min is None else min(self.min, other.min)
+            self.max = other.max if self.max is None else max(self.max, other.max)
+        self._size = sum(len(level) for level in self.compactors)
+        while self._size >= self._max_size:
+            self._compress()
+
+    # Приближенные квантили для списка уровней q (0..1)
+    def quantiles(self, qs: Sequence[float]) -> List[int]:
+        if self.count == 0:
+            return [None for _ in qs]
+        weighted = sorted((value, 1 << h) for h, level in enumerate(self.compactors) for value in level)
+        total = sum(weight for _, weight in weighted)
+        result = []
+        for q in qs:
+            if q <= 0:
+                result.append(self.min)
+                continue
+            if q >= 1:
+                result.append(self.max)
+                continue
+            target = q * total
+            cumulative = 0
+            for value, weight in weighted:
+                cumulative += weight
+                if cumulative >= target:
+                    result.append(value)
+                    break
+            else:
+                result.append(self.max)
+        return result
+
+    def quantile(self, q: float) -> int:
+        return self.quantiles([q])[0]
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"k": self.k, "c": self.c, "count": self.count, "min": self.min, "max": self.max,
+                "compactors": [sorted(level) for level in self.compactors]}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "KLLSketch":
+        sketch = cls(k=data["k"], c=data.get("c", 2 / 3))
+        sketch.compactors = [list(level) for level in data["compactors"]] or [[]]
+        sketch._max_size = sum(sketch._capacity(h) for h in range(len(sketch.compactors)))
+        sketch._size = sum(len(level) for level in sketch.compactors)
+        sketch.count, sketch.min, sketch.max = data["count"], data["min"], data["max"]
+        return sketch
+
+
+# HyperLogLog: оценка числа различных значений по 2**p однобайтовым регистрам.
+# Стандартная ошибка ~1.04/sqrt(2**p), при p=10 — около 3% на 1 КБ памяти.
+# Объединение — поэлементный максимум регистров.
+class HyperLogLog:
+    def __init__(self, p: int = 10):
+        self.p = p
+        self.m = 1 << p
+        self.registers = bytearray(self.m)
+
+    def add(self, value: int):
+        h = mix64(value)
+        index = h & (self.m - 1)
+        rest = h >> self.p
+        rank = (rest & -rest).bit_length() if rest else 64 - self.p + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def add_many(self, values: Sequence[int]):
+        if np is None or not isinstance(values, np.ndarray):
+            for value in values:
+                self.add(value)
+            return
+        if len(values) == 0:
+            return
+        h = _mix64_array(values)
+        index = (h & np.uint64(self.m - 1)).astype(np.intp)
+        rest = h >> np.uint64(self.p)
+        lowest = rest & (~rest + np.uint64(1))  # младший единичный бит
+        ranks = np.full(len(values), 64 - self.p + 1, dtype=np.uint8)
+        nonzero = lowest != 0
+        ranks[nonzero] = np.log2(lowest[nonzero]).astype(np.uint8) + 1
+        registers = np.frombuffer(self.registers, dtype=np.uint8)
+        np.maximum.at(registers, index, ranks)
+
+    def merge(self, other: "HyperLogLog"):
+        if other.p != self.p:
+            raise ValueError("Нельзя объединить HyperLogLog с разной точностью")
+        self.registers = bytearray(max(a, b) for a, b in zip(self.registers, other.registers))
+
+    def count(self) -> int:
+        m = self.m
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * math.log(m / zeros)  # поправка для малых значений
+        return int(round(estimate))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"p": self.p, "registers": base64.b64encode(bytes(self.registers)).decode("ascii")}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "HyperLogLog":
+        sketch = cls(p=data["p"])
+        sketch.registers = bytearray(base64.b64decode(data["registers"]))
+        return sketch
+
+
+QUANTILES = (0.5, 0.9, 0.95, 0.99)
+
+
+# Скетчи по категориям: квантили сумм (KLL) и число различных сумм (HLL).
+# Значения — суммы в копейках
+class CategorySketches:
+    def __init__(self, k: int = 200, p: int = 10):
+        self.k = k
+        self.p = p
+        self.quantiles: Dict[str, KLLSketch] = {}
+        self.distinct: Dict[str, HyperLogLog] = {}
+
+    def _get(self, category: str):
+        sketch = self.quantiles.get(category)
+        if sketch is None:
+            sketch = self.quantiles[category] = KLLSketch(self.k)
+            self.distinct[category] = HyperLogLog(self.p)
+        return sketch, self.distinct[category]
+
+    def update(self, category: str, amount: int):
+        quantiles, distinct = self._get(category)
+        quantiles.update(amount)
+        distinct.add(amount)
+
+    # Пакет по столбцам кодов категорий и сумм
+    def update_arrays(self, codes, amounts, categories: List[str]):
+        if np is None:
+            for code, amount in zip(codes, amounts):
+                self.update(categories[code], amount)
+            return
+        codes = np.asarray(codes)
+        amounts = np.asarray(amounts, dtype=np.int64)
+        for code in np.flatnonzero(np.bincount(codes, minlength=len(categories))):
+            values = amounts[codes == code]
+            quantiles, distinct = self._get(categories[code])
+            quantiles.update_many(values)
+            distinct.add_many(values)
+
+    def merge(self, other: "CategorySketches"):
+        for category, sketch in other.quantiles.items():
+            quantiles, distinct = self._get(category)
+            quantiles.merge(sketch)
+            distinct.merge(other.distinct[category])
+
+    def __contains__(self, category: str) -> bool:
+        return category in self.quantiles
+
+    # Сводка по категории: квантили (в копейках) и число различных сумм
+    def summary(self, category: str) -> Dict[str, Any]:
+        values = self.quantiles[category].quantiles(QUANTILES)
+        return {
+            "quantiles": {f"p{round(q * 100)}": value for q, value in zip(QUANTILES, values)},
+            "distinct_amounts": self.distinct[category].count(),
+        }
+
+    # Параметры k и p сохраняются вместе со скетчами: категории, которые
+    # появятся после восстановления, получают те же размеры
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "k": self.k,
+            "p": self.p,
+            "categories": {
+                category: {"kll": sketch.to_dict(), "hll": self.distinct[category].to_dict()}
+                for category, sketch in self.quantiles.items()
+            },
+        }
+
+    # Понимает и прежний формат — словарь категорий без параметров
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "CategorySketches":
+        if set(data) == {"k", "p", "categories"}:
+            sketches = cls(k=data["k"], p=data["p"])
+            data = data["categories"]
+        else:
+            sketches = cls()
+        for category, item in data.items():
+            sketches.quantiles[category] = KLLSketch.from_dict(item["kll"])
+            sketches.distinct[category] = HyperLogLog.from_dict(item["hll"])
+        return sketches
@@ -0,0 +1,64 @@
+import os
+import tempfile
+import unittest
+from binary_format import RECORD_SIZE, BinaryTransactionFile, BinaryTransactionWriter, is_binary_file
+from columnar import ColumnarStore, group_segment
+
+CATEGORIES = ["food", "еда", "travel"]
+RECORDS = [
+    {"timestamp": "2025-01-01T10:00:00.123456", "category": "еда", "amount": 10.5},
+    {"timestamp": "2025-01-01T10:00:01", "category": "travel", "amount": 1000.0},
+    {"timestamp": "2025-01-01T10:00:02.000001", "category": "еда", "amount": 0.01},
+]
+
+
+class TestBinaryFormat(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.directory.name, "t.bin")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def read_all(self):
+        with BinaryTransactionFile(self.filename) as data:
+            return list(data.iter_transactions())
+
+    def test_round_trip(self):
+        with BinaryTransactionWriter(self.filename, CATEGORIES) as writer:
+            writer.write_transactions(RECORDS)
+        self.assertTrue(is_binary_file(self.filename))
+        self.assertEqual(self.read_all(), RECORDS)
+
+    def test_append_drops_partial_record(self):
+        with BinaryTransactionWriter(self.filename, CATEGORIES) as writer:
+            writer.write_transactions(RECORDS[:2])
+        with open(self.filename, "ab") as f:
+            f.write(b"\x00" * (RECORD_SIZE // 2))  # оборванная запись
+        with BinaryTransactionWriter(self.filename, CATEGORIES, append=True) as writer:
+            writer.write_transactions(RECORDS[2:])
+        self.assertEqual(self.read_all(), RECORDS)
+
+    def test_append_with_other_dictionary(self):
+        with BinaryTransactionWriter(self.filename, CATEGORIES) as writer:
+            writer.write_transactions(RECORDS)
+        with self.assertRaises(ValueError):
+            BinaryTransactionWriter(self.filename, ["food"], append=True)
+
+    # Код категории в записи — один байт: больший словарь не записывается
+    def test_too_many_categories(self):
+        with self.assertRaises(ValueError):
+            BinaryTransactionWriter(self.filename, [f"c{i}" for i in range(257)])
+
+    def test_segment_aggregation(self):
+        with BinaryTransactionWriter(self.filename, CATEGORIES) as writer:
+            writer.write_transactions(RECORDS)
+        expected = ColumnarStore()
+        for transaction in RECORDS:
+            expected.append_transaction(transaction)
+        with BinaryTransactionFile(self.filename) as data:
+            self.assertEqual(group_segment(data), expected.group_by_category())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,94 @@
+import json
+import os
+import tempfile
+import time
+import unittest
+import bulk_generator
+from binary_format import BinaryTransactionFile
+from bulk_generator import MAX_CENTS, MIN_CENTS, BulkGenerator, generate_to_file
+from columnar import from_timestamp_us, to_cents, to_timestamp_us
+
+CATEGORIES = ["food", "еда", "travel"]
+START = to_timestamp_us("2025-01-01T00:00:00")
+
+
+class TestBulkGenerator(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.directory.name, name)
+
+    def test_columns_in_range_and_monotonic(self):
+        timestamps, codes, amounts = BulkGenerator(CATEGORIES, seed=1, start_us=START).columns(10000)
+        self.assertTrue(all(0 <= c < len(CATEGORIES) for c in codes))
+        self.assertTrue(all(MIN_CENTS <= a <= MAX_CENTS for a in amounts))
+        self.assertTrue(all(a <= b for a, b in zip(timestamps, timestamps[1:])))
+        self.assertGreaterEqual(timestamps[0], START)
+
+    def test_seed_is_reproducible_regardless_of_chunk(self):
+        generate_to_file(self.path("a.bin"), 5000, CATEGORIES, seed=7, start_us=START, chunk=333)
+        generate_to_file(self.path("b.bin"), 3000, CATEGORIES, seed=7, start_us=START, chunk=4096)
+        with BinaryTransactionFile(self.path("a.bin")) as a, BinaryTransactionFile(self.path("b.bin")) as b:
+            self.assertEqual(list(a.iter_raw(0, 3000)), list(b.iter_raw()))
+
+    def test_prefix_without_numpy(self):
+        saved, bulk_generator.np = bulk_generator.np, None
+        try:
+            generate_to_file(self.path("a.bin"), 700, CATEGORIES, seed=7, start_us=START, chunk=33)
+            generate_to_file(self.path("b.bin"), 400, CATEGORIES, seed=7, start_us=START, chunk=256)
+        finally:
+            bulk_generator.np = saved
+        with BinaryTransactionFile(self.path("a.bin")) as a, BinaryTransactionFile(self.path("b.bin")) as b:
+            self.assertEqual(list(a.iter_raw(0, 400)), list(b.iter_raw()))
+
+    def test_append_keeps_existing_records(self):
+        for name, file_format in (("log.bin", "binary"), ("log.jsonl", "jsonl")):
+            generate_to_file(self.path(name), 300, CATEGORIES, file_format, seed=1, start_us=START)
+            generate_to_file(self.path(name), 200, CATEGORIES, file_format, seed=2, append=True)
+        with BinaryTransactionFile(self.path("log.bin")) as data:
+            self.assertEqual(len(data), 500)
+        with open(self.path("log.jsonl"), encoding="utf-8") as f:
+            self.assertEqual(sum(1 for _ in f), 500)
+
+    # Пакет, пересекающий переход на летнее время: у каждой записи своя
+    # поправка, как при форматировании по одной записи
+    def test_jsonl_across_dst_change(self):
+        saved = os.environ.get("TZ")
+        os.environ["TZ"] = "Europe/Berlin"
+        time.tzset()
+        try:
+            start = to_timestamp_us("2025-03-30T01:30:00")
+            columns = BulkGenerator(CATEGORIES, seed=1, start_us=start, rate=1).columns(3600)
+            rows = [json.loads(line) for line in bulk_generator.format_jsonl(columns, CATEGORIES).splitlines()]
+            stamps = [r["timestamp"] for r in rows]
+            expected = [from_timestamp_us(t) for t in list(columns[0])]
+            self.assertEqual([(got, want) for got, want in zip(stamps, expected) if got != want][:3], [])
+            self.assertLess(stamps[0], "2025-03-30T02")
+            self.assertGreater(stamps[-1], "2025-03-30T03")
+        finally:
+            if saved is None:
+                os.environ.pop("TZ", None)
+            else:
+                os.environ["TZ"] = saved
+            time.tzset()
+
+    def test_jsonl_matches_binary(self):
+        generate_to_file(self.path("t.bin"), 2000, CATEGORIES, seed=3, start_us=START, chunk=500)
+        generate_to_file(self.path("t.jsonl"), 2000, CATEGORIES, "jsonl", seed=3, start_us=START, chunk=500)
+        with open(self.path("t.jsonl"), encoding="utf-8") as f:
+            rows = [json.loads(line) for line in f]
+        with BinaryTransactionFile(self.path("t.bin")) as data:
+            expected = list(data.iter_raw())
+        self.assertEqual(
+            [(to_timestamp_us(r["timestamp"]), CATEGORIES.index(r["category"]), to_cents(r["amount"]))
+             for r in rows],
+            expected
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
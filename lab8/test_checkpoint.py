@@ -0,0 +1,108 @@
+import asyncio
+import io
+import json
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from checkpoint import load_checkpoint
+from process_transactions import TransactionProcessor
+from windowing import CollectingSink
+
+RECORDS = [
+    {"timestamp": f"2025-01-01T10:{i // 60:02d}:{i % 60:02d}", "category": ["food", "еда", "travel"][i % 3],
+     "amount": round(10 + i * 0.37, 2)}
+    for i in range(3000)
+]
+
+
+class CrashingProcessor(TransactionProcessor):
+    def __init__(self, crash_after, **options):
+        super().__init__(**options)
+        self.crash_after = crash_after
+        self.seen = 0
+
+    async def process_transaction(self, transaction):
+        self.seen += 1
+        if self.seen > self.crash_after:
+            raise RuntimeError("сбой")
+        return await super().process_transaction(transaction)
+
+
+def make_processor(cls=TransactionProcessor, **options):
+    processor = cls(warning_threshold=500, window=600, alert_sink=CollectingSink(),
+                    checkpoint_interval=0, progress_interval=3600, **options)
+    processor.chunk_size = 4096
+    return processor
+
+
+class TestCheckpoint(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.checkpoint = os.path.join(self.directory.name, "t.checkpoint")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write_input(self, jsonl):
+        filename = os.path.join(self.directory.name, "t.jsonl" if jsonl else "t.json")
+        with open(filename, "w", encoding="utf-8") as f:
+            if jsonl:
+                f.write("".join(json.dumps(r, ensure_ascii=False) + "\n" for r in RECORDS))
+            else:
+                json.dump(RECORDS, f, ensure_ascii=False, indent=2)
+        return filename
+
+    def check_resume(self, jsonl):
+        filename = self.write_input(jsonl)
+        expected = make_processor()
+        asyncio.run(expected.process_stream(filename))
+
+        crashing = make_processor(CrashingProcessor, crash_after=2000)
+        with self.assertRaises(RuntimeError):
+            asyncio.run(crashing.process_stream(filename, self.checkpoint))
+        state = load_checkpoint(self.checkpoint, filename)
+        self.assertTrue(0 < state["records"] <= 2000)
+
+        resumed = make_processor()
+        count = asyncio.run(resumed.process_stream(filename, self.checkpoint, resume=True))
+        self.assertEqual(count, len(RECORDS))
+        self.assertEqual(resumed.category_stats(), expected.category_stats())
+        self.assertEqual(resumed.monitor.state(), expected.monitor.state())
+        self.assertEqual({c: s.count for c, s in resumed.sketches.quantiles.items()},
+                         {c: s["count"] for c, s in expected.category_stats().items()})
+        self.assertFalse(os.path.exists(self.checkpoint))
+
+    def test_resume_jsonl(self):
+        self.check_resume(jsonl=True)
+
+    def test_resume_json_array(self):
+        self.check_resume(jsonl=False)
+
+    def test_changed_input_is_rejected(self):
+        filename = self.write_input(jsonl=True)
+        with self.assertRaises(RuntimeError):
+            asyncio.run(make_processor(CrashingProcessor, crash_after=2000)
+                        .process_stream(filename, self.checkpoint))
+        with open(filename, "r+b") as f:
+            f.write(b"{}")
+        with self.assertRaises(ValueError):
+            load_checkpoint(self.checkpoint, filename)
+
+        output = io.StringIO()
+        with redirect_stdout(output):
+            count = asyncio.run(make_processor().process_stream(filename, self.checkpoint, resume=True))
+        self.assertEqual(count, 0)
+        self.assertIn("Контрольная точка", output.getvalue())
+        self.assertNotIn("Ошибка при чтении файла", output.getvalue())
+
+    def test_read_transactions_stream(self):
+        filename = self.write_input(jsonl=False)
+
+        async def read_all():
+            return [r async for r in make_processor().read_transactions_stream(filename)]
+        self.assertEqual(asyncio.run(read_all()), RECORDS)
+
+
+if __name__ == "__main__":
+    unittest.main()
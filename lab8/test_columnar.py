@@ -0,0 +1,82 @@
+import asyncio
+import time
+import unittest
+import columnar
+from columnar import ColumnarStore, to_cents
+from process_transactions import TransactionProcessor
+
+TRANSACTIONS = [
+    {"timestamp": "2025-01-01T10:00:00", "category": "food", "amount": 10.5},
+    {"timestamp": "2025-01-01T10:00:01", "category": "food", "amount": 4.25},
+    {"timestamp": "2025-01-01T10:00:02", "category": "travel", "amount": 100.0},
+    {"timestamp": "2025-01-01T10:00:03", "category": "food", "amount": 0.01},
+]
+
+
+class TestColumnarStore(unittest.TestCase):
+    def make_store(self):
+        store = ColumnarStore()
+        for transaction in TRANSACTIONS:
+            store.append_transaction(transaction)
+        return store
+
+    def test_group_by(self):
+        stats = self.make_store().group_by_category()
+        self.assertEqual(stats["food"], {"sum": 1476, "count": 3, "min": 1, "max": 1050})
+        self.assertEqual(stats["travel"], {"sum": 10000, "count": 1, "min": 10000, "max": 10000})
+
+    def test_group_by_without_numpy(self):
+        store = self.make_store()
+        expected = store.group_by_category()
+        saved, columnar.np = columnar.np, None
+        try:
+            self.assertEqual(store.group_by_category(), expected)
+        finally:
+            columnar.np = saved
+
+    def test_compact_size(self):
+        self.assertEqual(self.make_store().nbytes(), 17 * len(TRANSACTIONS))
+
+    # Словарь больше 256 категорий: столбец кодов расширяется, агрегаты
+    # не теряются ни с NumPy, ни без него
+    def test_many_categories(self):
+        store = ColumnarStore()
+        for i in range(60000):
+            store.append(i, f"c{i % 300}", 100)
+        self.assertEqual(store.category_codes.typecode, "H")
+        stats = store.group_by_category()
+        self.assertEqual(len(stats), 300)
+        self.assertEqual(stats["c299"], {"sum": 20000, "count": 200, "min": 100, "max": 100})
+        saved, columnar.np = columnar.np, None
+        try:
+            self.assertEqual(store.group_by_category(), stats)
+        finally:
+            columnar.np = saved
+
+    def test_to_cents(self):
+        self.assertEqual(to_cents(0.29), 29)
+        self.assertEqual(to_cents(1000.0), 100000)
+
+    def test_processor_summary(self):
+        processor = TransactionProcessor(warning_threshold=10 ** 9)
+
+        async def run():
+            for transaction in TRANSACTIONS:
+                await processor.process_transaction(transaction)
+
+        asyncio.run(run())
+        summary = processor.get_summary()
+        self.assertEqual(summary["total_amount"], 114.76)
+        self.assertEqual(summary["max_category"]["name"], "travel")
+        self.assertEqual(processor.category_totals, {"food": 14.76, "travel": 100.0})
+
+    # Запись без timestamp обрабатывается со временем приема
+    def test_transaction_without_timestamp(self):
+        processor = TransactionProcessor(warning_threshold=10 ** 9, window=60)
+        asyncio.run(processor.process_transaction({"category": "food", "amount": 1.5}))
+        self.assertEqual(processor.category_totals, {"food": 1.5})
+        self.assertAlmostEqual(processor.store.timestamps[0] / 1e6, time.time(), delta=60)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,56 @@
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+from generate_transactions import TransactionGenerator, compact_main_log
+
+RECORDS = [{"timestamp": f"2025-01-01T10:00:{i:02d}", "category": "food", "amount": i + 0.5} for i in range(5)]
+
+
+class TestCompactMainLog(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.log = os.path.join(self.directory.name, "all_transactions.jsonl")
+        self.output = os.path.join(self.directory.name, "all_transactions.json")
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def write_log(self, tail=""):
+        with open(self.log, 'w', encoding='utf-8') as f:
+            f.write("".join(json.dumps(r) + "\n" for r in RECORDS) + tail)
+
+    def read_output(self):
+        with open(self.output, encoding='utf-8') as f:
+            return json.load(f)
+
+    def test_torn_last_line_is_skipped(self):
+        self.write_log('{"timestamp": "2025-01-01T1')
+        self.assertEqual(compact_main_log(self.log, self.output), 5)
+        self.assertEqual(self.read_output(), RECORDS)
+
+    def test_corrupt_line_in_the_middle_raises(self):
+        self.write_log()
+        compact_main_log(self.log, self.output)
+        with open(self.log, 'a', encoding='utf-8') as f:
+            f.write("garbage\n" + json.dumps(RECORDS[0]) + "\n")
+        with self.assertRaisesRegex(ValueError, "строка 6"):
+            compact_main_log(self.log, self.output)
+        self.assertEqual(self.read_output(), RECORDS)  # прежний результат не тронут
+        self.assertEqual(sorted(os.listdir(self.directory.name)), ["all_transactions.json", "all_transactions.jsonl"])
+
+    def test_append_after_crash_drops_torn_tail(self):
+        self.write_log('{"timestamp": "2025-01-01T1')
+        generator = TransactionGenerator(main_log=self.log)
+
+        async def append():
+            await generator.update_main_file(RECORDS[:2])
+            await generator.close()
+        asyncio.run(append())
+        self.assertEqual(compact_main_log(self.log, self.output), 7)
+        self.assertEqual(self.read_output(), RECORDS + RECORDS[:2])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+from json_stream import JSONStreamParser, read_json_records
+
+RECORDS = [
+    {"timestamp": "2025-01-01T10:00:00", "category": "еда", "amount": 10.5},
+    {"timestamp": "2025-01-01T10:00:01", "category": "travel", "amount": 1000},
+    {"timestamp": "2025-01-01T10:00:02", "category": "health", "amount": 0.01},
+]
+
+
+def feed_in_pieces(text, size):
+    parser = JSONStreamParser()
+    records = []
+    for i in range(0, len(text), size):
+        records.extend(parser.feed(text[i:i + size]))
+    records.extend(parser.feed("", final=True))
+    parser.close()
+    return records
+
+
+class TestJSONStreamParser(unittest.TestCase):
+    def test_array_split_at_every_position(self):
+        text = json.dumps(RECORDS, indent=2, ensure_ascii=False)
+        for size in range(1, 40):
+            self.assertEqual(feed_in_pieces(text, size), RECORDS)
+
+    def test_jsonl(self):
+        text = "".join(json.dumps(r, ensure_ascii=False) + "\n" for r in RECORDS)
+        for size in (1, 7, 1000):
+            self.assertEqual(feed_in_pieces(text, size), RECORDS)
+
+    def test_empty_array(self):
+        self.assertEqual(feed_in_pieces("[ ]", 1), [])
+
+    def test_unclosed_array(self):
+        with self.assertRaises(ValueError):
+            feed_in_pieces(json.dumps(RECORDS)[:-1], 10)
+
+    def test_truncated_record(self):
+        with self.assertRaises(ValueError):
+            feed_in_pieces('{"a": 1}\n{"a": ', 4)
+
+    def test_read_file_in_small_chunks(self):
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, "t.json")
+            with open(filename, "w", encoding="utf-8") as f:
+                json.dump(RECORDS * 100, f, ensure_ascii=False, indent=2)
+
+            async def collect():
+                return [r async for r in read_json_records(filename, chunk_size=64, yield_every=7)]
+
+            self.assertEqual(asyncio.run(collect()), RECORDS * 100)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+import json
+import os
+import tempfile
+import unittest
+from functools import reduce
+from binary_format import BinaryTransactionWriter
+from columnar import ColumnarStore, merge_group_stats
+from parallel_processing import aggregate_shard, iter_lines, plan_shards, process_parallel
+
+RECORDS = [
+    {"timestamp": f"2025-01-01T10:00:{i:02d}", "category": ["food", "еда", "travel"][i % 3],
+     "amount": round(10 + i * 1.37, 2)}
+    for i in range(30)
+]
+
+
+def expected_stats(records):
+    store = ColumnarStore()
+    for transaction in records:
+        store.append_transaction(transaction)
+    return store.group_by_category()
+
+
+class TestParallelProcessing(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def path(self, name):
+        return os.path.join(self.directory.name, name)
+
+    def test_lines_split_at_every_offset(self):
+        filename = self.path("t.jsonl")
+        with open(filename, "w", encoding="utf-8") as f:
+            f.write("".join(json.dumps(r, ensure_ascii=False) + "\n" for r in RECORDS))
+        size = os.path.getsize(filename)
+        for split in range(size + 1):
+            lines = list(iter_lines(filename, 0, split)) + list(iter_lines(filename, split, size))
+            self.assertEqual([json.loads(line) for line in lines], RECORDS)
+
+    def test_shards_merge_to_sequential_result(self):
+        filename = self.path("t.jsonl")
+        with open(filename, "w", encoding="utf-8") as f:
+            f.write("".join(json.dumps(r, ensure_ascii=False) + "\n" for r in RECORDS))
+        shards = [("lines", filename, start, start + 50) for start in range(0, os.path.getsize(filename), 50)]
+        partials = [aggregate_shard(shard) for shard in shards]
+        self.assertEqual(reduce(merge_group_stats, (p[0] for p in partials), {}), expected_stats(RECORDS))
+        self.assertEqual(sum(p[1] for p in partials), len(RECORDS))
+
+    def test_batch_files_in_process_pool(self):
+        filenames = []
+        for i in range(0, len(RECORDS), 10):
+            filename = self.path(f"transactions_batch_{i}.json")
+            with open(filename, "w", encoding="utf-8") as f:
+                json.dump(RECORDS[i:i + 10], f, ensure_ascii=False, indent=2)
+            filenames.append(filename)
+        binary = self.path("t.bin")
+        with BinaryTransactionWriter(binary, ["food", "еда", "travel"]) as writer:
+            writer.write_transactions(RECORDS)
+        filenames.append(binary)
+
+        self.assertEqual(len(plan_shards(filenames, 2)), 4)
+        stats, count, sketches = process_parallel(filenames, workers=2)
+        self.assertEqual(count, 2 * len(RECORDS))
+        self.assertEqual(stats, expected_stats(RECORDS * 2))
+        self.assertEqual({c: s.count for c, s in sketches.quantiles.items()},
+                         {c: s["count"] for c, s in stats.items()})
+
+
+if __name__ == "__main__":
+    unittest.main()
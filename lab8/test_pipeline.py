@@ -0,0 +1,58 @@
+import asyncio
+import unittest
+from generate_transactions import TransactionGenerator
+from pipeline import LatencyStats, TransactionPipeline
+from process_transactions import TransactionProcessor
+from windowing import CollectingSink
+
+
+class TestTransactionPipeline(unittest.TestCase):
+    def run_pipeline(self, count, **options):
+        processor = TransactionProcessor(warning_threshold=10 ** 9, alert_sink=CollectingSink())
+        pipeline = TransactionPipeline(TransactionGenerator(), processor, **options)
+        return processor, asyncio.run(pipeline.run(count))
+
+    def test_all_transactions_reach_processor(self):
+        # Без linger число пакетов не зависит от скорости машины
+        processor, stats = self.run_pipeline(2500, consumers=3, queue_size=2, batch_size=7, linger_ms=10 ** 9)
+        self.assertEqual(stats["produced"], 2500)
+        self.assertEqual(stats["consumed"], 2500)
+        self.assertEqual(len(processor.store), 2500)
+        self.assertEqual(sum(s["count"] for s in processor.category_stats().values()), 2500)
+        self.assertEqual(stats["batches"], -(-2500 // 7))
+        self.assertLessEqual(stats["max_queue_depth"], 2)
+        self.assertEqual(stats["latency"]["count"], 2500)
+
+    def test_linger_flushes_partial_batches(self):
+        _, stats = self.run_pipeline(50, batch_size=1000, linger_ms=0)
+        self.assertEqual(stats["consumed"], 50)
+        self.assertGreater(stats["batches"], 1)
+
+    # Медленный генератор: неполный пакет уходит по таймеру linger, не
+    # дожидаясь следующей транзакции
+    def test_linger_with_slow_generator(self):
+        class SlowGenerator(TransactionGenerator):
+            async def transaction_stream(self, num_transactions):
+                async for transaction in super().transaction_stream(num_transactions):
+                    yield transaction
+                    await asyncio.sleep(0.3)
+
+        processor = TransactionProcessor(warning_threshold=10 ** 9, alert_sink=CollectingSink())
+        pipeline = TransactionPipeline(SlowGenerator(), processor, batch_size=1000, linger_ms=20)
+        stats = asyncio.run(pipeline.run(3))
+        self.assertEqual((stats["consumed"], stats["batches"]), (3, 3))
+        self.assertLess(stats["latency"]["max_ms"], 200)
+
+    def test_latency_memory_is_bounded(self):
+        latency = LatencyStats()
+        for i in range(100000):
+            latency.add((i % 1000) / 1e6)
+        summary = latency.summary()
+        self.assertEqual(summary["count"], 100000)
+        self.assertAlmostEqual(summary["p50_ms"], 0.5, delta=0.03)
+        self.assertEqual(summary["max_ms"], 0.999)
+        self.assertLess(sum(len(level) for level in latency.sketch.compactors), 2000)
+
+
+if __name__ == "__main__":
+    unittest.main()
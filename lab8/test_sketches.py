@@ -0,0 +1,95 @@
+import json
+import random
+import unittest
+from sketches import CategorySketches, HyperLogLog, KLLSketch
+
+
+def rank_error(sketch, values, q):
+    ordered = sorted(values)
+    estimate = sketch.quantile(q)
+    return abs(sum(1 for v in ordered if v <= estimate) / len(ordered) - q)
+
+
+class TestKLLSketch(unittest.TestCase):
+    def test_quantiles_within_error_and_bounded_memory(self):
+        rng = random.Random(1)
+        values = [rng.randint(1000, 100000) for _ in range(50000)]
+        sketch = KLLSketch(k=200, seed=1)
+        for value in values:
+            sketch.update(value)
+        for q in (0.1, 0.5, 0.9, 0.99):
+            self.assertLess(rank_error(sketch, values, q), 0.02)
+        self.assertLess(sum(len(level) for level in sketch.compactors), 1000)
+        self.assertEqual((sketch.min, sketch.max, sketch.count), (min(values), max(values), len(values)))
+
+    def test_merge_and_serialization(self):
+        rng = random.Random(2)
+        parts = [[rng.randint(0, 10 ** 6) for _ in range(7000)] for _ in range(4)]
+        merged = KLLSketch(seed=2)
+        for part in parts:
+            sketch = KLLSketch(seed=3)
+            sketch.update_many(part)
+            merged.merge(KLLSketch.from_dict(json.loads(json.dumps(sketch.to_dict()))))
+        values = [v for part in parts for v in part]
+        self.assertEqual(merged.count, len(values))
+        self.assertLess(rank_error(merged, values, 0.5), 0.02)
+
+    # Восстановленный скетч с нестандартным c сжимает уровни так же,
+    # как сохраненный
+    def test_serialization_keeps_parameters(self):
+        sketch = KLLSketch(k=50, c=0.5, seed=1)
+        sketch.update_many(range(5000))
+        restored = KLLSketch.from_dict(json.loads(json.dumps(sketch.to_dict())))
+        self.assertEqual((restored.k, restored.c), (50, 0.5))
+        self.assertEqual([restored._capacity(h) for h in range(len(restored.compactors))],
+                         [sketch._capacity(h) for h in range(len(sketch.compactors))])
+
+
+class TestHyperLogLog(unittest.TestCase):
+    def test_estimate_and_merge(self):
+        left, right, union = HyperLogLog(), HyperLogLog(), HyperLogLog()
+        for value in range(30000):
+            left.add(value)
+            union.add(value)
+        for value in range(20000, 60000):
+            right.add(value)
+            union.add(value)
+        left.merge(right)
+        self.assertEqual(left.registers, union.registers)
+        self.assertLess(abs(union.count() - 60000) / 60000, 0.1)
+
+    def test_small_counts_are_exact_enough(self):
+        sketch = HyperLogLog()
+        for value in [5, 5, 7, 9, 9, 9]:
+            sketch.add(value)
+        self.assertEqual(sketch.count(), 3)
+
+
+class TestCategorySketches(unittest.TestCase):
+    def test_update_arrays_matches_single_updates(self):
+        categories = ["food", "travel"]
+        codes = [0, 1, 0, 0, 1]
+        amounts = [100, 200, 300, 100, 500]
+        bulk, single = CategorySketches(), CategorySketches()
+        bulk.update_arrays(codes, amounts, categories)
+        for code, amount in zip(codes, amounts):
+            single.update(categories[code], amount)
+        self.assertEqual(bulk.summary("food"), single.summary("food"))
+        self.assertEqual(bulk.summary("food")["distinct_amounts"], 2)
+        self.assertEqual(bulk.summary("travel")["quantiles"]["p50"], 200)
+
+    def test_serialization_keeps_parameters(self):
+        sketches = CategorySketches(k=64, p=6)
+        sketches.update("food", 100)
+        restored = CategorySketches.from_dict(json.loads(json.dumps(sketches.to_dict())))
+        self.assertEqual((restored.k, restored.p), (64, 6))
+        restored.update("travel", 200)
+        self.assertEqual((restored.quantiles["travel"].k, restored.distinct["travel"].p), (64, 6))
+        self.assertEqual(restored.summary("food"), sketches.summary("food"))
+        # Прежний формат без параметров читается со значениями по умолчанию
+        legacy = CategorySketches.from_dict(sketches.to_dict()["categories"])
+        self.assertEqual((legacy.k, legacy.quantiles["food"].k), (200, 64))
+
+
+if __name__ == "__main__":
+    unittest.main()
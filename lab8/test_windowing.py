@@ -0,0 +1,71 @@
+import unittest
+from windowing import SECOND_US, CollectingSink, WindowedMonitor
+
+
+def run(monitor, events):
+    for second, category, amount in events:
+        monitor.observe(category, int(second * SECOND_US), amount * 100)
+
+
+class TestWindowedMonitor(unittest.TestCase):
+    def test_cumulative_alert_fires_once(self):
+        sink = CollectingSink()
+        monitor = WindowedMonitor(100, sink=sink)
+        run(monitor, [(i, "food", 30) for i in range(10)])
+        self.assertEqual([a.kind for a in sink.alerts], ["raised"])
+        self.assertEqual(sink.alerts[0].total, 12000)
+        self.assertIsNone(sink.alerts[0].window_start)
+
+    def test_tumbling_windows_reset(self):
+        sink = CollectingSink()
+        monitor = WindowedMonitor(100, size=10, sink=sink)
+        run(monitor, [(1, "food", 60), (2, "food", 60), (3, "food", 60),
+                      (11, "food", 60), (12, "food", 60)])
+        self.assertEqual([a.kind for a in sink.alerts], ["raised", "cleared", "raised"])
+        self.assertEqual((sink.alerts[0].window_start, sink.alerts[0].window_end), (0, 10 * SECOND_US))
+        self.assertEqual(monitor.current_totals()["food"], {"sum": 12000, "count": 2})
+
+    def test_new_window_alerts_again(self):
+        sink = CollectingSink()
+        monitor = WindowedMonitor(100, size=10, sink=sink)
+        run(monitor, [(1, "food", 150), (11, "food", 150)])
+        self.assertEqual([(a.kind, a.window_start) for a in sink.alerts],
+                         [("raised", 0), ("cleared", 10 * SECOND_US), ("raised", 10 * SECOND_US)])
+
+    def test_sliding_window_evicts_old_panes(self):
+        sink = CollectingSink()
+        monitor = WindowedMonitor(100, size=10, slide=2, sink=sink)
+        run(monitor, [(0, "food", 60), (5, "food", 60), (11, "food", 10), (16, "food", 10)])
+        # На 11-й секунде окно [2, 12) уже не содержит событие 0-й секунды
+        self.assertEqual([a.kind for a in sink.alerts], ["raised", "cleared"])
+        self.assertEqual(monitor.current_totals()["food"]["sum"], 2000)
+
+    def test_categories_are_independent(self):
+        sink = CollectingSink()
+        monitor = WindowedMonitor(100, size=10, sink=sink)
+        run(monitor, [(1, "food", 150), (1, "travel", 50), (2, "travel", 60)])
+        self.assertEqual([(a.kind, a.category) for a in sink.alerts],
+                         [("raised", "food"), ("raised", "travel")])
+
+    def test_idle_category_clears_on_global_time(self):
+        sink = CollectingSink()
+        monitor = WindowedMonitor(100, size=10, slide=5, sink=sink)
+        run(monitor, [(1, "travel", 150), (3, "food", 10), (12, "food", 10), (17, "food", 10)])
+        # В travel событий больше нет, но окно [10, 20) ее уже не содержит
+        self.assertEqual([(a.kind, a.category, a.window_start) for a in sink.alerts],
+                         [("raised", "travel", -5 * SECOND_US), ("cleared", "travel", 5 * SECOND_US)])
+        self.assertEqual(monitor.current_totals()["travel"]["sum"], 0)
+
+    def test_out_of_order_and_late_events(self):
+        monitor = WindowedMonitor(1000, size=10, slide=5, sink=CollectingSink())
+        run(monitor, [(20, "food", 10), (16, "food", 10), (2, "food", 10)])
+        self.assertEqual(monitor.current_totals()["food"]["sum"], 2000)
+        self.assertEqual(monitor.stats()["late_events"], 1)
+
+    def test_size_must_be_multiple_of_slide(self):
+        with self.assertRaises(ValueError):
+            WindowedMonitor(100, size=10, slide=3)
+
+
+if __name__ == "__main__":
+    unittest.main()
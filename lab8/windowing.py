@@ -0,0 +1,220 @@
+import json
+from collections import deque
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+from columnar import from_cents, from_timestamp_us
+
+SECOND_US = 1_000_000
+
+
+# Событие пересечения порога: "raised" — сумма в окне поднялась выше порога,
+# "cleared" — опустилась обратно (окно сдвинулось или началось новое)
+class Alert(NamedTuple):
+    kind: str
+    category: str
+    window_start: Optional[int]  # микросекунды; None для накопительного режима
+    window_end: Optional[int]
+    total: int  # копейки
+    count: int
+    threshold: int
+
+    def message(self) -> str:
+        window = ""
+        if self.window_start is not None:
+            window = (f" в окне {from_timestamp_us(self.window_start)} — "
+                      f"{from_timestamp_us(self.window_end)}")
+        if self.kind == "raised":
+            return (f"ВНИМАНИЕ: Расходы в категории '{self.category}'{window} "
+                    f"превысили {from_cents(self.threshold):.2f}. "
+                    f"Текущая сумма: {from_cents(self.total):.2f}")
+        return (f"Расходы в категории '{self.category}'{window} "
+                f"снова ниже порога: {from_cents(self.total):.2f}")
+
+    def to_dict(self) -> dict:
+        return {
+            "kind": self.kind,
+            "category": self.category,
+            "window_start": None if self.window_start is None else from_timestamp_us(self.window_start),
+            "window_end": None if self.window_end is None else from_timestamp_us(self.window_end),
+            "total": from_cents(self.total),
+            "count": self.count,
+            "threshold": from_cents(self.threshold),
+        }
+
+
+AlertSink = Callable[[Alert], None]
+
+
+# Приемники предупреждений: вывод в консоль, список (для тестов и отчетов)
+# и файл JSON Lines
+def print_alert(alert: Alert):
+    print(f"  {alert.message()}")
+
+
+class CollectingSink:
+    def __init__(self):
+        self.alerts: List[Alert] = []
+
+    def __call__(self, alert: Alert):
+        self.alerts.append(alert)
+
+
+class JSONLinesSink:
+    def __init__(self, filename: str):
+        self._file = open(filename, "a", encoding="utf-8")
+
+    def __call__(self, alert: Alert):
+        self._file.write(json.dumps(alert.to_dict(), ensure_ascii=False) + "\n")
+
+    def close(self):
+        self._file.close()
+
+
+# Состояние одной категории: суммы по частям окна (pane) в порядке времени,
+# их общая сумма и то, выше ли она порога сейчас
+class _CategoryWindow:
+    __slots__ = ("panes", "total", "count", "above")
+
+    def __init__(self):
+        self.panes = deque()  # [начало части, сумма, количество]
+        self.total = 0
+        self.count = 0
+        self.above = False
+
+
+# Окна по времени транзакции с предупреждениями по порогу.
+#   size=None             — накопительная сумма за все время;
+#   size=W, slide=None    — непересекающиеся (tumbling) окна длины W;
+#   size=W, slide=S       — скользящее окно длины W с шагом S (W кратно S).
+# Окно делится на части длины шага; на каждое событие — добавление в
+# последнюю часть и вытеснение устаревших частей, то есть O(1) амортизированно
+# на событие и O(W/S) памяти на категорию. Окно общее для всех категорий:
+# его сдвигает наибольшее время события (водяной знак), поэтому категория,
+# в которую события перестали приходить, тоже теряет устаревшие части и
+# получает "cleared". Предупреждение срабатывает только на пересечении
+# порога, а не на каждой транзакции выше него
+class WindowedMonitor:
+    def __init__(self, threshold: float, size: Optional[float] = None,
+                 slide: Optional[float] = None, sink: AlertSink = print_alert):
+        self.threshold = round(threshold * 100)  # копейки
+        self.size = None if size is None else int(size * SECOND_US)
+        self.step = self.size if slide is None or self.size is None else int(slide * SECOND_US)
+        if self.size is not None:
+            if self.step <= 0 or self.size % self.step:
+                raise ValueError("Длина окна должна быть кратна шагу")
+        self.sink = sink
+        self.late_events = 0  # события старше текущего окна (отброшены)
+        self.alerts_sent = 0
+        self._windows: Dict[str, _CategoryWindow] = {}
+        self._watermark: Optional[int] = None  # начало последней части общего окна
+
+    # Учет события; amount в копейках, timestamp в микросекундах
+    def observe(self, category: str, timestamp_us: int, amount: int, count: int = 1):
+        if self.size is None:
+            pane_start = 0
+        else:
+            pane_start = timestamp_us - timestamp_us % self.step
+            if self._watermark is None or pane_start > self._watermark:
+                self._advance(pane_start)
+            elif pane_start <= self._watermark - self.size:
+                # Событие старше окна, которое заканчивается водяным знаком
+                self.late_events += 1
+                return
+
+        window = self._windows.get(category)
+        if window is None:
+            window = self._windows[category] = _CategoryWindow()
+
+        panes = window.panes
+        if panes and panes[-1][0] == pane_start:
+            pane = panes[-1]
+        elif not panes or panes[-1][0] < pane_start:
+            pane = [pane_start, 0, 0]
+            panes.append(pane)
+        else:
+            # Событие пришло не по порядку, но в пределах окна
+            pane = next((p for p in panes if p[0] == pane_start), None)
+            if pane is None:
+                pane = [pane_start, 0, 0]
+                panes.append(pane)
+                window.panes = panes = deque(sorted(panes))
+        pane[1] += amount
+        pane[2] += count
+        window.total += amount
+        window.count += count
+        self._check(category, window, None if self.size is None else self._watermark + self.step)
+
+    # Сдвиг общего окна к части pane_start: устаревшие части вытесняются во
+    # всех категориях, и сдвиг мог опустить их суммы ниже порога. Выполняется
+    # раз на шаг окна по времени событий, O(число категорий)
+    def _advance(self, pane_start: int):
+        self._watermark = pane_start
+        for category, window in self._windows.items():
+            if window.panes and self._evict(window, pane_start):
+                self._check(category, window, pane_start + self.step)
+
+    # Вытеснение частей, которые не попадают в окно, заканчивающееся частью pane_start
+    def _evict(self, window: _CategoryWindow, pane_start: int) -> bool:
+        panes = window.panes
+        oldest = pane_start - self.size + self.step
+        evicted = False
+        while panes and panes[0][0] < oldest:
+            _, amount, count = panes.popleft()
+            window.total -= amount
+            window.count -= count
+            evicted = True
+        return evicted
+
+    # end — конец текущего окна (None в накопительном режиме)
+    def _check(self, category: str, window: _CategoryWindow, end: Optional[int]):
+        above = window.total > self.threshold
+        if above == window.above:
+            return
+        window.above = above
+        start = None if end is None else end - self.size
+        self.alerts_sent += 1
+        self.sink(Alert("raised" if above else "cleared", category, start, end,
+                        window.total, window.count, self.threshold))
+
+    # Текущие суммы по категориям в общем окне (копейки)
+    def current_totals(self) -> Dict[str, Dict[str, int]]:
+        return {category: {"sum": w.total, "count": w.count}
+                for category, w in self._windows.items()}
+
+    # Состояние для контрольной точки (см. checkpoint.py)
+    def state(self) -> Dict[str, Any]:
+        return {
+            "size": self.size,
+            "step": self.step,
+            "threshold": self.threshold,
+            "late_events": self.late_events,
+            "alerts_sent": self.alerts_sent,
+            "watermark": self._watermark,
+            "windows": {
+                category: {"panes": [list(p) for p in w.panes], "total": w.total,
+                           "count": w.count, "above": w.above}
+                for category, w in self._windows.items()
+            },
+        }
+
+    def restore(self, state: Dict[str, Any]):
+        if (state["size"], state["step"], state["threshold"]) != (self.size, self.step, self.threshold):
+            raise ValueError("Контрольная точка сделана с другими настройками окна или порога")
+        self.late_events = state["late_events"]
+        self.alerts_sent = state["alerts_sent"]
+        self._windows = {}
+        for category, item in state["windows"].items():
+            window = self._windows[category] = _CategoryWindow()
+            window.panes = deque(list(p) for p in item["panes"])
+            window.total, window.count, window.above = item["total"], item["count"], item["above"]
+        # Точки, сохраненные до появления общего водяного знака, — по последней части
+        self._watermark = state.get("watermark", max(
+            (w.panes[-1][0] for w in self._windows.values() if w.panes), default=None))
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "categories": len(self._windows),
+            "alerts_sent": self.alerts_sent,
+            "late_events": self.late_events,
+            "above_threshold": sum(1 for w in self._windows.values() if w.above),
+        }